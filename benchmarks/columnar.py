@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+'''Compare repeated xml_dumper queries against Host objects and a
+columnar ScanStore.
+
+Hosts are built in memory once and queried repeatedly with the
+filters supported by ScanStore, as when the same scan is queried many
+times with different filters. Outputs of both representations are
+compared for every query.
+
+Usage: python3 benchmarks/columnar.py [--hosts N] [--ports N]
+'''
+
+from pathlib import Path
+from time import perf_counter
+import argparse
+import sys
+
+ROOT = Path(__file__).absolute().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+from search import build_hosts
+from parsuite.abstractions.columnar import ScanStore
+from parsuite.abstractions.xml.generic.network_host import PortSearch
+
+# (format, keyword arguments)
+QUERIES = [
+    ('addresses',{}),
+    ('addresses',{'port_search':[80]}),
+    ('addresses',{'port_search':[80,443]}),
+    ('addresses',{'service_search':['ssh']}),
+    ('addresses',{'service_search':['http','ftp','telnet']}),
+    ('addresses',{'service_search':['vnc'],'port_search':[5900]}),
+    ('addresses',{'port_required':True}),
+    ('sockets',{}),
+    ('sockets',{'port_search':[22,3389]}),
+    ('sockets',{'service_search':['http']}),
+    ('sockets',{'service_search':['mysql','ms-sql-s','postgresql']}),
+    ('ports',{}),
+    ('ports',{'service_search':['imap','pop3','smtp']}),
+]
+
+def object_query(hosts, format, kwargs):
+
+    search = PortSearch(kwargs.get('port_search',[]),
+        kwargs.get('service_search',[]))
+
+    output = []
+    for host in hosts:
+        output += host.__getattribute__('to_'+format)(search=search,
+            **kwargs)
+
+    return output
+
+def columnar_query(store, format, kwargs):
+
+    return store.__getattribute__('to_'+format)(**kwargs)
+
+if __name__ == '__main__':
+
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--hosts', type=int, default=50000,
+        help='Hosts to query. Default: %(default)s')
+    ap.add_argument('--ports', type=int, default=5,
+        help='Open ports per host. Default: %(default)s')
+    args = ap.parse_args()
+
+    print(f'[+] Building {args.hosts} hosts', file=sys.stderr)
+    hosts = build_hosts(args.hosts, args.ports)
+
+    start = perf_counter()
+    store = ScanStore.from_hosts(hosts)
+    build_time = perf_counter()-start
+
+    totals = [0,0]
+    print(f'{"query":<64}{"object (s)":>12}{"columnar (s)":>14}')
+    for format,kwargs in QUERIES:
+
+        start = perf_counter()
+        expected = object_query(hosts,format,kwargs)
+        object_time = perf_counter()-start
+
+        start = perf_counter()
+        output = columnar_query(store,format,kwargs)
+        columnar_time = perf_counter()-start
+
+        # Port output is deduplicated by xml_dumper; compare as sets
+        if format == 'ports':
+            expected,output = set(expected),set(output)
+
+        if expected != output:
+            sys.exit(f'Outputs differ for {format} {kwargs}')
+
+        totals[0] += object_time
+        totals[1] += columnar_time
+
+        name = f'{format} {kwargs}'
+        print(f'{name:<64}{object_time:>12.3f}{columnar_time:>14.3f}')
+
+    print(f'{"total":<64}{totals[0]:>12.3f}{totals[1]:>14.3f}')
+    print(f'\nScanStore built in {build_time:.3f}s. Queries ' \
+        f'{totals[0]/totals[1]:.1f}x faster.')
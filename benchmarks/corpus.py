@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+'''Generate synthetic nmap, masscan, Nessus and Burp XML files.
+
+Files are written incrementally so that very large corpora (1M+ hosts)
+can be produced without holding the document in memory. Output is
+deterministic for a given seed.
+
+Usage: python3 benchmarks/corpus.py {nmap,masscan,nessus,burp} -o FILE
+           [--hosts N] [--ports N] [--scripts] [--plugins N] [--seed N]
+'''
+
+from base64 import b64encode
+from xml.sax.saxutils import escape, quoteattr
+import argparse
+import random
+
+FORMATS = ['nmap','masscan','nessus','burp']
+
+# (port, service name, product, tunnel)
+SERVICES = [
+    (21,'ftp','vsftpd',None),
+    (22,'ssh','OpenSSH',None),
+    (23,'telnet','BusyBox telnetd',None),
+    (25,'smtp','Postfix smtpd',None),
+    (53,'domain','ISC BIND',None),
+    (80,'http','nginx',None),
+    (110,'pop3','Dovecot pop3d',None),
+    (135,'msrpc','Microsoft Windows RPC',None),
+    (139,'netbios-ssn','Microsoft Windows netbios-ssn',None),
+    (143,'imap','Dovecot imapd',None),
+    (443,'http','Apache httpd','ssl'),
+    (445,'microsoft-ds','Microsoft Windows Server 2016 microsoft-ds',None),
+    (993,'imap','Dovecot imapd','ssl'),
+    (1433,'ms-sql-s','Microsoft SQL Server 2016',None),
+    (3306,'mysql','MySQL',None),
+    (3389,'ms-wbt-server','Microsoft Terminal Services',None),
+    (5432,'postgresql','PostgreSQL DB',None),
+    (5900,'vnc','RealVNC',None),
+    (8080,'http-proxy','Squid http proxy',None),
+    (8443,'https-alt','Jetty','ssl'),
+]
+
+WORDS = ('remote host service version vulnerable update patch affected '
+    'server client protocol cipher certificate authentication request '
+    'response attacker arbitrary code execution denial information '
+    'disclosure configuration default credentials').split()
+
+def address(index):
+    '''Map a host index to a unique IPv4 address in 10.0.0.0/8.
+    '''
+
+    index += 1
+    return f'10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}'
+
+def hostname(index):
+
+    return f'host{index}.corp.example.com'
+
+def text(rand, words):
+
+    return ' '.join(rand.choice(WORDS) for i in range(words))
+
+def host_services(rand, ports):
+    '''Pick a sorted sample of services for a single host.
+    '''
+
+    count = min(ports, len(SERVICES))
+    services = rand.sample(SERVICES, count)
+
+    # Pad with high ports when more ports than known services are requested
+    for i in range(ports - count):
+        services.append((10000+i,'unknown',None,None))
+
+    return sorted(services)
+
+def ssl_cert_output(index):
+
+    name = hostname(index)
+    return f'Subject: commonName={name}\n' \
+        f'Subject Alternative Name: DNS:{name}, DNS:www.{name}\n' \
+        'Issuer: commonName=Example Corp CA\n' \
+        'Public Key type: rsa\nPublic Key bits: 2048'
+
+# ====
+# NMAP
+# ====
+
+def write_nmap(outfile, hosts=1000, ports=5, scripts=False, seed=0,
+        **kwargs):
+
+    rand = random.Random(seed)
+    w = outfile.write
+
+    w('<?xml version="1.0" encoding="UTF-8"?>\n')
+    w('<nmaprun scanner="nmap" args="nmap -sV -oX bench.xml 10.0.0.0/8" ' \
+        'start="1577836800" version="7.80" xmloutputversion="1.04">\n')
+    w('<scaninfo type="syn" protocol="tcp" numservices="1000" ' \
+        'services="1-1000"/>\n')
+
+    for index in range(hosts):
+
+        w('<host starttime="1577836800" endtime="1577836900">')
+        w('<status state="up" reason="syn-ack" reason_ttl="0"/>')
+        w(f'<address addr="{address(index)}" addrtype="ipv4"/>')
+        w(f'<hostnames><hostname name="{hostname(index)}" type="PTR"/>' \
+            '</hostnames><ports>')
+
+        for number,name,product,tunnel in host_services(rand, ports):
+
+            w(f'<port protocol="tcp" portid="{number}">' \
+                '<state state="open" reason="syn-ack" reason_ttl="64"/>')
+
+            w(f'<service name="{name}" method="probed" conf="10"')
+            if product:
+                w(f' product={quoteattr(product)} version="{rand.randint(1,9)}.' \
+                    f'{rand.randint(0,20)}" extrainfo="protocol 2.0"')
+            if tunnel:
+                w(f' tunnel="{tunnel}"')
+            w('/>')
+
+            if scripts:
+                w(f'<script id="banner" output={quoteattr(text(rand,12))}/>')
+                if tunnel:
+                    w(f'<script id="ssl-cert" ' \
+                        f'output={quoteattr(ssl_cert_output(index))}/>')
+
+            w('</port>')
+
+        w('</ports></host>\n')
+
+    w(f'<runstats><finished time="1577840000" exit="success"/>' \
+        f'<hosts up="{hosts}" down="0" total="{hosts}"/></runstats>\n')
+    w('</nmaprun>\n')
+
+# =======
+# MASSCAN
+# =======
+
+def write_masscan(outfile, hosts=1000, ports=5, seed=0, **kwargs):
+
+    rand = random.Random(seed)
+    w = outfile.write
+
+    w('<?xml version="1.0"?>\n')
+    w('<nmaprun scanner="masscan" start="1577836800" version="1.0-BETA" ' \
+        'xmloutputversion="1.03">\n')
+    w('<scaninfo type="syn" protocol="tcp" />\n')
+
+    # masscan writes one host element per open port
+    for index in range(hosts):
+        for number,name,product,tunnel in host_services(rand, ports):
+            w(f'<host endtime="1577836900"><address addr="{address(index)}" ' \
+                f'addrtype="ipv4"/><ports><port protocol="tcp" ' \
+                f'portid="{number}"><state state="open" reason="syn-ack" ' \
+                f'reason_ttl="64"/></port></ports></host>\n')
+
+    w('<runstats><finished time="1577840000" timestr="" elapsed="3600"/>' \
+        f'<hosts up="{hosts}" down="0" total="{hosts}"/></runstats>\n')
+    w('</nmaprun>\n')
+
+# ======
+# NESSUS
+# ======
+
+SERVICE_DETECTION = '22964'
+SSL_VERSIONS = '56984'
+RISK_FACTORS = ['None','Low','Medium','High','Critical']
+
+def plugin_catalog(rand, count):
+    '''Build a list of plugin metadata dictionaries. The catalog always
+    includes Service Detection and SSL/TLS Versions Supported since
+    the parsers treat them specially.
+    '''
+
+    catalog = [
+        {'id':SERVICE_DETECTION,'name':'Service Detection',
+            'family':'Service detection','risk':'None'},
+        {'id':SSL_VERSIONS,'name':'SSL/TLS Versions Supported',
+            'family':'General','risk':'None'},
+    ]
+
+    for i in range(max(count-len(catalog),0)):
+        catalog.append({'id':str(100000+i),
+            'name':f'Synthetic Finding {i} {text(rand,4).title()}',
+            'family':rand.choice(['General','Misc.','Web Servers',
+                'Windows','Databases']),
+            'risk':rand.choice(RISK_FACTORS)})
+
+    for plugin in catalog:
+        plugin['description'] = text(rand,150)
+        plugin['solution'] = text(rand,20)
+        plugin['synopsis'] = text(rand,12)
+        plugin['exploitable'] = rand.random() < .2
+
+    return catalog
+
+def write_report_item(w, plugin, number, svc_name, output):
+
+    severity = RISK_FACTORS.index(plugin['risk'])
+    exploitable = 'true' if plugin['exploitable'] else 'false'
+
+    w(f'<ReportItem port="{number}" svc_name="{svc_name}" protocol="tcp" ' \
+        f'severity="{severity}" pluginID="{plugin["id"]}" ' \
+        f'pluginName={quoteattr(plugin["name"])} ' \
+        f'pluginFamily={quoteattr(plugin["family"])}>')
+    w(f'<agent>all</agent><description>{escape(plugin["description"])}' \
+        f'</description><fname>synthetic_{plugin["id"]}.nasl</fname>' \
+        '<plugin_modification_date>2020/01/01</plugin_modification_date>' \
+        f'<plugin_name>{escape(plugin["name"])}</plugin_name>' \
+        '<plugin_publication_date>2019/01/01</plugin_publication_date>' \
+        '<plugin_type>remote</plugin_type>' \
+        f'<risk_factor>{plugin["risk"]}</risk_factor>' \
+        '<script_copyright>This script is Copyright (C) Example</script_copyright>' \
+        '<script_version>1.1</script_version>' \
+        f'<solution>{escape(plugin["solution"])}</solution>' \
+        f'<synopsis>{escape(plugin["synopsis"])}</synopsis>' \
+        f'<exploit_available>{exploitable}</exploit_available>')
+
+    if plugin['exploitable']:
+        w('<exploit_framework_metasploit>true</exploit_framework_metasploit>' \
+            '<metasploit_name>Synthetic Module</metasploit_name>')
+
+    if output:
+        w(f'<plugin_output>{escape(output)}</plugin_output>')
+
+    w('</ReportItem>')
+
+def write_nessus(outfile, hosts=1000, ports=5, plugins=50,
+        plugins_per_port=3, seed=0, **kwargs):
+
+    rand = random.Random(seed)
+    catalog = plugin_catalog(rand, plugins)
+    findings = catalog[2:] or catalog
+    w = outfile.write
+
+    w('<?xml version="1.0" ?>\n<NessusClientData_v2>\n')
+    w('<Policy><policyName>Synthetic Benchmark</policyName><Preferences>' \
+        '<ServerPreferences><preference><name>TARGET</name>' \
+        f'<value>{address(0)}-{address(hosts-1)}</value></preference>' \
+        '</ServerPreferences></Preferences></Policy>\n')
+    w('<Report name="Synthetic Benchmark">\n')
+
+    for index in range(hosts):
+
+        ip = address(index)
+        w(f'<ReportHost name="{ip}"><HostProperties>' \
+            f'<tag name="host-ip">{ip}</tag>' \
+            f'<tag name="host-fqdn">{hostname(index)}</tag>' \
+            f'<tag name="host-rdns">{hostname(index)}</tag>' \
+            f'<tag name="netbios-name">HOST{index}</tag>' \
+            '<tag name="operating-system">Microsoft Windows Server 2016</tag>' \
+            f'<tag name="mac-address">00:50:56:{(index>>16)&255:02x}:' \
+            f'{(index>>8)&255:02x}:{index&255:02x}</tag>' \
+            '</HostProperties>')
+
+        for number,name,product,tunnel in host_services(rand, ports):
+
+            svc_name = 'www' if name.startswith('http') else name
+
+            write_report_item(w, catalog[0], number, svc_name,
+                f'A {name} server is running on this port.')
+
+            if tunnel:
+                write_report_item(w, catalog[1], number, svc_name,
+                    'This port supports TLSv1.2.')
+
+            for plugin in rand.sample(findings,
+                    min(plugins_per_port,len(findings))):
+
+                # Identical outputs are common across hosts in real scans
+                write_report_item(w, plugin, number, svc_name,
+                    f'Installed version : {rand.randint(1,3)}.0\n' \
+                    f'Fixed version     : 4.0')
+
+        w('</ReportHost>\n')
+
+    w('</Report>\n</NessusClientData_v2>\n')
+
+# ====
+# BURP
+# ====
+
+def write_burp(outfile, hosts=1000, ports=1, seed=0, **kwargs):
+    '''Write a Burp items export. Each host contributes `ports` items.
+    '''
+
+    rand = random.Random(seed)
+    w = outfile.write
+
+    w('<?xml version="1.0"?>\n<items burpVersion="2020.1" ' \
+        'exportTime="Wed Jan 01 00:00:00 UTC 2020">\n')
+
+    for index in range(hosts):
+
+        host = hostname(index)
+
+        for i in range(ports):
+
+            path = f'/api/v1/resource/{i}'
+            body = '{"id":%d,"value":"%s"}' % (i, text(rand,8))
+
+            request = f'POST {path} HTTP/1.1\r\nHost: {host}\r\n' \
+                'Content-Type: application/json\r\n' \
+                f'Content-Length: {len(body)}\r\n\r\n{body}'
+
+            response = 'HTTP/1.1 200 OK\r\nContent-Type: application/json' \
+                f'\r\nContent-Length: {len(body)}\r\n\r\n{body}'
+
+            w('<item><time>Wed Jan 01 00:00:00 UTC 2020</time>' \
+                f'<url><![CDATA[https://{host}{path}]]></url>' \
+                f'<host ip="{address(index)}">{host}</host>' \
+                '<port>443</port><protocol>https</protocol>' \
+                f'<method>POST</method><path><![CDATA[{path}]]></path>' \
+                '<extension>null</extension>' \
+                '<request base64="true"><![CDATA[' \
+                f'{b64encode(request.encode()).decode()}]]></request>' \
+                f'<status>200</status><responselength>{len(response)}' \
+                '</responselength><mimetype>JSON</mimetype>' \
+                '<response base64="true"><![CDATA[' \
+                f'{b64encode(response.encode()).decode()}]]></response>' \
+                '<comment></comment></item>\n')
+
+    w('</items>\n')
+
+def generate(format, path, **kwargs):
+    '''Write a synthetic file of the given format to path.
+    '''
+
+    with open(path, 'w') as outfile:
+        globals()[f'write_{format}'](outfile, **kwargs)
+
+    return path
+
+if __name__ == '__main__':
+
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('format', choices=FORMATS)
+    ap.add_argument('--output-file', '-o', required=True)
+    ap.add_argument('--hosts', type=int, default=1000,
+        help='Number of hosts. Default: %(default)s')
+    ap.add_argument('--ports', type=int, default=5,
+        help='Open ports (or Burp items) per host. Default: %(default)s')
+    ap.add_argument('--scripts', action='store_true',
+        help='Include nmap script output.')
+    ap.add_argument('--plugins', type=int, default=50,
+        help='Distinct Nessus plugins. Default: %(default)s')
+    ap.add_argument('--plugins-per-port', type=int, default=3,
+        help='Nessus findings per port. Default: %(default)s')
+    ap.add_argument('--seed', type=int, default=0)
+    args = vars(ap.parse_args())
+
+    generate(args.pop('format'), args.pop('output_file'), **args)
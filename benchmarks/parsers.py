@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+'''Time parsuite parsers and modules against a synthetic corpus.
+
+Each benchmark runs in a fresh interpreter so that peak RSS is not
+polluted by earlier runs. Results are appended to a JSON file so that
+runs can be compared across changes.
+
+Usage: python3 benchmarks/parsers.py [--hosts N] [--ports N]
+           [--results FILE] [--benchmarks NAME ...]
+'''
+
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+
+ROOT = Path(__file__).absolute().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import corpus
+
+# name -> (corpus format, function accepting (input_file, work_dir))
+BENCHMARKS = {}
+
+# Additional measurements a benchmark may return -> column heading
+MEASUREMENTS = {'bytes_per_port':'bytes/port',
+    'bytes_per_item':'bytes/item','cached_wall':'cached (s)'}
+
+def benchmark(name, format):
+    '''Register a benchmark function for a corpus format. The function
+    receives the path to the input file and a scratch directory and
+    may return a dictionary of additional measurements.
+    '''
+
+    def register(func):
+        BENCHMARKS[name] = (format, func)
+        return func
+
+    return register
+
+def run_module(name, **kwargs):
+    '''Run a parsuite module with stdout discarded.
+    '''
+
+    from parsuite import modules
+
+    with open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        return modules.handles[name].parse(**kwargs)
+
+XML_DUMPER_DEFAULTS = dict(format='socket', all_addresses=False,
+    fqdns=False, port_required=False, port_search=[], service_search=[],
+    protocols=['tcp'], transport_layer=False, delimiter='\n',
+    http_links=False, sreg=False, extrainfo=False, no_cache=True)
+
+# =======
+# PARSERS
+# =======
+
+@benchmark('parse_nmap', 'nmap')
+def bench_parse_nmap(input_file, work_dir):
+
+    import xml.etree.ElementTree as ET
+    from parsuite.parsers.nmap import parse_nmap
+    parse_nmap(ET.parse(input_file), False)
+
+@benchmark('iter_nmap', 'nmap')
+def bench_iter_nmap(input_file, work_dir):
+
+    from parsuite.parsers.nmap import iter_nmap
+    for host in iter_nmap(input_file): pass
+
+@benchmark('parse_masscan', 'masscan')
+def bench_parse_masscan(input_file, work_dir):
+
+    import xml.etree.ElementTree as ET
+    from parsuite.parsers.masscan import parse_masscan
+    parse_masscan(ET.parse(input_file), False)
+
+@benchmark('parse_nessus', 'nessus')
+def bench_parse_nessus(input_file, work_dir):
+
+    import xml.etree.ElementTree as ET
+    from parsuite.parsers.nessus import parse_nessus
+    parse_nessus(ET.parse(input_file), False)
+
+@benchmark('iter_nessus', 'nessus')
+def bench_iter_nessus(input_file, work_dir):
+
+    from parsuite.parsers.nessus import iter_nessus
+    for host in iter_nessus(input_file): pass
+
+@benchmark('nmap_port_memory', 'nmap')
+def bench_nmap_port_memory(input_file, work_dir):
+    '''Retain every host from an nmap file and report the memory traced
+    for the resulting objects per port.
+    '''
+
+    import tracemalloc
+    from parsuite.parsers.nmap import iter_nmap
+
+    tracemalloc.start()
+    hosts = list(iter_nmap(input_file))
+    current,peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ports = sum(len(host.ports) for host in hosts)
+    return {'bytes_per_port':current/ports if ports else None}
+
+@benchmark('iter_report_hosts', 'nessus')
+def bench_iter_report_hosts(input_file, work_dir):
+
+    from parsuite.parsers.nessus import iter_report_hosts
+    for rhost in iter_report_hosts(input_file): pass
+
+@benchmark('nessus_report_item_memory', 'nessus')
+def bench_nessus_report_item_memory(input_file, work_dir):
+    '''Retain every ReportItem from a Nessus file and report the memory
+    traced for the resulting objects per item.
+    '''
+
+    import tracemalloc
+    from parsuite.parsers.nessus import iter_report_hosts
+
+    tracemalloc.start()
+    items = [ri for rhost in iter_report_hosts(input_file)
+        for ri in rhost.report_items]
+    current,peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'bytes_per_item':current/len(items) if items else None}
+
+# =======
+# MODULES
+# =======
+
+@benchmark('xml_dumper_nmap', 'nmap')
+def bench_xml_dumper_nmap(input_file, work_dir):
+
+    run_module('xml_dumper', input_files=[input_file],
+        **XML_DUMPER_DEFAULTS)
+
+@benchmark('xml_dumper_nmap_service_search', 'nmap')
+def bench_xml_dumper_nmap_service_search(input_file, work_dir):
+
+    kwargs = dict(XML_DUMPER_DEFAULTS, format='address',
+        service_search=['http','ssh','ftp','smtp','mysql','vnc',
+            'microsoft-ds','ms-sql-s','imap','pop3','domain','telnet'])
+    run_module('xml_dumper', input_files=[input_file], **kwargs)
+
+@benchmark('xml_dumper_nmap_sreg', 'nmap')
+def bench_xml_dumper_nmap_sreg(input_file, work_dir):
+
+    from search import EXPRESSIONS
+    kwargs = dict(XML_DUMPER_DEFAULTS, format='uri', sreg=True,
+        service_search=EXPRESSIONS[:20])
+    run_module('xml_dumper', input_files=[input_file], **kwargs)
+
+@benchmark('xml_dumper_nmap_sorted', 'nmap')
+def bench_xml_dumper_nmap_sorted(input_file, work_dir):
+
+    run_module('xml_dumper', input_files=[input_file], sort=True,
+        **XML_DUMPER_DEFAULTS)
+
+@benchmark('xml_dumper_nmap_cached', 'nmap')
+def bench_xml_dumper_nmap_cached(input_file, work_dir):
+    '''Run xml_dumper twice with the parsed scan cache enabled and
+    report the time taken by the second run, which reads the cache.
+    '''
+
+    kwargs = dict(XML_DUMPER_DEFAULTS, no_cache=False)
+    run_module('xml_dumper', input_files=[input_file], **kwargs)
+
+    start = perf_counter()
+    run_module('xml_dumper', input_files=[input_file], **kwargs)
+    return {'cached_wall':perf_counter()-start}
+
+@benchmark('xml_dumper_nessus', 'nessus')
+def bench_xml_dumper_nessus(input_file, work_dir):
+
+    run_module('xml_dumper', input_files=[input_file],
+        **XML_DUMPER_DEFAULTS)
+
+@benchmark('xml_dumper_nessus_http_links', 'nessus')
+def bench_xml_dumper_nessus_http_links(input_file, work_dir):
+
+    kwargs = dict(XML_DUMPER_DEFAULTS, http_links=True)
+    run_module('xml_dumper', input_files=[input_file], **kwargs)
+
+@benchmark('xml_dumper_nmap_http_links', 'nmap')
+def bench_xml_dumper_nmap_http_links(input_file, work_dir):
+
+    kwargs = dict(XML_DUMPER_DEFAULTS, http_links=True)
+    run_module('xml_dumper', input_files=[input_file], **kwargs)
+
+@benchmark('xml_dumper_masscan', 'masscan')
+def bench_xml_dumper_masscan(input_file, work_dir):
+
+    run_module('xml_dumper', input_files=[input_file],
+        **XML_DUMPER_DEFAULTS)
+
+@benchmark('nessus_output_dumper', 'nessus')
+def bench_nessus_output_dumper(input_file, work_dir):
+
+    run_module('nessus_output_dumper', input_file=input_file,
+        output_directory=os.path.join(work_dir,'output'),
+        disable_color_output=True)
+
+@benchmark('nmap_xml_service_dumper', 'nmap')
+def bench_nmap_xml_service_dumper(input_file, work_dir):
+
+    run_module('nmap_xml_service_dumper', input_file=input_file,
+        output_directory=os.path.join(work_dir,'output'), no_cache=True)
+
+@benchmark('burp_info_extractor', 'burp')
+def bench_burp_info_extractor(input_file, work_dir):
+
+    run_module('burp_info_extractor', input_file=input_file,
+        output_directory=os.path.join(work_dir,'output'),
+        huge_tree=True)
+
+# ======
+# RUNNER
+# ======
+
+def max_rss():
+    '''Return the peak resident set size of this process in bytes.
+    '''
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is reported in bytes on macOS and KiB elsewhere
+    return rss if platform.system() == 'Darwin' else rss*1024
+
+def run_child(name, input_file, work_dir):
+    '''Execute a single benchmark in the current process and return
+    its measurements.
+    '''
+
+    format, func = BENCHMARKS[name]
+
+    # Load parsuite before measuring so import costs are excluded
+    import parsuite.modules
+
+    cwd = os.getcwd()
+    base_rss = max_rss()
+    start = perf_counter()
+
+    try:
+        measurements = func(input_file, work_dir) or {}
+    finally:
+        os.chdir(cwd)
+
+    return dict(measurements, wall=perf_counter()-start,
+        peak_rss=max_rss(), base_rss=base_rss)
+
+def run(name, input_file, hosts):
+    '''Execute a benchmark in a fresh interpreter.
+    '''
+
+    with TemporaryDirectory() as work_dir:
+
+        # Answers to prompts are never expected; stdin is closed
+        proc = subprocess.run([sys.executable, __file__, '--child', name,
+                input_file, work_dir],
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, cwd=work_dir,
+            env=dict(os.environ, PARSUITE_CACHE_DIR=work_dir))
+
+    if proc.returncode != 0:
+        return {'error':f'exit status {proc.returncode}'}
+
+    result = json.loads(proc.stdout.decode().strip().split('\n')[-1])
+    result['hosts_per_second'] = hosts/result['wall'] if result['wall'] else None
+
+    return result
+
+def corpus_file(corpus_dir, format, **params):
+    '''Return the path to a corpus file, generating it when it doesn't
+    already exist for the supplied parameters.
+    '''
+
+    name = format+'_'+'_'.join(f'{k}{int(v)}' for k,v in
+        sorted(params.items()))+'.xml'
+    path = Path(corpus_dir, name)
+
+    if not path.exists():
+        print(f'[+] Generating {path}', file=sys.stderr)
+        tmp = path.with_suffix('.tmp')
+        corpus.generate(format, tmp, **params)
+        tmp.rename(path)
+
+    return str(path)
+
+def git_revision():
+
+    try:
+        return subprocess.run(['git','rev-parse','--short','HEAD'],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            check=True).stdout.decode().strip()
+    except (OSError,subprocess.CalledProcessError):
+        return None
+
+if __name__ == '__main__':
+
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        print(json.dumps(run_child(*sys.argv[2:])))
+        sys.exit(0)
+
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--hosts', type=int, default=1000,
+        help='Hosts per corpus file. Default: %(default)s')
+    ap.add_argument('--ports', type=int, default=5,
+        help='Open ports (or Burp items) per host. Default: %(default)s')
+    ap.add_argument('--scripts', action='store_true',
+        help='Include nmap script output.')
+    ap.add_argument('--plugins', type=int, default=50,
+        help='Distinct Nessus plugins. Default: %(default)s')
+    ap.add_argument('--plugins-per-port', type=int, default=3,
+        help='Nessus findings per port. Default: %(default)s')
+    ap.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS),
+        default=list(BENCHMARKS), metavar='NAME',
+        help='Benchmarks to run. Default: all')
+    ap.add_argument('--corpus-dir', default=str(ROOT/'benchmarks'/'corpus'),
+        help='Directory where generated files are kept. Default: %(default)s')
+    ap.add_argument('--results', default=str(ROOT/'benchmarks'/'results.json'),
+        help='JSON file results are appended to. Default: %(default)s')
+    ap.add_argument('--label', default='',
+        help='Label stored with the run to ease comparisons.')
+    args = ap.parse_args()
+
+    os.makedirs(args.corpus_dir, exist_ok=True)
+
+    params = dict(hosts=args.hosts, ports=args.ports)
+    format_params = {
+        'nmap':dict(params, scripts=args.scripts),
+        'masscan':params,
+        'nessus':dict(params, plugins=args.plugins,
+            plugins_per_port=args.plugins_per_port),
+        'burp':params,
+    }
+
+    run_record = {'label':args.label, 'revision':git_revision(),
+        'python':platform.python_version(), 'params':vars(args),
+        'results':{}}
+
+    print(f'{"benchmark":<36}{"wall (s)":>10}{"hosts/s":>12}{"peak RSS (MiB)":>16}')
+    for name in args.benchmarks:
+
+        format = BENCHMARKS[name][0]
+        input_file = corpus_file(args.corpus_dir, format,
+            **format_params[format])
+
+        result = run(name, input_file, args.hosts)
+        run_record['results'][name] = result
+
+        if 'error' in result:
+            print(f'{name:<36}{result["error"]:>38}')
+        else:
+            print(f'{name:<36}{result["wall"]:>10.3f}' \
+                f'{result["hosts_per_second"]:>12.0f}' \
+                f'{result["peak_rss"]/1024/1024:>16.1f}' + \
+                ''.join(f'  {heading}: {result[key]:.4g}'
+                    for key,heading in MEASUREMENTS.items()
+                    if result.get(key) != None))
+
+    try:
+        with open(args.results) as infile:
+            runs = json.load(infile)
+    except (OSError,ValueError):
+        runs = []
+
+    runs.append(run_record)
+
+    with open(args.results,'w') as outfile:
+        json.dump(runs, outfile, indent=2)
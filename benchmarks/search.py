@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+'''Compare precompiled PortSearch predicates with per-port searches.
+
+Hosts are built in memory from the same service catalogue used by the
+corpus generator so that parsing costs are excluded. The baseline
+mirrors the former behaviour of xml_dumper: each raw expression is
+passed to re.search for every port of every host, leaving compilation
+to the re module's internal cache.
+
+Usage: python3 benchmarks/search.py [--hosts N] [--ports N]
+           [--expressions N]
+'''
+
+from pathlib import Path
+from time import perf_counter
+import argparse
+import random
+import re
+import sys
+
+ROOT = Path(__file__).absolute().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / 'benchmarks'))
+
+import corpus
+from parsuite.abstractions.xml.generic.network_host import (Host,Port,
+    Service,PortSearch)
+
+# Expressions resemble those passed to --sreg in practice. None of them
+# match every service, forcing most ports to be tested against all.
+EXPRESSIONS = ['^http$','^https?-','ssl/http','^ftp','^ssh$','telnet',
+    '^smtps?$','^imaps?$','^pop3s?$','^domain$','microsoft-ds',
+    'ms-sql','^mysql$','postgres','^vnc','ms-wbt','^ldaps?$','^rdp$',
+    'oracle','^snmp$','netbios','msrpc','^nfs$','rpcbind','^sip',
+    'x11','kerberos','winrm','^redis$','mongo']
+
+def build_hosts(count, ports, seed=0):
+
+    rand = random.Random(seed)
+    hosts = []
+
+    for index in range(count):
+
+        host = Host(ipv4_address=corpus.address(index))
+        for number,name,product,tunnel in corpus.host_services(rand, ports):
+            host.append_port(Port(number=number,protocol='tcp',
+                state='open',service=Service(name=name,product=product,
+                    tunnel=tunnel,extrainfo=rand.choice([None,
+                        'protocol 2.0','Ubuntu Linux','workgroup: CORP']))))
+
+        hosts.append(host)
+
+    return hosts
+
+def raw_search(hosts, expressions):
+    '''Count matching ports by searching each raw expression against
+    every port.
+    '''
+
+    matches = 0
+    for host in hosts:
+        for port in host.tcp_ports.values():
+            for expression in expressions:
+                if re.search(expression,port.service.name) or \
+                        (port.service.extrainfo and
+                            re.search(expression,port.service.extrainfo)):
+                    matches += 1
+                    break
+
+    return matches
+
+def compiled_search(hosts, expressions):
+    '''Count matching ports with a single precompiled PortSearch.
+    '''
+
+    search = PortSearch(service_search=expressions,sreg=True)
+
+    matches = 0
+    for host in hosts:
+        for port in host.tcp_ports.values():
+            if search.match_port(port): matches += 1
+
+    return matches
+
+def sockets(hosts, expressions):
+    '''Produce sockets as xml_dumper does, compiling the search once.
+    '''
+
+    search = PortSearch(service_search=expressions,sreg=True)
+    return sum(len(h.to_sockets(search=search)) for h in hosts)
+
+def timed(func, *args):
+
+    start = perf_counter()
+    result = func(*args)
+    return perf_counter()-start,result
+
+if __name__ == '__main__':
+
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--hosts', type=int, default=50000,
+        help='Hosts to search. Default: %(default)s')
+    ap.add_argument('--ports', type=int, default=5,
+        help='Open ports per host. Default: %(default)s')
+    ap.add_argument('--expressions', type=int, default=20,
+        choices=range(1,len(EXPRESSIONS)+1), metavar='N',
+        help='Expressions searched, at most ' \
+            f'{len(EXPRESSIONS)}. Default: %(default)s')
+    args = ap.parse_args()
+
+    expressions = EXPRESSIONS[:args.expressions]
+
+    print(f'[+] Building {args.hosts} hosts', file=sys.stderr)
+    hosts = build_hosts(args.hosts, args.ports)
+
+    raw_time,raw_matches = timed(raw_search,hosts,expressions)
+    compiled_time,compiled_matches = timed(compiled_search,hosts,
+        expressions)
+    sockets_time,sockets_count = timed(sockets,hosts,expressions)
+
+    if raw_matches != compiled_matches:
+        sys.exit(f'Match counts differ: {raw_matches} != {compiled_matches}')
+
+    print(f'{"search":<24}{"time (s)":>10}{"ports/s":>14}')
+    for name,elapsed in [('raw re.search',raw_time),
+            ('PortSearch',compiled_time),
+            ('PortSearch to_sockets',sockets_time)]:
+        print(f'{name:<24}{elapsed:>10.3f}' \
+            f'{args.hosts*args.ports/elapsed:>14.0f}')
+
+    print(f'\nSpeedup: {raw_time/compiled_time:.1f}x ' \
+        f'({compiled_matches} matching ports)')
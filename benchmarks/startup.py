@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+'''Compare cold and warm start times of the parsuite entry point.
+
+A cold start runs against an empty cache directory, forcing the
+module manifest to be rebuilt. A warm start reuses the manifest
+written by the previous run.
+
+Usage: python3 benchmarks/startup.py [-r RUNS] [command ...]
+'''
+
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+
+ROOT = Path(__file__).absolute().parent.parent
+ENTRY = ROOT / 'parsuite.py'
+
+COMMANDS = [
+    ['-h'],
+    ['ntlm_hasher','-h'],
+    ['xml_dumper','-h'],
+    ['nessus_output_dumper','-h'],
+]
+
+def run(command,cache_dir):
+
+    env = dict(os.environ,PARSUITE_CACHE_DIR=cache_dir)
+
+    start = perf_counter()
+    subprocess.run([sys.executable,str(ENTRY)]+command,env=env,
+        stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL)
+    return perf_counter()-start
+
+def bench(command,runs):
+
+    cold,warm = [],[]
+
+    with TemporaryDirectory() as tmp:
+
+        cache_dir = os.path.join(tmp,'cache')
+
+        for i in range(runs):
+
+            shutil.rmtree(cache_dir,ignore_errors=True)
+            cold.append(run(command,cache_dir))
+            warm.append(run(command,cache_dir))
+
+    return median(cold),median(warm)
+
+if __name__ == '__main__':
+
+    ap = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    ap.add_argument('--runs','-r',type=int,default=10,
+        help='Runs per command. Default: %(default)s')
+    ap.add_argument('command',nargs='*',
+        help='Arguments passed to parsuite.py. Default: a fixed set')
+    args = ap.parse_args()
+
+    commands = [args.command] if args.command else COMMANDS
+
+    print(f'{"command":<32}{"cold (ms)":>12}{"warm (ms)":>12}')
+    for command in commands:
+        cold,warm = bench(command,args.runs)
+        print(f'{" ".join(command):<32}{cold*1000:>12.1f}{warm*1000:>12.1f}')
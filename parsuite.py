@@ -3,12 +3,13 @@
 import argparse
 import os
 from pathlib import Path
-from sys import exit, modules as sys_modules
+from sys import exit, argv as sys_argv, modules as sys_modules
 from re import search
 
 from parsuite import modules
 from parsuite import helpers
 from parsuite.core.suffix_printer import *
+from parsuite.core import profiler
 from parsuite.core.argument import (Argument,ArgumentGroup,
     MutuallyExclusiveArgumentGroup)
 
@@ -22,8 +23,31 @@ def add_args(dst_obj,args):
 
 if __name__ == '__main__':
 
+    # Options preceding the module name, shared with modules.select
+    global_parser = argparse.ArgumentParser(add_help=False)
+    gp = global_parser
+
+    gp.add_argument('--profile',
+        action='store_true',
+        help='Profile module execution with cProfile and report hotspots.')
+    gp.add_argument('--profile-memory',
+        action='store_true',
+        help='Trace allocations with tracemalloc and report peak '
+        'allocation sites.')
+    gp.add_argument('--profile-output',
+        help='File to write the profile report to. Default: stderr')
+    gp.add_argument('--profile-limit',
+        type=int,
+        default=25,
+        help='Number of entries in each profile report. Default: %(default)s')
+    gp.add_argument('--profile-sort',
+        choices=profiler.SORT_KEYS,
+        default='cumulative',
+        help='Sort key for CPU hotspots. Default: %(default)s')
+
     ap = argument_parser = argparse.ArgumentParser(
-        description='Parse the planet.')
+        description='Parse the planet.',
+        parents=[global_parser])
 
     subparsers = ap.add_subparsers(help='Parser module selection.')
     subparsers.required = True
@@ -32,10 +56,19 @@ if __name__ == '__main__':
     # strap arguments from modules as argument groups
     esprint('Loading modules')
 
+    subs = {}
     for handle,module in modules.handles.items():
 
-        helpers.validate_module(module)
-        sub = subparsers.add_parser(handle,help=module.help)
+        subs[handle] = subparsers.add_parser(handle,help=module.help)
+
+    # only the selected module is loaded; the help strings for all
+    # other modules are read from their declarations
+    selected = modules.select(sys_argv[1:],global_parser)
+
+    if selected:
+
+        module = modules.handles[selected]
+        sub = subs[selected]
 
         for arg in module.args:
 
@@ -57,6 +90,7 @@ if __name__ == '__main__':
 
                 sub.add_argument(*arg.pargs, **arg.kwargs)
 
+    modules.manifest.save()
     args = ap.parse_args()
     
     if 'input_file' in args:
@@ -64,10 +98,18 @@ if __name__ == '__main__':
     elif 'input_files' in args:
         helpers.validate_input_files(args.input_files)
 
+    helpers.validate_module(modules.handles[args.module].module)
     esprint(f'Executing module: {args.module}')
 
-    modules.handles[args.module].parse(
-        **vars(args)
-    )
+    kwargs = vars(args)
+    profile_kwargs = dict(
+        cpu=kwargs.pop('profile'),
+        memory=kwargs.pop('profile_memory'),
+        output_file=kwargs.pop('profile_output'),
+        limit=kwargs.pop('profile_limit'),
+        sort=kwargs.pop('profile_sort'))
+
+    profiler.profile(modules.handles[args.module].parse, kwargs,
+        **profile_kwargs)
     
     esprint('Module execution complete. Exiting.')
@@ -1,3 +1,12 @@
-from . import parsers
-from . import core
-from . import abstractions
+from importlib import import_module
+
+# Subpackages are imported on first access so that loading the
+# module registry doesn't drag in lxml and friends.
+SUBPACKAGES = ['parsers','core','abstractions']
+
+def __getattr__(name):
+
+    if name in SUBPACKAGES:
+        return import_module(f'{__name__}.{name}')
+
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
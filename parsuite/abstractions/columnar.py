@@ -0,0 +1,280 @@
+from parsuite.abstractions.xml.generic.network_host import PortDict
+from parsuite import helpers
+from array import array
+from itertools import compress
+
+# Highest port number that can be stored
+MAX_PORT = 65535
+
+# Incremented whenever the columns change, which invalidates every
+# ScanStore held in the scan cache
+VERSION = 1
+
+def mask_and(*masks):
+    '''Combine masks of equal length such that an element is set only
+    when it is set in every mask. The masks are treated as integers so
+    that the operation runs in C rather than per element.
+    '''
+
+    length = len(masks[0])
+    value = int.from_bytes(masks[0],'little')
+    for mask in masks[1:]:
+        value &= int.from_bytes(mask,'little')
+
+    return value.to_bytes(length,'little')
+
+def lookup_table(size,values):
+    '''Return a bytes object of length size with a 1 at each offset in
+    values. Mapping a column through the table's __getitem__ yields a
+    mask.
+    '''
+
+    table = bytearray(size)
+    for value in values:
+        if value < size: table[value] = 1
+
+    return bytes(table)
+
+class Codes(list):
+    '''A list of distinct values where the position of a value is its
+    code. Code 0 is reserved for None.
+    '''
+
+    def __init__(self,values=[],limit=None):
+
+        super().__init__([None])
+        self.codes = {None:0}
+        self.limit = limit
+        for value in values: self.code(value)
+
+    def code(self,value):
+        '''Return the code for a value, assigning one when the value
+        has not been seen.
+        '''
+
+        code = self.codes.get(value)
+        if code == None:
+
+            code = len(self)
+            if self.limit and code >= self.limit:
+                raise ValueError(
+                    f'No more than {self.limit} distinct values are supported'
+                )
+
+            self.codes[value] = code
+            self.append(value)
+
+        return code
+
+    def lookup(self,values):
+        '''Return the codes for the values that have been seen.
+        '''
+
+        return [self.codes[v] for v in values if v in self.codes]
+
+class ScanStore:
+    '''Hosts and ports held in parallel typed arrays rather than as
+    object graphs. Each port is a row across the port columns and
+    refers to its host by position in the host columns:
+
+    Port columns:
+      host - array('I') - position of the host
+      number - array('H') - port number
+      protocol - bytearray - code from ScanStore.protocols
+      state - bytearray - code from ScanStore.states
+      service - array('I') - code from ScanStore.services (name)
+      current - bytearray - 1 when the row is the port held by the
+        host's PortDict for the protocol and number
+
+    Host columns:
+      addresses - list - IPv4, or IPv6, address
+      hostnames - list - tuple of hostnames
+
+    Queries build byte masks over the rows from these columns and
+    combine them, mirroring the filters applied by Host.to_addresses,
+    Host.to_sockets and Host.to_ports for exact service searches.
+    '''
+
+    def __init__(self):
+
+        self.protocols = Codes(PortDict.VALID_PROTOCOLS,limit=256)
+        self.states = Codes(limit=256)
+        self.services = Codes()
+
+        self.host = array('I')
+        self.number = array('H')
+        self.protocol = bytearray()
+        self.state = bytearray()
+        self.service = array('I')
+        self.current = bytearray()
+
+        self.addresses = []
+        self.hostnames = []
+
+    def __len__(self):
+
+        return len(self.number)
+
+    @staticmethod
+    def from_hosts(hosts):
+        '''Build a ScanStore from an iterable of Host objects.
+        '''
+
+        store = ScanStore()
+        for host in hosts: store.add_host(host)
+        return store
+
+    def add_host(self,host):
+        '''Append a Host object and its ports to the columns.
+        '''
+
+        position = len(self.addresses)
+
+        self.addresses.append(host.ipv4_address or host.ipv6_address)
+        self.hostnames.append(tuple(host.hostnames))
+
+        for port in host.ports:
+
+            if port.number > MAX_PORT:
+                raise ValueError(f'Invalid port number: {port.number}')
+
+            self.host.append(position)
+            self.number.append(port.number)
+            self.protocol.append(self.protocols.code(port.protocol))
+            self.state.append(self.states.code(port.state))
+            self.service.append(self.services.code(
+                port.service.name if port.service else None))
+
+            # PortDict overrides get with its query interface
+            self.current.append(dict.get(
+                host.__getattribute__(port.protocol+'_ports'),
+                port.number) is port)
+
+    # =====
+    # MASKS
+    # =====
+
+    def protocol_mask(self,protocols):
+
+        return bytes(self.protocol).translate(
+            lookup_table(256,self.protocols.lookup(protocols)))
+
+    def state_mask(self,states):
+
+        return bytes(self.state).translate(
+            lookup_table(256,self.states.lookup(states)))
+
+    def port_mask(self,numbers):
+
+        return bytes(map(lookup_table(MAX_PORT+1,numbers).__getitem__,
+            self.number))
+
+    def service_mask(self,names):
+
+        return bytes(map(lookup_table(len(self.services),
+                self.services.lookup(names)).__getitem__,
+            self.service))
+
+    def hosts_matching(self,mask):
+        '''Return the set of host positions with at least one row set
+        in mask.
+        '''
+
+        return set(compress(self.host,mask))
+
+    def host_filter(self,port_search=[],service_search=[],
+            port_required=False):
+        '''Return the set of host positions passing the host level
+        filters, or None when no filter applies:
+
+        port_search - every port number must be open on the host
+        service_search - any port must have a matching service name
+        port_required - at least one port must be open
+        '''
+
+        hosts = None
+
+        if port_required or port_search:
+            open_mask = self.state_mask(['open'])
+
+        if port_required:
+            hosts = self.hosts_matching(open_mask)
+
+        for number in port_search:
+            matched = self.hosts_matching(mask_and(open_mask,
+                self.port_mask([int(number)])))
+            hosts = matched if hosts == None else hosts & matched
+
+        if service_search:
+            matched = self.hosts_matching(self.service_mask(service_search))
+            hosts = matched if hosts == None else hosts & matched
+
+        return hosts
+
+    def host_addresses(self,position,fqdns=False):
+
+        addresses = []
+        if fqdns: addresses += self.hostnames[position]
+        if self.addresses[position]:
+            addresses.append(self.addresses[position])
+
+        return helpers.sort_addresses(addresses,unique=False)
+
+    # =======
+    # OUTPUTS
+    # =======
+
+    def to_addresses(self,fqdns=False,port_search=[],service_search=[],
+            port_required=False,*args,**kwargs):
+        '''Return addresses of hosts passing the host level filters, in
+        the order hosts were added.
+        '''
+
+        hosts = self.host_filter(port_search,service_search,port_required)
+
+        output = []
+        for position in range(len(self.addresses)):
+            if hosts == None or position in hosts:
+                output += self.host_addresses(position,fqdns)
+
+        return output
+
+    def to_sockets(self,fqdns=False,protocols=['tcp'],port_search=[],
+            service_search=[],*args,**kwargs):
+        '''Return sockets for ports matching the protocols, port numbers
+        and service names, sorted per host. As with Host.to_sockets,
+        hosts without open ports aren't excluded.
+        '''
+
+        masks = [bytes(self.current),self.protocol_mask(protocols)]
+
+        if port_search:
+            masks.append(self.port_mask([int(p) for p in port_search]))
+
+        if service_search:
+            masks.append(self.service_mask(service_search))
+
+        mask = mask_and(*masks)
+
+        output,sockets,last = [],[],None
+        for position,number in zip(compress(self.host,mask),
+                compress(self.number,mask)):
+
+            if position != last:
+                output += helpers.sort_sockets(sockets,unique=False)
+                sockets,last = [],position
+                addresses = self.host_addresses(position,fqdns)
+
+            sockets += [f'{address}:{number}' for address in addresses]
+
+        return output+helpers.sort_sockets(sockets,unique=False)
+
+    def to_ports(self,service_search=[],*args,**kwargs):
+        '''Return port numbers of all ports, or of ports with matching
+        service names. As with Host.to_ports, hosts without open ports
+        aren't excluded.
+        '''
+
+        if not service_search: return list(self.number)
+
+        return list(compress(self.number,self.service_mask(service_search)))
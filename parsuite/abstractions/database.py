@@ -0,0 +1,602 @@
+from parsuite.abstractions.xml.generic.network_host import (Service,
+    Port, PortSearch)
+from parsuite import helpers
+from datetime import datetime
+import sqlite3
+
+# Incremented whenever the schema changes
+SCHEMA_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL,
+    digest TEXT NOT NULL UNIQUE,
+    format TEXT NOT NULL,
+    ingested TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS hosts (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    address TEXT,
+    status TEXT,
+    status_reason TEXT
+);
+
+CREATE TABLE IF NOT EXISTS addresses (
+    host_id INTEGER NOT NULL REFERENCES hosts(id),
+    type TEXT NOT NULL,
+    address TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS hostnames (
+    host_id INTEGER NOT NULL REFERENCES hosts(id),
+    hostname TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS services (
+    id INTEGER PRIMARY KEY,
+    name TEXT, conf TEXT, extrainfo TEXT, method TEXT, version TEXT,
+    product TEXT, tunnel TEXT, proto TEXT, rpcnum TEXT, hostname TEXT,
+    ostype TEXT, devicetype TEXT
+);
+
+CREATE TABLE IF NOT EXISTS ports (
+    id INTEGER PRIMARY KEY,
+    host_id INTEGER NOT NULL REFERENCES hosts(id),
+    protocol TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    state TEXT,
+    reason TEXT,
+    service_id INTEGER REFERENCES services(id)
+);
+
+CREATE TABLE IF NOT EXISTS scripts (
+    port_id INTEGER NOT NULL REFERENCES ports(id),
+    script_id TEXT,
+    output TEXT
+);
+
+CREATE TABLE IF NOT EXISTS plugins (
+    id INTEGER PRIMARY KEY,
+    name TEXT, family TEXT, type TEXT, risk_factor TEXT, synopsis TEXT,
+    description TEXT, solution TEXT
+);
+
+CREATE TABLE IF NOT EXISTS findings (
+    host_id INTEGER NOT NULL REFERENCES hosts(id),
+    protocol TEXT,
+    port INTEGER,
+    plugin_id INTEGER REFERENCES plugins(id),
+    service_name TEXT,
+    severity INTEGER,
+    plugin_output TEXT
+);
+
+CREATE INDEX IF NOT EXISTS hosts_address ON hosts(address);
+CREATE INDEX IF NOT EXISTS addresses_address ON addresses(address);
+CREATE INDEX IF NOT EXISTS addresses_host ON addresses(host_id);
+CREATE INDEX IF NOT EXISTS hostnames_host ON hostnames(host_id);
+CREATE INDEX IF NOT EXISTS hostnames_hostname ON hostnames(hostname);
+CREATE INDEX IF NOT EXISTS services_name ON services(name);
+CREATE INDEX IF NOT EXISTS ports_host ON ports(host_id,protocol,number);
+CREATE INDEX IF NOT EXISTS ports_number ON ports(number,state);
+CREATE INDEX IF NOT EXISTS ports_service ON ports(service_id);
+CREATE INDEX IF NOT EXISTS scripts_port ON scripts(port_id);
+CREATE INDEX IF NOT EXISTS findings_host ON findings(host_id);
+CREATE INDEX IF NOT EXISTS findings_plugin ON findings(plugin_id);
+'''
+
+# Tables receiving rows during ingestion, in insertion order, with the
+# number of columns of each
+TABLES = {'hosts':5,'addresses':3,'hostnames':2,'services':13,'ports':7,
+    'scripts':3,'plugins':8,'findings':7}
+
+# Hosts buffered before their rows are inserted
+BATCH_SIZE = 5000
+
+class ScanDatabase:
+    '''Hosts, ports, services, scripts and Nessus findings from any
+    number of scan files held in an indexed SQLite database.
+
+    Each ingested file is recorded by the digest of its content so that
+    it is only ingested once. Hosts are recorded per file; queries merge
+    records sharing an address in the order files were ingested,
+    mirroring xml_dumper:
+
+    - Ports recorded for the same address, protocol and port number
+      are merged as by Host.merge_port: open states and the richest
+      service are kept
+    - Port and service filters consider the merged ports of the address
+    - Hosts are returned in the order their address was first ingested
+
+    Hosts without an IPv4 or IPv6 address are recorded but never
+    returned by queries.
+    '''
+
+    def __init__(self,path):
+
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode = WAL')
+        self.db.execute('PRAGMA synchronous = NORMAL')
+
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version and version != SCHEMA_VERSION:
+            raise ValueError(
+                f'Database schema version {version} is not supported. ' \
+                f'Expected: {SCHEMA_VERSION}'
+            )
+
+        self.db.executescript(SCHEMA)
+        self.db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+        # Attribute values of each service mapped to their id
+        self.services = {row[1:]:row[0] for row in
+            self.db.execute('SELECT * FROM services')}
+
+    def close(self):
+
+        self.db.close()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self,*args):
+
+        self.close()
+
+    # =========
+    # INGESTION
+    # =========
+
+    def next_id(self,table):
+
+        return self.db.execute(
+            f'SELECT coalesce(max(id),0)+1 FROM {table}').fetchone()[0]
+
+    def ingested(self,digest):
+        '''Return the path of the file ingested with digest, or None.
+        '''
+
+        row = self.db.execute('SELECT path FROM files WHERE digest = ?',
+            (digest,)).fetchone()
+
+        return row[0] if row else None
+
+    def ingest(self,path):
+        '''Ingest a scan file, returning the number of hosts recorded.
+        None is returned when a file with the same content has already
+        been ingested and False when the format is not recognized.
+
+        All rows for the file are inserted in a single transaction.
+        '''
+
+        fingerprint = helpers.fingerprint_file(path)
+        if not fingerprint: return False
+
+        digest = helpers.file_digest(path)
+        if self.ingested(digest): return None
+
+        try:
+
+            with self.db:
+
+                file_id = self.db.execute(
+                    'INSERT INTO files (path,digest,format,ingested) ' \
+                    'VALUES (?,?,?,?)',
+                    (str(path),digest,fingerprint,
+                        datetime.now().isoformat())).lastrowid
+
+                return Ingestion(self,file_id).run(
+                    getattr(Ingestion,'read_'+fingerprint)(path))
+
+        except Exception:
+
+            # Services recorded by the failed transaction were rolled back
+            self.services = {row[1:]:row[0] for row in
+                self.db.execute('SELECT * FROM services')}
+            raise
+
+    # =======
+    # QUERIES
+    # =======
+
+    def host_condition(self,search=None,port_required=False):
+        '''Return an SQL condition and parameters restricting h.address
+        to addresses that pass the port level host filters:
+
+        search.port_search - every port number must be open
+        port_required - at least one port must be open
+
+        Services are searched once ports are merged, see merged_ports.
+        '''
+
+        conditions,params = [],[]
+        subquery = 'h.address IN (SELECT h2.address FROM hosts h2 ' \
+            'JOIN ports p2 ON p2.host_id = h2.id'
+
+        if port_required:
+            conditions.append(subquery+' WHERE p2.state = \'open\')')
+
+        for number in (search.port_search if search else []):
+            conditions.append(subquery+' WHERE p2.number = ? AND ' \
+                'p2.state = \'open\')')
+            params.append(number)
+
+        if not conditions: return '1',[]
+
+        return ' AND '.join(conditions),params
+
+    def hostnames(self):
+        '''Return a dictionary of {address:[hostnames]} for each
+        address with at least one hostname.
+        '''
+
+        hostnames = {}
+        for address,hostname in self.db.execute(
+                'SELECT DISTINCT h.address, n.hostname FROM hostnames n ' \
+                'JOIN hosts h ON h.id = n.host_id ' \
+                'WHERE h.address IS NOT NULL ORDER BY n.rowid'):
+            hostnames.setdefault(address,[]).append(hostname)
+
+        return hostnames
+
+    def merged_ports(self,protocols=None,port_search=[],
+            port_required=False):
+        '''Yield (address, [Port]) for each address in the order
+        addresses were first ingested. Ports recorded for the same
+        address, protocol and port number are merged in the order they
+        were ingested, as by Host.merge_port, and listed in the order
+        they were first recorded.
+
+        protocols - list - protocols of the ports, or None for all
+        port_search - list - port numbers of the ports, or empty for all
+        port_required - only addresses with an open port are yielded
+        '''
+
+        conditions,params = ['h.address IS NOT NULL'],[]
+
+        if protocols != None:
+            conditions.append(
+                f'p.protocol IN ({",".join("?"*len(protocols))})')
+            params += protocols
+
+        if port_search:
+            conditions.append(
+                f'p.number IN ({",".join("?"*len(port_search))})')
+            params += port_search
+
+        condition,host_params = self.host_condition(
+            port_required=port_required)
+        conditions.append(condition)
+        params += host_params
+
+        # Rows of an address are adjacent since min(id) is unique to
+        # each address
+        query = 'SELECT h.address, p.protocol, p.number, p.state, ' \
+                'p.service_id, s.* FROM ports p ' \
+            'JOIN hosts h ON h.id = p.host_id ' \
+            'JOIN (SELECT address, min(id) AS first FROM hosts ' \
+                'GROUP BY address) f ON f.address = h.address ' \
+            'LEFT JOIN services s ON s.id = p.service_id ' \
+            f'WHERE {" AND ".join(conditions)} ' \
+            'ORDER BY f.first, p.id'
+
+        # {(protocol,number):Port}
+        ports,last = {},None
+        for row in self.db.execute(query,params):
+
+            address,protocol,number,state,service_id = row[:5]
+
+            if address != last:
+                if ports: yield last,list(ports.values())
+                ports,last = {},address
+
+            service = Service.shared(**dict(zip(Service.ATTRIBUTES,
+                row[6:]))) if service_id != None else None
+            port = Port(number=number,state=state,protocol=protocol,
+                service=service)
+
+            key = (protocol,number)
+            if key in ports:
+                ports[key] = Port.merge(ports[key],port)
+            else:
+                ports[key] = port
+
+        if ports: yield last,list(ports.values())
+
+    def to_addresses(self,fqdns=False,port_search=[],service_search=[],
+            sreg=False,port_required=False,search=None,*args,**kwargs):
+        '''Yield a sorted list of addresses, and hostnames when fqdns
+        is set, for each address passing the host level filters.
+        '''
+
+        search = PortSearch.from_arguments(search,port_search,
+            service_search,sreg)
+        condition,params = self.host_condition(search,port_required)
+        hostnames = self.hostnames() if fqdns else {}
+
+        # Services are searched once ports have been merged
+        if search.service_search:
+            matches = set(address for address,ports in
+                self.merged_ports(port_required=port_required)
+                if [p for p in ports if search.match_service(p.service)])
+
+        for address, in self.db.execute(
+                'SELECT h.address FROM hosts h ' \
+                f'WHERE h.address IS NOT NULL AND {condition} ' \
+                'GROUP BY h.address ORDER BY min(h.id)',params):
+
+            if search.service_search and not address in matches:
+                continue
+
+            yield helpers.sort_addresses(
+                hostnames.get(address,[])+[address],unique=False)
+
+    def current_ports(self,protocols=['tcp'],search=None,
+            port_required=False):
+        '''Yield (address, protocol, number, service) for each merged
+        port, see merged_ports, grouped by address in the order
+        addresses were first ingested. Ports are filtered by protocol,
+        port number and service.
+        '''
+
+        search = search or PortSearch()
+
+        for address,ports in self.merged_ports(protocols,
+                search.port_search,port_required):
+
+            for port in ports:
+                if search.match_service(port.service):
+                    yield address,port.protocol,port.number,port.service
+
+    def to_sockets(self,fqdns=False,protocols=['tcp'],scheme_layer=None,
+            port_search=[],service_search=[],sreg=False,extrainfo=False,
+            port_required=False,search=None,*args,**kwargs):
+        '''Yield a sorted list of sockets for each address, formatted as
+        by Host.to_sockets.
+        '''
+
+        search = PortSearch.from_arguments(search,port_search,
+            service_search,sreg)
+        hostnames = self.hostnames() if fqdns else {}
+
+        output,last = [],None
+        for address,protocol,number,service in self.current_ports(
+                protocols,search,port_required):
+
+            if address != last:
+                if output: yield helpers.sort_sockets(output,unique=False)
+                output,last = [],address
+                addresses = helpers.sort_addresses(
+                    hostnames.get(address,[])+[address],unique=False)
+
+            # =======================
+            # BUILD THE SCHEME PREFIX
+            # =======================
+
+            tunnel = service.tunnel if service else None
+
+            if scheme_layer == 'transport':
+                if tunnel in ['ssl','tls']:
+                    scheme = tunnel+'/'+protocol+'://'
+                else:
+                    scheme = protocol+'://'
+            elif scheme_layer == 'application' and service:
+                if service.name == 'http' and tunnel in ['ssl','tls']:
+                    scheme = service.name+'s://'
+                else:
+                    scheme = service.name+'://'
+            else:
+                scheme = ''
+
+            # ====================
+            # FORMAT THE ADDRESSES
+            # ====================
+
+            for host_address in addresses:
+
+                addr = f'{scheme}{host_address}:{number}'
+
+                if extrainfo and service:
+
+                    info = []
+                    if service.product:
+                        info.append(f'Product:::{service.product}')
+
+                    if service.extrainfo:
+                        info.append(f'ExtraInfo:::{service.extrainfo}')
+
+                    if service.version:
+                        info.append(f'Version:::{service.version}')
+
+                    addr += ","+"; ".join(info)
+
+                output.append(addr)
+
+        if output: yield helpers.sort_sockets(output,unique=False)
+
+    def to_uris(self,transport_layer=False,*args,**kwargs):
+
+        return self.to_sockets(*args,scheme_layer='transport'
+            if transport_layer else 'application',**kwargs)
+
+    def to_ports(self,service_search=[],sreg=False,port_required=False,
+            search=None,*args,**kwargs):
+        '''Yield port numbers of every merged port, or those with
+        matching services, in the order they were first recorded per
+        address.
+        '''
+
+        search = PortSearch.from_arguments(search,
+            service_search=service_search,sreg=sreg)
+
+        yield [port.number
+            for address,ports in self.merged_ports(
+                port_required=port_required)
+            for port in ports if search.match_service(port.service)]
+
+    def to_services(self,*args,**kwargs):
+        '''Yield a row of socket, protocol, service name, product,
+        version and extrainfo for each merged port with a service
+        product. Empty values are omitted, as by Service.to_row.
+        '''
+
+        yield [[f'{address}:{port.number}',port.protocol] +
+                port.service.to_row()
+            for address,ports in self.merged_ports()
+            for port in ports
+            if port.service and port.service.product]
+
+class Ingestion:
+    '''Rows produced from the hosts of a single file, buffered and
+    inserted into a ScanDatabase with executemany.
+    '''
+
+    def __init__(self,database,file_id):
+
+        self.database = database
+        self.db = database.db
+        self.file_id = file_id
+        self.rows = {table:[] for table in TABLES}
+        self.ids = {table:database.next_id(table)
+            for table in ['hosts','ports','services']}
+        self.plugins = set()
+        self.count = 0
+
+    def run(self,records):
+        '''Insert the rows for each (host, report_items) record and
+        return the number of hosts.
+        '''
+
+        for host,report_items in records:
+
+            host_id = self.add_host(host)
+            for report_item in report_items:
+                self.add_report_item(host_id,report_item)
+
+            if not self.count % BATCH_SIZE: self.flush()
+
+        self.flush()
+
+        return self.count
+
+    def flush(self):
+
+        for table,rows in self.rows.items():
+            if not rows: continue
+
+            # Plugin details are replaced by those of the latest file
+            verb = 'INSERT OR REPLACE' if table == 'plugins' else 'INSERT'
+
+            self.db.executemany(f'{verb} INTO {table} VALUES ' \
+                f'({",".join("?"*TABLES[table])})',rows)
+            rows.clear()
+
+    def next_id(self,table):
+
+        value = self.ids[table]
+        self.ids[table] += 1
+        return value
+
+    def service_id(self,service):
+        '''Return the id of a service, recording it when no service
+        with the same attribute values has been recorded.
+        '''
+
+        if service == None: return None
+
+        values = tuple(service.__getattribute__(a)
+            for a in Service.ATTRIBUTES)
+
+        service_id = self.database.services.get(values)
+        if service_id == None:
+            service_id = self.next_id('services')
+            self.database.services[values] = service_id
+            self.rows['services'].append((service_id,)+values)
+
+        return service_id
+
+    def add_host(self,host):
+
+        host_id = self.next_id('hosts')
+        self.count += 1
+
+        self.rows['hosts'].append((host_id,self.file_id,
+            host.ipv4_address or host.ipv6_address,host.status,
+            host.status_reason))
+
+        for type in ['ipv4','ipv6','mac']:
+            address = host.__getattribute__(type+'_address')
+            if address:
+                self.rows['addresses'].append((host_id,type,address))
+
+        for hostname in host.hostnames:
+            self.rows['hostnames'].append((host_id,hostname))
+
+        for port in host.ports:
+
+            port_id = self.next_id('ports')
+            self.rows['ports'].append((port_id,host_id,port.protocol,
+                port.number,port.state,port.reason,
+                self.service_id(port.service)))
+
+            for script in port.scripts:
+                self.rows['scripts'].append((port_id,script.id,
+                    script.output))
+
+        return host_id
+
+    def add_report_item(self,host_id,report_item):
+
+        ri = report_item
+        plugin_id = int(ri.plugin_id)
+
+        # Plugin details are repeated by every finding in a file
+        if not plugin_id in self.plugins:
+            self.plugins.add(plugin_id)
+            self.rows['plugins'].append((plugin_id,ri.plugin_name,
+                ri.plugin_family,ri.plugin_type,ri.risk_factor,
+                ri.synopsis,ri.description,ri.solution))
+
+        self.rows['findings'].append((host_id,ri.protocol,ri.port.number,
+            plugin_id,ri.svc_name,int(ri.severity),ri.plugin_output))
+
+    # =======
+    # READERS
+    # =======
+    # Each yields (host, report_items) for a file
+
+    @staticmethod
+    def read_nmap(path):
+
+        from parsuite import parsers
+        for host in parsers.iter_hosts(path): yield host,[]
+
+    @staticmethod
+    def read_masscan(path):
+
+        from parsuite import parsers
+        for host in parsers.parse_file(path).values(): yield host,[]
+
+    @staticmethod
+    def read_nessus(path):
+
+        from parsuite.parsers.nessus import (iter_report_host_elements,
+            parse_nessus_host)
+        from parsuite.abstractions.xml.nessus import build_report_item
+
+        # Hosts are selected as by iter_nessus
+        with helpers.open_input(path) as infile:
+            for erhost in iter_report_host_elements(infile):
+
+                if erhost.find('ReportItem') is None: continue
+
+                host = parse_nessus_host(erhost)
+                if not host: continue
+
+                yield host,[build_report_item(eri)
+                    for eri in erhost.iterfind('ReportItem')]
@@ -0,0 +1,417 @@
+from parsuite.abstractions.xml.nessus import *
+from parsuite import helpers
+from parsuite.core.suffix_printer import *
+from parsuite.core.output import OutputTree
+from hashlib import blake2b
+from multiprocessing import get_context
+from pathlib import Path
+import os
+import re
+
+# Characters replaced when building the directory name of a plugin
+plugin_name_re = pname_re = re.compile('(\s|\W)+')
+
+# Directory of the output directory holding stored plugin outputs
+STORE_DIRECTORY = 'plugin_outputs'
+
+def compressor(compression):
+    '''Return (function, suffix) for a compression method of the
+    plugin output store: plain, gzip or zstd. zstd requires the
+    zstandard package, raising ImportError when it's missing.
+    '''
+
+    if compression == 'plain':
+        return (lambda data: data),''
+
+    elif compression == 'gzip':
+        import gzip
+
+        # Outputs are written with a fixed mtime so that workers
+        # storing the same output produce identical files
+        return (lambda data: gzip.compress(data,6,mtime=0)),'.gz'
+
+    elif compression == 'zstd':
+        import zstandard
+        return zstandard.ZstdCompressor().compress,'.zst'
+
+    raise ValueError(f'Unsupported compression: {compression}')
+
+class PluginSummary:
+    '''Details of a plugin needed to list it once its directory has
+    been written. Summaries are returned from worker processes, so
+    they hold no XML elements.
+    '''
+
+    def __init__(self,plugin_id,risk_factor,exploitable,plugin_name,
+            index_entry):
+
+        self.plugin_id = plugin_id
+        self.risk_factor = risk_factor
+        self.exploitable = exploitable
+        self.plugin_name = plugin_name
+
+          # Line of report_item_index.txt
+        self.index_entry = index_entry
+
+class PluginWriter:
+    '''Write a directory for each plugin of a Nessus file, grouped by
+    risk factor: <base>/<risk_factor>/<plugin_name>/. Each directory
+    holds additional_info.txt along with lists of affected addresses,
+    sockets and ports for each protocol and, optionally, plugin
+    outputs.
+
+    Files are written through an OutputTree rooted at base, leaving
+    the working directory untouched, so plugins can be written
+    concurrently.
+
+    A ReportHost object is built once for each ReportHost element and
+    shared by every plugin affecting the host. Ports affected by a
+    plugin are tracked separately for each plugin.
+
+    base - absolute path to the output directory
+    plugins - {plugin_id:PluginGroup} from parsers.nessus.index_plugins
+    plugin_outputs - boolean - write plugin outputs for each protocol
+    output_store - compression method of the plugin output store, see
+    compressor. Each distinct plugin output is written once beneath
+    STORE_DIRECTORY, named by its digest, and each plugin directory
+    receives a manifest of affected sockets and the digests of their
+    outputs for each protocol. None disables the store.
+    '''
+
+    def __init__(self,base,plugins,plugin_outputs=False,
+            output_store=None):
+
+        self.base = Path(base)
+        self.plugins = plugins
+        self.plugin_outputs = plugin_outputs
+        self.output_store = output_store
+        self.output_tree = None
+        self.pid = None
+
+          # {name:ReportHost}
+        self.hosts = {}
+
+        if output_store:
+            self.compress,self.suffix = compressor(output_store)
+
+    @property
+    def tree(self):
+        '''The OutputTree used by the current process. Forked workers
+        create their own, since pending writes and writer threads
+        belong to the parent.
+        '''
+
+        if self.output_tree == None or self.pid != os.getpid():
+            self.output_tree = OutputTree(self.base)
+            self.pid = os.getpid()
+
+              # Digests of outputs stored by this process
+            self.stored = set()
+
+        return self.output_tree
+
+    def report_host(self,erhost):
+        '''Return the ReportHost object for a ReportHost element,
+        building it on first use. Ports are never added to it.
+        '''
+
+        name = erhost.get('name')
+
+        rhost = self.hosts.get(name)
+        if rhost == None:
+            rhost = self.hosts[name] = build_report_host(erhost)
+
+        return rhost
+
+    def write(self,plugin_id):
+        '''Write the directory for a plugin and return a PluginSummary.
+        '''
+
+        group = self.plugins[plugin_id]
+        protocols = group.protocols
+        summary = None
+
+        # ======================
+        # INITIALIZE REPORT HOSTS
+        # ======================
+
+        # {name:(ReportHost,{protocol:PortDict})}, the PortDicts
+        # holding the ports affected by this plugin
+        rhosts = {name:(self.report_host(erhost),{})
+            for name,erhost in group.hosts.items()}
+
+        for erhost,eri in group.items:
+            ri = build_report_item(eri)
+
+            # The first item describes the plugin in the listing
+            if summary == None:
+                summary = PluginSummary(plugin_id,ri.risk_factor,
+                    ri.exploitable,ri.plugin_name,None)
+
+            ports = rhosts[erhost.get('name')][1]
+            if not ri.protocol in ports:
+                ports[ri.protocol] = PortDict(ri.protocol)
+
+            # PortDict overrides get with its query interface
+            port = dict.get(ports[ri.protocol],ri.port.number)
+            if port == None:
+                port = ri.port
+                ports[ri.protocol].append_port(port)
+
+            # Outputs are recorded on the port that's written, which
+            # is the first reported for the number and protocol
+            if ri.plugin_output:
+                port.plugin_outputs.append_output(
+                    plugin_id, ri.plugin_output
+                )
+
+        # Handle finding index item
+        sev = ri.risk_factor.upper()
+        prefix = f'[{sev}] [{plugin_id}] '
+        suffix = ' '
+        if ri.exploit_available:
+            suffix += '[EXPLOITABLE]'
+        if ri.exploit_frameworks:
+            fws = ','.join([fw.upper() for fw in ri.exploit_frameworks])
+            suffix += f'[EXPLOIT FRAMEWORKS: {fws}]'
+        summary.index_entry = prefix+ri.plugin_name+suffix
+
+        # ================================
+        # BUILD REPORT ITEM DIRECTORY NAME
+        # ================================
+
+        ri_dir = re.sub(
+            pname_re, '_', ri.plugin_name
+        ).lower().strip('_')
+
+        # =========================
+        # BUILD DIRECTORY STRUCTURE
+        # =========================
+
+        directory = Path(ri.risk_factor,ri_dir)
+
+        # =====================
+        # WRITE CONTENT TO DISK
+        # =====================
+
+        # Additional information
+        with self.tree.open(directory / 'additional_info.txt') as of:
+            of.write(ri.additional_info())
+
+        for protocol in protocols:
+            self.write_protocol(directory,plugin_id,protocol,rhosts)
+
+        return summary
+
+    def store_output(self,output):
+        '''Write a plugin output to the store unless this process has
+        already done so, returning its digest.
+        '''
+
+        data = output.encode()
+        digest = blake2b(data,digest_size=16).hexdigest()
+
+        tree = self.tree
+        if not digest in self.stored:
+            tree.write(f'{STORE_DIRECTORY}/{digest[:2]}/{digest}' \
+                f'{self.suffix}',self.compress(data))
+            self.stored.add(digest)
+
+        return digest
+
+    def write_protocol(self,directory,plugin_id,protocol,rhosts):
+        '''Write address, socket and port lists for hosts affected by
+        a plugin over a given protocol.
+
+        rhosts - {name:(ReportHost,{protocol:PortDict})}
+        '''
+
+        # Address Lists
+        ips = []
+        sockets = []
+        fqdns = []
+        fsockets = []
+
+        # Unique ports affected
+        ports = []
+
+        try:
+
+            if self.plugin_outputs:
+
+                plugin_outputs_file = self.tree.open(
+                    directory / f'{protocol}_plugin_outputs.txt')
+
+            if self.output_store:
+
+                manifest_file = self.tree.open(
+                    directory / f'{protocol}_plugin_outputs.manifest')
+
+            for rhost,host_ports in rhosts.values():
+
+                plist = host_ports.get(protocol)
+                if plist:
+
+                    for addr in rhost.to_addresses(fqdns=True):
+
+                        if re.match(ipv4_re,addr):
+                            ips.append(addr)
+                        elif re.match(ipv6_re,addr):
+                            ips.append(addr)
+                        elif re.match(fqdn_re,addr):
+                            fqdns.append(addr)
+                        else:
+                            continue
+
+                    for number,port in plist.items():
+
+                        socket = None
+                        fsocket = None
+
+                        if number > 0:
+                            ports.append(number)
+
+                        for ip in ips:
+                            if number > 0:
+                                socket = f'{ip}:{port.number}'
+                                sockets.append(socket)
+
+                        for fqdn in fqdns:
+                            if number > 0:
+                                fsocket = f'{fqdn}:{port.number}'
+                                fsockets.append(fsocket)
+
+                        if not socket: continue
+
+                        header = socket
+                        if fsocket: header = header+','+fsocket+':'
+                        ban = '='*header.__len__()
+                        header = f'{ban}{header}{ban}'
+
+                        if self.plugin_outputs and \
+                                plugin_id in port.plugin_outputs:
+
+                            plugin_output = f'{header}\n\n'+'\n'.join(
+                                port.plugin_outputs[plugin_id]
+                            )
+
+                            plugin_outputs_file.write('\n\n'+plugin_output)
+
+                        if self.output_store and \
+                                plugin_id in port.plugin_outputs:
+
+                            digest = self.store_output('\n'.join(
+                                port.plugin_outputs[plugin_id]))
+
+                            manifest_file.write(f'{socket}\t{digest}\n')
+                            if fsocket:
+                                manifest_file.write(f'{fsocket}\t{digest}\n')
+
+        finally:
+
+            if self.plugin_outputs:
+                plugin_outputs_file.close()
+
+            if self.output_store:
+                manifest_file.close()
+
+        # =============================
+        # HANDLE IPv4 ADDRESSES/SOCKETS
+        # =============================
+
+        # Addresses and sockets are unique and ordered numerically,
+        # by address and then by port
+        ips = helpers.sort_addresses(ips)
+        sockets = helpers.sort_sockets(sockets)
+
+        # ============
+        # HANDLE PORTS
+        # ============
+
+        ports = sorted(set(ports))
+        if ports:
+
+            # write a list of unique ports to disk
+            with self.tree.open(directory / f'{protocol}_ports.txt') \
+                    as outfile:
+                outfile.write('\n'.join([str(p) for p in ports])+'\n')
+
+        # ============
+        # HANDLE FQDNS
+        # ============
+
+        fqdns = helpers.sort_addresses(fqdns)
+        fsockets = helpers.sort_sockets(fsockets)
+
+        # write address lists to disk
+        for fmt,lst in {'ips':ips,
+            'sockets':sockets,'fqdns':fqdns,
+            'fqdn_sockets':fsockets}.items():
+
+            if not lst: continue
+
+            fname = f'{protocol}_{fmt}.list'
+
+            with self.tree.open(directory / fname) as outfile:
+
+                outfile.write('\n'.join(lst)+'\n')
+
+    def write_all(self,jobs=1):
+        '''Write the directory of every plugin, yielding a PluginSummary
+        for each in the order of self.plugins.
+
+        When jobs is greater than 1, plugins are shared among that many
+        forked worker processes. Workers inherit the parsed document
+        from this process rather than receiving it. Platforms unable
+        to fork write plugins serially.
+        '''
+
+        global _worker_writer
+
+        if jobs > 1:
+            try:
+                context = get_context('fork')
+            except ValueError:
+                esprint('Forking is unsupported, writing plugins serially')
+                jobs = 1
+
+        if jobs <= 1:
+            try:
+                for plugin_id in self.plugins:
+                    yield self.write(plugin_id)
+            finally:
+                self.tree.close()
+            return
+
+        # Plugins are dispatched in shards to limit IPC while keeping
+        # workers evenly loaded
+        plugin_ids = list(self.plugins)
+        size = max(1,len(plugin_ids)//(jobs*8))
+        shards = [plugin_ids[i:i+size]
+            for i in range(0,len(plugin_ids),size)]
+
+        _worker_writer = self
+
+        try:
+
+            with context.Pool(jobs) as pool:
+                for summaries in pool.imap(_write_plugins,shards):
+                    yield from summaries
+
+        finally:
+
+            _worker_writer = None
+
+# Writer inherited by forked worker processes
+_worker_writer = None
+
+def _write_plugins(plugin_ids):
+    '''Write a shard of plugins in a worker process, returning their
+    summaries once every file has been written.
+    '''
+
+    summaries = [_worker_writer.write(plugin_id)
+        for plugin_id in plugin_ids]
+    _worker_writer.tree.flush()
+
+    return summaries
@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
+from copy import copy
 from re import search
-from sys import exit
-from parsuite import decorators
+import re
+from sys import exit, intern
+from parsuite import decorators, helpers
 import pdb
 
 ve = decorators.validate_lxml_module
@@ -24,6 +26,15 @@ def validate_port(func):
 
 vp = validate_port
 
+def intern_value(value):
+    '''Intern string values so that repeated values, e.g. protocols,
+    states and service names, share a single object. Other values are
+    returned unaltered.
+    '''
+
+    if value.__class__ == str: return intern(value)
+    return value
+
 class Script:
     '''A basic representation of an Nmap script.
 
@@ -36,9 +47,11 @@ class Script:
     >
     '''
 
+    __slots__ = ['id','output']
+
     def __init__(self,id,output):
 
-        self.id = id
+        self.id = intern_value(id)
         self.output = output
 
     @property
@@ -80,22 +93,76 @@ class Service:
     ATTRIBUTES = ['name','conf', 'extrainfo', 'method','version','product',
         'tunnel','proto','rpcnum','hostname','ostype','devicetype']
 
+    __slots__ = ATTRIBUTES
+
+    # Names given to services that were not identified
+    UNKNOWN_NAMES = ['unknown','masscan-unknown']
+
+    # Instances returned by Service.shared, keyed by attribute values
+    SHARED = {}
+
+    # Stop sharing new instances once this many are cached, bounding
+    # memory when nearly every service is distinct
+    MAX_SHARED = 100000
+
     def __init__(self,name,conf=None,extrainfo=None,method=None,
             version=None,product=None,tunnel=None,proto=None,
             rpcnum=None,hostname=None,ostype=None,devicetype=None):
 
-        self.name = name
-        self.conf = conf
+        self.name = intern_value(name)
+        self.conf = intern_value(conf)
         self.extrainfo = extrainfo
-        self.method = method
-        self.version = version
-        self.product = product
-        self.tunnel = tunnel
-        self.proto = proto
+        self.method = intern_value(method)
+        self.version = intern_value(version)
+        self.product = intern_value(product)
+        self.tunnel = intern_value(tunnel)
+        self.proto = intern_value(proto)
         self.rpcnum = rpcnum
         self.hostname = hostname
-        self.ostype = ostype
-        self.devicetype = devicetype
+        self.ostype = intern_value(ostype)
+        self.devicetype = intern_value(devicetype)
+
+    @staticmethod
+    def shared(**kwargs):
+        '''Return a Service for the supplied attributes, reusing the
+        instance created for identical attributes when one exists.
+        Shared services must not be modified.
+        '''
+
+        # Parsers supply attributes in a consistent order, so the items
+        # are used as the key without normalization
+        key = tuple(kwargs.items())
+
+        if key in Service.SHARED:
+            return Service.SHARED[key]
+
+        service = Service(**kwargs)
+        if len(Service.SHARED) < Service.MAX_SHARED:
+            Service.SHARED[key] = service
+
+        return service
+
+    @property
+    def richness(self):
+        '''The number of attributes set for the service, used to select
+        between services reported for the same port by different scans.
+        Placeholder names of unidentified services are not counted.
+        '''
+
+        count = 0
+        for attr in Service.ATTRIBUTES:
+            if self.__getattribute__(attr): count += 1
+
+        if self.name in Service.UNKNOWN_NAMES: count -= 1
+
+        return count
+
+    def __reduce__(self):
+
+        # Unpickled services are shared like those created by parsers
+        return (shared_service,(tuple((a,self.__getattribute__(a))
+            for a in Service.ATTRIBUTES
+                if self.__getattribute__(a) != None),))
 
     def __eq__(self,val):
         if self.name == val: return True
@@ -109,6 +176,13 @@ class Service:
         if self.extrainfo: row.append(self.extrainfo)
         return row
 
+def shared_service(items):
+    '''Return the shared Service for a tuple of (attribute, value)
+    pairs. Used when unpickling services.
+    '''
+
+    return Service.shared(**dict(items))
+
 class Port:
     '''A basic class representing an Nmap port object.
 
@@ -124,6 +198,8 @@ class Port:
     ATTRIBUTES = ['number','state','protocol','service','script',
         'port_id']
 
+    __slots__ = ['number','state','reason','protocol','service','scripts']
+
     def __init__(self,number,state,protocol,service=None,scripts=[],
             reason=None, *args, **kwargs):
 
@@ -137,19 +213,140 @@ class Port:
                     provided.'''
                 )
 
+        # intern_value is inlined since ports are created in bulk
         self.number = number
-        self.state = state
-        self.reason = reason
-        self.protocol = protocol
+        self.state = intern(state) if state.__class__ == str else state
+        self.reason = intern(reason) if reason.__class__ == str else reason
+        self.protocol = intern(protocol) if protocol.__class__ == str \
+            else protocol
         self.service = service
         self.scripts = scripts
-        self.portid = self.number
+
+    @property
+    def portid(self):
+
+        return self.number
+
+    @staticmethod
+    def merge(first,second):
+        '''Return a port combining two observations of the same
+        protocol and port number, where second is the later one:
+
+        - State and reason are taken from an open port in preference
+          to one that isn't, otherwise from the later port
+        - The service with the greater richness is kept, preferring the
+          later service when equal
+        - Scripts of both ports are kept, those of the port providing
+          the state taking precedence when ids collide
+
+        Neither port is modified.
+        '''
+
+        if first.state == 'open' and second.state != 'open':
+            port,other = copy(first),second
+        else:
+            port,other = copy(second),first
+
+        if other.service and (not port.service or
+                other.service.richness > port.service.richness or
+                (other.service.richness == port.service.richness and
+                    other is second)):
+            port.service = other.service
+
+        ids = set(s.id for s in port.scripts)
+        scripts = [s for s in other.scripts if not s.id in ids]
+        if scripts: port.scripts = port.scripts+scripts
+
+        return port
 
     def __repr__(self,cls='Port'):
 
         return f'< [{cls}] Number: {self.number} ' \
             f'Protocol: \'{self.protocol}\' >'
 
+class PortSearch:
+    '''Port and service search criteria compiled once so that they
+    can be applied to each port of each host without reprocessing
+    the search terms.
+
+    port_search - list - port numbers that must be open
+    service_search - list - service names, or regular expressions
+    matched against service names and extrainfo when sreg is set
+    sreg - boolean - treat service searches as regular expressions
+    '''
+
+    def __init__(self,port_search=[],service_search=[],sreg=False):
+
+        self.port_search = [int(p) for p in port_search or []]
+        self.port_numbers = set(self.port_search)
+        self.service_search = list(service_search or [])
+        self.service_names = set(self.service_search)
+        self.sreg = bool(sreg)
+        self.pattern = None
+        self.patterns = []
+
+        if self.sreg and self.service_search:
+
+            # A single alternation is far cheaper than one search per
+            # expression. It's only safe when no expression relies on
+            # group numbering or global flags, so fall back to
+            # searching each expression individually otherwise.
+            patterns = [re.compile(s) for s in self.service_search]
+
+            if not [p for p in patterns if p.groups]:
+                try:
+                    self.pattern = re.compile('|'.join(
+                        f'(?:{s})' for s in self.service_search))
+                except re.error:
+                    pass
+
+            self.patterns = [self.pattern] if self.pattern else patterns
+
+    @staticmethod
+    def from_arguments(search=None,port_search=[],service_search=[],
+            sreg=False):
+        '''Return search when a PortSearch has already been supplied,
+        otherwise compile one from the remaining arguments.
+        '''
+
+        if search != None: return search
+        return PortSearch(port_search,service_search,sreg)
+
+    def search_value(self,value):
+        '''Determine if any service expression matches a value.
+        '''
+
+        if not value: return False
+
+        for pattern in self.patterns:
+            if pattern.search(value): return True
+
+        return False
+
+    def match_service(self,service):
+        '''Determine if a service object satisfies the service search.
+        Always true when no service search was supplied.
+        '''
+
+        if not self.service_search: return True
+        if not service: return False
+
+        if self.sreg:
+            return self.search_value(service.name) or \
+                self.search_value(service.extrainfo)
+
+        return service.name in self.service_names
+
+    def match_port(self,port):
+        '''Determine if a port satisfies both the port and service
+        searches.
+        '''
+
+        if self.port_numbers and not port.number in self.port_numbers:
+            return False
+
+        return self.match_service(port.service)
+
 class PortDict(dict):
     '''A dictionary of port number to port list mappings that
     enforces a particular type of protocol.
@@ -189,6 +386,15 @@ class PortDict(dict):
         key = int(key)
         super().__setitem__(key,value)
 
+    def __reduce__(self):
+        '''Pickle with the protocol as a constructor argument. Items
+        were validated when they were set and are restored without
+        passing through __setitem__.
+        '''
+
+        return (restore_port_dict, (self.__class__, self.protocol,
+            dict(self)))
+
     @vp
     def append_port(self,port):
 
@@ -200,17 +406,50 @@ class PortDict(dict):
             attr,value,regexp=regexp,value_attr=value_attr
         )
 
+def restore_port_dict(cls,protocol,items):
+    '''Rebuild a pickled PortDict.
+    '''
+
+    ports = cls(protocol)
+    dict.update(ports,items)
+    return ports
+
 class PortList(list):
     '''A superclass of list that performs type enforcement on objects
     as they're added while also providing a basic querying interface.
+
+    Queries on indexed attributes are answered from secondary indexes
+    mapping each distinct attribute value to the positions of matching
+    ports. Each index is built on the first query against its attribute
+    and kept current by `append`; any other mutation discards the
+    indexes until the next query.
     '''
 
-    @vp
+    # Port attributes, or (port attribute, service attribute) pairs,
+    # that are indexed
+    INDEXED = ['number','state','protocol',('service','name'),
+        ('service','extrainfo')]
+
+    def __init__(self,*args,**kwargs):
+
+        super().__init__(*args,**kwargs)
+        self._indexes = {}
+
+    def __reduce__(self):
+
+        return (self.__class__, (list(self),))
+
     def __setitem__(self,key,value,*args,**kwargs):
         '''Override __setitem__ to enforce type.
         '''
 
+        if not Port in value.__class__.__mro__:
+            raise TypeError(
+                'PortList values must inherit from Port'
+            )
+
         super().__setitem__(key,value,*args,**kwargs)
+        self._indexes = {}
 
     @vp
     def append(self,value,*args,**kwargs):
@@ -219,6 +458,84 @@ class PortList(list):
 
         super().append(value)
 
+        for key,index in self._indexes.items():
+            index.setdefault(PortList.index_value(value,key),[]) \
+                .append(len(self)-1)
+
+    # Mutations other than append invalidate the indexes
+
+    def __delitem__(self,*args,**kwargs):
+        super().__delitem__(*args,**kwargs)
+        self._indexes = {}
+
+    def __iadd__(self,*args,**kwargs):
+        self._indexes = {}
+        return super().__iadd__(*args,**kwargs)
+
+    def extend(self,*args,**kwargs):
+        super().extend(*args,**kwargs)
+        self._indexes = {}
+
+    def insert(self,*args,**kwargs):
+        super().insert(*args,**kwargs)
+        self._indexes = {}
+
+    def remove(self,*args,**kwargs):
+        super().remove(*args,**kwargs)
+        self._indexes = {}
+
+    def pop(self,*args,**kwargs):
+        self._indexes = {}
+        return super().pop(*args,**kwargs)
+
+    def clear(self):
+        super().clear()
+        self._indexes = {}
+
+    def sort(self,*args,**kwargs):
+        super().sort(*args,**kwargs)
+        self._indexes = {}
+
+    def reverse(self):
+        super().reverse()
+        self._indexes = {}
+
+    @staticmethod
+    def index_value(port,key):
+        '''Return the value of an indexed attribute for a port.
+        '''
+
+        if key.__class__ == tuple:
+            attr,value_attr = key
+            value = port.__getattribute__(attr)
+            if value == None: return None
+            return value.__getattribute__(value_attr)
+
+        return port.__getattribute__(key)
+
+    def secondary_index(self,key):
+        '''Return the secondary index for an attribute, building it
+        when necessary: {value:[position]}
+        '''
+
+        index = self._indexes.get(key)
+
+        if index == None:
+
+            index = self._indexes[key] = {}
+            for position,port in enumerate(self):
+                index.setdefault(PortList.index_value(port,key),[]) \
+                    .append(position)
+
+        return index
+
+    def from_positions(self,positions):
+        '''Return a PortList of the ports at the supplied positions,
+        preserving the order of this list.
+        '''
+
+        return PortList([self[i] for i in sorted(positions)])
+
     def get(self,attr,value,regexp=False,value_attr=None):
         '''Get ports from the list where the attribute value matches that of
         port objects in the list. Returns a port list, facilitating additional
@@ -230,12 +547,36 @@ class PortList(list):
                 f'attr must be a PortObject attribute {Port.ATTRIBUTES}'
             )
         if not regexp:
+
+            # Services compare equal to their name
+            if attr == 'service':
+                key = ('service','name')
+                if value.__class__ == Service: value = value.name
+            else:
+                key = attr
+
+            if key in PortList.INDEXED:
+                return self.from_positions(
+                    self.secondary_index(key).get(value,())
+                )
+
             return PortList([p for p in self if p.__getattribute__(attr) == value])
         else:
             # TODO: Finish negotiation of attribute of attr object
             # for a service, should be `name`
             if value_attr:
 
+                key = (attr,value_attr)
+                if key in PortList.INDEXED:
+
+                    # Search each distinct value only once
+                    positions = []
+                    for attr_value,matches in self.secondary_index(key).items():
+                        if attr_value and search(value,attr_value):
+                            positions += matches
+
+                    return self.from_positions(positions)
+
                 ports = PortList()
                 for port in self:
 
@@ -248,6 +589,15 @@ class PortList(list):
 
                     ports.append(port)
 
+            elif attr in PortList.INDEXED and attr != 'number':
+
+                positions = []
+                for attr_value,matches in self.secondary_index(attr).items():
+                    if search(value,attr_value):
+                        positions += matches
+
+                return self.from_positions(positions)
+
             else:
 
                 ports = PortList([p for p in self if
@@ -256,12 +606,72 @@ class PortList(list):
 
             return ports
 
+    def match_services(self,port_search):
+        '''Get ports from the list with a service matching the service
+        search of a PortSearch object. Each distinct service name and
+        extrainfo value is tested only once.
+        '''
 
+        positions = set()
+
+        if port_search.sreg:
+
+            for key in [('service','name'),('service','extrainfo')]:
+                for value,matches in self.secondary_index(key).items():
+                    if port_search.search_value(value):
+                        positions.update(matches)
+
+        else:
+
+            index = self.secondary_index(('service','name'))
+            for name in port_search.service_names:
+                positions.update(index.get(name,()))
+
+        return self.from_positions(positions)
+
+
+
+def port_container(protocol=None):
+    '''Return a property for a Host port container that's created on
+    first access. A PortDict is created when a protocol is supplied,
+    otherwise a PortList.
+    '''
+
+    slot = f'_{protocol}_ports' if protocol else '_ports'
+
+    def get(self):
+
+        try:
+            return self.__getattribute__(slot)
+        except AttributeError:
+            value = PortDict(protocol=protocol) if protocol else PortList()
+            self.__setattr__(slot,value)
+            return value
+
+    def set(self,value):
+
+        self.__setattr__(slot,value)
+
+    return property(get,set)
 
 class Host:
     '''Produces objects that resemble an Nmap host.
+
+    Port containers are created on first access, so hosts carry no
+    empty PortDict objects for protocols they have no ports for.
     '''
 
+    __slots__ = ['_tcp_ports','_udp_ports','_ip_ports','_sctp_ports',
+        '_icmp_ports','_ports','ipv4_address','ipv6_address','hostnames',
+        'status','status_reason','mac_address']
+
+    tcp_ports = port_container('tcp')
+    udp_ports = port_container('udp')
+    ip_ports = port_container('ip')
+    sctp_ports = port_container('sctp')
+    icmp_ports = port_container('icmp')
+    ports = port_container()
+
     def __eq__(self, value):
 
         if id(self) == id(value) or value in self.ip_addresses or (
@@ -281,56 +691,50 @@ class Host:
             if v and v.__class__ != PortDict:
                 raise TypeError('Port arguments must be of type PortDict')
 
-        self.tcp_ports = tcp_ports
-        self.udp_ports = udp_ports
-        
         # Technically protocols: https://nmap.org/book/scan-methods-ip-protocol-scan.htm
         # Nmap refers to them as ports though, so let's stick with that
-        self.ip_ports = ip_ports
+        for attr,value in [('tcp_ports',tcp_ports),('udp_ports',udp_ports),
+                ('ip_ports',ip_ports),('sctp_ports',sctp_ports)]:
+            if value: self.__setattr__(attr,value)
 
-        self.sctp_ports = sctp_ports
         self.ipv6_address = ipv6_address
         self.ipv4_address = ipv4_address
 
-        # List of IP addresses for quick reference should a given host
-        # have both an IPv4 and IPV6 address
-        ips = []
-        if self.ipv4_address:
-            ips.append(self.ipv4_address)
-        if self.ipv6_address:
-            ips.append(self.ipv6_address)
-        self.ip_addresses = ips
-            
-
         # Each hostname is in a hostname element, a child of the 
         # hostnames element for a host
         self.hostnames = hostnames
 
         # host/status 
-        self.status = status
+        self.status = intern_value(status)
 
         # host/stats[@reason]
-        self.status_reason = status_reason
+        self.status_reason = intern_value(status_reason)
         self.mac_address = mac_address
 
-        # Initialize a portlist
-        if not ports:
-            self.ports = PortList()
-
         # Set provided ports list
-        else:
+        if ports:
 
             # Assure the ports object is of type PortList
-            if port and ports.__class__ != PortList:
+            if ports.__class__ != PortList:
                 raise TypeError(
                     'ports value must be of type PortList'
                 )
             self.ports = ports
 
-        # Assure all ports are a portdict unless added to the portlist
-        for attr,value in self.__dict__.items():
-            if not value and attr.endswith('_ports'):
-                self.__setattr__(attr,PortDict(protocol=attr.split('_')[0]))
+    @property
+    def ip_addresses(self):
+        '''List of IP addresses for quick reference should a given host
+        have both an IPv4 and IPV6 address
+        '''
+
+        return [ip for ip in [self.ipv4_address,self.ipv6_address] if ip]
+
+    @property
+    def key(self):
+        '''The value used to key the host in report dictionaries.
+        '''
+
+        return self.ipv4_address or self.ipv6_address or self.mac_address
 
     @vp
     def append_port(self,port):
@@ -341,6 +745,40 @@ class Host:
         self.__getattribute__(port.protocol+'_ports').append_port(port)
         self.ports.append(port)
 
+    def merge_port(self,port):
+        '''Add a port to the host, merging it with the port already
+        recorded for the same protocol and number, if any, such that
+        each is recorded only once. See Port.merge.
+        '''
+
+        ports = self.__getattribute__(port.protocol+'_ports')
+
+        # PortDict overrides get with its query interface
+        existing = dict.get(ports,port.number)
+        if existing == None:
+            self.append_port(port)
+            return
+
+        merged = Port.merge(existing,port)
+        ports[port.number] = merged
+
+        # Ports have no __eq__, so index locates this very object
+        self.ports[self.ports.index(existing)] = merged
+
+    def merge(self,host):
+        '''Merge the ports, hostnames and missing addresses of a later
+        observation of the host into this one.
+        '''
+
+        for port in host.ports: self.merge_port(port)
+
+        hostnames = [h for h in host.hostnames if not h in self.hostnames]
+        if hostnames: self.hostnames = self.hostnames+hostnames
+
+        for attr in ['ipv4_address','ipv6_address','mac_address']:
+            if not self.__getattribute__(attr):
+                self.__setattr__(attr,host.__getattribute__(attr))
+
     def get_ports(self, *args, **kwargs):
         return [port.number for port in self.ports]
 
@@ -349,45 +787,28 @@ class Host:
         return [[f'{self.ipv4_address}:{port.number}',port.protocol]+port.service.to_row() for port in self.ports if port.service.product]
 
 
-    def to_ports(self, service_search=[], sreg=False,
+    def to_ports(self, service_search=[], sreg=False, search=None,
             *args, **kwargs):
         '''Translate the host to a list of port numbers.
-        '''
-
-        if not service_search:
-            return self.get_ports()
-        
-        ports = PortList()
-        for service in service_search:
-
-            # ===================
-            # HANDLE REGEX SEARCH
-            # ===================
-
-            if sreg:
-
-                ports += self.ports.get(attr='service',value=service,
-                    regexp=True,value_attr='name')
-                ports += self.ports.get(attr='service',value=service,
-                    regexp=True,value_attr='extrainfo')
 
-            # ===================
-            # HANDLE MATCH SEARCH
-            # ===================
+        search - PortSearch - precompiled search, taking precedence
+        over service_search and sreg
+        '''
 
-            else:
+        search = PortSearch.from_arguments(search,
+            service_search=service_search,sreg=sreg)
 
-                ports += self.ports.get(attr='service',value=service)
-                ports += self.ports.get('service',value=service,
-                        value_attr='extrainfo')
+        if not search.service_search:
+            return self.get_ports()
 
-        return [p.number for p in set(ports)]
+        return [p.number for p in self.ports.match_services(search)]
 
 
     def get_addresses(self,fqdns=False, port_search=[], service_search=[],
-            sreg=False, port_required=False, *args, **kwargs):
+            sreg=False, port_required=False, search=None, *args, **kwargs):
 
-        port_search = [int(p) for p in port_search]
+        search = PortSearch.from_arguments(search,port_search,
+            service_search,sreg)
 
         # ====================
         # REQUIRE AN OPEN PORT
@@ -400,7 +821,7 @@ class Host:
         # SEARCH FOR PORT NUMBERS
         # =======================
 
-        for port in port_search:
+        for port in search.port_search:
             if not self.ports.get('number',port).get('state','open'):
                 return []
 
@@ -408,42 +829,9 @@ class Host:
         # SEARCH SERVICES
         # ===============
 
-        if service_search:
-            matched = False
-            for service in service_search:
-
-                # ===================
-                # HANDLE REGEX SEARCH
-                # ===================
-
-                if sreg:
-
-                    if self.ports.get(attr='service',value=service,
-                        regexp=True,value_attr='name'):
-                        matched = True
-                        break
-                    
-                    if self.ports.get(attr='service',value=service,
-                        regexp=True,value_attr='extrainfo'):
-                        matched = True
-                        break
-
-                # ===================
-                # HANDLE MATCH SEARCH
-                # ===================
-
-                else:
-
-                    if self.ports.get(attr='service',value=service):
-                        matched = True
-                        break
-
-                    if self.ports.get('service',value=service,
-                            value_attr='extrainfo'):
-                        matched = True
-                        break
-                    
-            if not matched: return []
+        if search.service_search and \
+                not self.ports.match_services(search):
+            return []
 
         # ================================
         # EXTRACT HOSTNAMES WHEN REQUESTED
@@ -469,7 +857,7 @@ class Host:
                 'Host has no address'
             )
 
-        return sorted(addresses)
+        return helpers.sort_addresses(addresses,unique=False)
 
 
     def to_addresses(self,*args,**kwargs):
@@ -492,7 +880,8 @@ class Host:
 
     def to_sockets(self,fqdns=False,open_only=True,protocols=['tcp'],
             scheme_layer=None,mangle_functions=[],port_search=[],
-            service_search=[],sreg=None,extrainfo=False,*args,**kwargs):
+            service_search=[],sreg=None,extrainfo=False,search=None,
+            *args,**kwargs):
         """
         Return a list of socket values derived from service objects
         associated with a given host.
@@ -504,6 +893,8 @@ class Host:
         mangle_functions - a list of functions which the string
         final address will be passed to. Useful for mangling services
         to specific values.
+        search - PortSearch - precompiled search, taking precedence
+        over port_search, service_search and sreg
         """
 
         # =============
@@ -523,6 +914,9 @@ class Host:
                     'scheme_layer must be either transport or application'
                 )
 
+        search = PortSearch.from_arguments(search,port_search,
+            service_search,sreg)
+
         addresses = self.get_addresses(fqdns=fqdns)
         output = []
 
@@ -531,48 +925,13 @@ class Host:
                 .__getattribute__(transport_protocol+'_ports') \
                 .items():
 
-                # ==============
-                # DO PORT SEARCH
-                # ==============
+                # ===========================
+                # DO PORT AND SERVICE SEARCHES
+                # ===========================
 
-                if port_search and not port.number in port_search:
+                if not search.match_port(port):
                     continue
 
-                # =================
-                # DO SERVICE SEARCH
-                # =================
-
-                if service_search:
-
-                    # ===============
-                    # DO MATCH SEARCH
-                    # ===============
-
-                    if not sreg and \
-                        (not port.service or \
-                        not port.service.name in service_search):
-                            continue
-
-                    # ===============
-                    # DO REGEX SEARCH
-                    # ===============
-
-                    else:
-
-                        matched = False
-                        for ser in service_search:
-
-                            if search(ser,port.service.name):
-                                matched=True
-                                break
-
-                            if port.service.extrainfo and \
-                                    search(ser,port.service.extrainfo):
-                                matched=True
-                                break
-
-                        if not matched: continue
-
                 # =======================
                 # BUILD THE SCHEME PREFIX
                 # =======================
@@ -622,7 +981,7 @@ class Host:
 
                     output.append(addr)
 
-        return sorted(output)
+        return helpers.sort_sockets(output,unique=False)
 
     def to_uris(self,*args,**kwargs):
         """Return a list of URIs derived from the sockets associated
@@ -692,5 +1051,5 @@ class FromXML:
         for attr in Service.ATTRIBUTES:
             attrs[attr] = es.get(attr)
 
-        # Return a new service object
-        return Service(**attrs)
+        # Return a shared service object
+        return Service.shared(**attrs)
@@ -3,7 +3,9 @@ from parsuite.core.suffix_printer import *
 from sys import exit
 
 class MasscanHost(Host):
-    
+
+    __slots__ = ()
+
     def to_uris(self,*args,**kwargs):
         esprint(
             'Error: Masscan does not fingerprint services and ' \
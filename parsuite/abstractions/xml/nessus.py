@@ -1,6 +1,7 @@
 from parsuite.abstractions.xml.generic import network_host as NH
 from parsuite.abstractions.xml.generic.network_host import Host, PortDict, PortList
 from parsuite import decorators
+from lxml import etree
 import re
 
 plugin_name_re = pname_re = re.compile('(\s|\W)+')
@@ -28,62 +29,83 @@ class FromXML:
         '''Generate and return a ReportHost object from an XML element
         object generated by xml.etree.ElementTree.'''
 
-        ele = ereport_host
-        kwargs = {'name':ele.get('name')}
-        for attr in ReportHost.HOST_PROPERTY_ATTRIBUTES:
-            for iele in ele.findall(f'./HostProperties//tag[@name="{attr}"]'):
-                try:
-                    kwargs[attr.replace('-','_').replace('host_','')] = iele.text
-                except:
-                    kwargs[attr] = None
-
-        return ReportHost(**kwargs)
+        return build_report_host(ereport_host)
 
     @staticmethod
     @ve
-    def report_item(ereport_item):
+    def report_item(ereport_item,registry=None):
         '''Initialize and return a ReportItem object from an XML
-        element object generated by xml.etree.
+        element object generated by xml.etree. The Plugin referenced
+        by the ReportItem is shared through registry, PLUGINS unless
+        otherwise supplied.
         '''
 
-        ri = ereport_item
-        raw = {}
-
-        # Extract attribute values from the ReportItem element
-        for attr in ReportItem.ATTRIBUTES:
-            text = ri.get(attr)
-            attr = RI.na(attr)
-            raw[attr]=text
-
-        # Extract text from relevant child tag elements
-        for tag in ReportItem.CHILD_TAGS:
-            try:
-                text = ri.find(f'{tag}').text
-            except:
-                text = None
-
-            tag = RI.na(tag)
-            raw[tag] = text
-
-        raw['metasploit_modules'] = [
-            ele.text for ele in ri.findall('.//metasploit_name')
-        ]
-
-        # Initialize and return a ReportItem object
-        return ReportItem(**raw)
+        return build_report_item(ereport_item,registry)
 
 class Plugin:
     '''Represents a Nessus plugin. The name associate with a ReportItem
     and id will be bound to these objects. Facilitates easy lookups between
     ReportItems and PluginOutputDicts, the latter of which is an attribute
     of Port port objects.
+
+    Details of a plugin, e.g. its description and solution, are repeated
+    by every ReportItem element reporting it. A Plugin holds them once
+    for all ReportItems, which reference it. See PluginRegistry.
+
+    fields - {field:text} of the normalized names in FIELDS
     '''
 
-    def __init__(self,name,id):
+    # Normalized ReportItem values describing the plugin rather than a
+    # finding
+    FIELDS = ['agent','always_run','description','fname',
+        'plugin_modification_date','plugin_name',
+        'plugin_publication_date','plugin_type','risk_factor',
+        'script_copyright','script_version','solution','synopsis',
+        'plugin_family','exploit_available','exploit_framework_canvas',
+        'exploit_framework_metasploit','exploit_framework_core',
+        'metasploit_name','canvas_package','metasploit_modules']
+
+    def __init__(self,name,id,**fields):
 
         self.name = name
         self.id = id
 
+          # Raw values, compared against those of later ReportItems
+        self.values = tuple(map(fields.get,Plugin.FIELDS))
+
+        self.exploit_frameworks = []
+
+        for attr,val in zip(Plugin.FIELDS,self.values):
+
+            # Frameworks are flagged true or false, so the name of each
+            # flagged framework is recorded, e.g. metasploit
+            if attr.startswith('exploit_framework_') and val == 'true':
+                self.exploit_frameworks.append(
+                    attr[len('exploit_framework_'):])
+
+            if attr == 'risk_factor' and val != None:
+                val = val.lower()
+
+            if val == 'true': val = True
+            elif val == 'false': val = False
+
+            self.__setattr__(attr,val)
+
+        if self.metasploit_modules == None:
+            self.metasploit_modules = []
+
+        self.exploitable = self.exploit_available
+
+        # Determine if the plugin is dealing with SSL/TLS
+        plugin_name = self.plugin_name or ''
+        for k in ['ssl','tls']:
+
+            wrapped = False
+            if plugin_name.find(k) > -1 or plugin_name.find(k.upper()) > -1:
+                wrapped = True
+
+            self.__setattr__(k,wrapped)
+
     def __eq__(self,value):
 
         if value == self.name or value == self.id:
@@ -91,6 +113,55 @@ class Plugin:
         else:
             return False
 
+    def additional_info(self):
+
+        output = f'# synopsis\n\n{str(self.__getattribute__("synopsis"))}'
+        for k in ['solution','description', 'plugin_type']:
+
+            output += f'\n\n# {k}\n\n{str(self.__getattribute__(k))}'
+
+        if self.exploit_frameworks:
+
+            frameworks = '\n'.join(self.exploit_frameworks)
+            output += f'\n\n# exploit_frameworks:\n\n{frameworks}'
+
+        if self.metasploit_modules:
+
+            modules = '\n'.join(self.metasploit_modules)
+            output += f'\n\n# msf_modules:\n\n{modules}'
+
+        return output+'\n'
+
+class PluginRegistry(dict):
+    '''A dictionary of {plugin_id:Plugin} sharing a single Plugin
+    among every ReportItem of a plugin.
+    '''
+
+    def register(self,plugin_id,fields):
+        '''Return the Plugin registered for plugin_id, registering
+        one built from fields when none exists. fields is a dictionary
+        of the normalized names in Plugin.FIELDS.
+
+        Details are expected to be identical for each occurrence of a
+        plugin. Should they differ, e.g. when a plugin was updated
+        between scans, an unregistered Plugin is returned so that every
+        ReportItem keeps the details it was reported with.
+        '''
+
+        plugin = self.get(plugin_id)
+
+        if plugin.__class__ != Plugin:
+            plugin = self[plugin_id] = Plugin(fields.get('plugin_name'),
+                plugin_id,**fields)
+
+        elif plugin.values != tuple(map(fields.get,Plugin.FIELDS)):
+            plugin = Plugin(fields.get('plugin_name'),plugin_id,**fields)
+
+        return plugin
+
+# Plugins shared by ReportItems unless another registry is supplied
+PLUGINS = PluginRegistry()
+
 class PluginOutputDict(dict):
     
     def append_output(self,plugin_id,output):
@@ -105,14 +176,18 @@ class Port(NH.Port):
     has a `report_items` attribute used to track ReportItem
     output for a given port.
     '''
+
+    __slots__ = ['plugin_outputs']
     
-    def __init__(self, plugin_outputs = PluginOutputDict(),
-        *args, **kwargs):
-        '''report_items is a dictionary of {plugin_id:plugin_output}.
+    def __init__(self, plugin_outputs = None, *args, **kwargs):
+        '''plugin_outputs is a PluginOutputDict of
+        {plugin_id:[plugin_output]}, created for each port unless
+        supplied.
         '''
 
         # initialize a list of report items
-        self.plugin_outputs = plugin_outputs
+        self.plugin_outputs = plugin_outputs if plugin_outputs != None \
+            else PluginOutputDict()
 
         # call the parent constructor
         super().__init__(*args,**kwargs)
@@ -125,7 +200,7 @@ class ReportHost(NH.Host):
 
     def __init__(self,name,operating_system=None,mac_address=None,
         netbios_name=None,rdns=None,ip=None,fqdn=None,
-        ports=NH.PortList(),icmp_ports=NH.PortDict('icmp')):
+        ports=None,icmp_ports=None,report_items=None):
 
         # =====================
         # INITIALIZE ATTRIBUTES
@@ -137,7 +212,8 @@ class ReportHost(NH.Host):
         self.netbios_name = netbios_name
         self.rdns = rdns
         self.ip = ip
-        self.icmp_ports=icmp_ports
+        if icmp_ports: self.icmp_ports=icmp_ports
+        self.report_items = report_items or []
 
         # ============================
         # INITIALIZE PARENT ATTRIBUTES
@@ -171,6 +247,11 @@ class ReportItem:
     a given report item is associated with a Port object in the
     form of `Port.report_items['plugin_id'] = ['outputs']
 
+    Only values particular to a finding are held by a ReportItem.
+    Details of the plugin are held by a Plugin shared with every
+    ReportItem of the plugin, available through the `plugin` attribute
+    and as attributes of the ReportItem itself.
+
     '''
 
     # Nessus XML ReportItem attributes to track
@@ -183,16 +264,13 @@ class ReportItem:
         'plugin_publication_date', 'plugin_type', 'risk_factor',
         'script_copyright', 'script_version', 'solution',
         'synopsis', 'exploit_available',
-        'exploit-framework_canvas', 'exploit-framework_metasploit',
-        'exploit-framework_core', 'metasploit_name', 'canvas_package'
+        'exploit_framework_canvas', 'exploit_framework_metasploit',
+        'exploit_framework_core', 'metasploit_name', 'canvas_package'
     ]
 
     # Normalize XML names that are invalid or undesirable for use as
     # a python object attribute.
     NORMALIZED_MAP = {
-        'exploit-framework_canvas':'exploit_framework_canvas',
-        'exploit-framework_metasploit':'exploit_framework_metasploit',
-        'exploit-framework_core':'exploit_framework_core',
         'pluginID':'plugin_id','pluginName':'plugin_name',
         'pluginFamily':'plugin_family'
     }
@@ -204,52 +282,40 @@ class ReportItem:
         else:
             NORMALIZED.append(a)
 
-    
-    def __init__(self, agent, always_run, description, fname,
-            plugin_modification_date, plugin_name,
-            plugin_publication_date, plugin_type, risk_factor,
-            script_copyright, script_version, solution,
-            synopsis, port, svc_name, protocol,
-            severity, plugin_id, plugin_family, exploit_available,
-            exploit_framework_canvas, exploit_framework_metasploit,
-            exploit_framework_core, metasploit_name, canvas_package,
-            plugin_output,metasploit_modules=[]):
-        
-        self.exploit_frameworks = []
-        port_kwargs = {'number':port,'protocol':protocol,'state':'open'}
-        self.port = Port(**port_kwargs)
-        self.metasploit_modules = metasploit_modules
-            
-        
-        for attr in (ReportItem.ATTRIBUTES+ReportItem.CHILD_TAGS):
+    __slots__ = ['port','svc_name','protocol','severity','plugin_id',
+        'plugin_output','plugin']
 
-            if attr == 'port': continue
-
-            if attr.startswith('exploit_famework'):
-                self.exploit_frameworks.append(value)
+    def __init__(self, port, svc_name, protocol, severity, plugin_id,
+            plugin_output=None, plugin=None, registry=PLUGINS, **fields):
+        '''Values in fields are those of Plugin.FIELDS. They are used
+        to look up the plugin in registry when plugin isn't supplied.
+        '''
 
-            attr = RI.na(attr)
-            val = locals()[attr]
-            
-            if attr == 'risk_factor':
-                val = val.lower()
+        self.port = Port(number=port,protocol=protocol,state='open')
+        self.svc_name = svc_name
+        self.protocol = protocol
+        self.severity = severity
+        self.plugin_id = plugin_id
+        self.plugin_output = plugin_output
+        self.plugin = plugin or registry.register(plugin_id,fields)
 
-            if val == 'true': val = True
-            elif val == 'false': val = False
+    def __getattr__(self,attr):
 
-            self.__setattr__(attr,val)
+        # Only called for attributes missing from the instance, which
+        # are looked up on the plugin
+        if attr == 'plugin':
+            raise AttributeError(attr)
 
-        self.exploitable = self.exploit_available
+        return getattr(self.plugin,attr)
 
-        # Determine if the report item is dealing with SSL/TLS
-        for k in ['ssl','tls']:
+    def __getstate__(self):
 
-            wrapped = False
-            if self.plugin_name.find(k) > -1 or self.plugin_name.find(k.upper()) > -1:
-                wrapped = True
+        return {attr:getattr(self,attr) for attr in ReportItem.__slots__}
 
-            self.__setattr__(k,wrapped)
+    def __setstate__(self,state):
 
+        for attr,val in state.items():
+            self.__setattr__(attr,val)
 
     @staticmethod
     def normalize_attr(attr):
@@ -268,22 +334,66 @@ class ReportItem:
     
     def additional_info(self):
 
-        output = f'# synopsis\n\n{str(self.__getattribute__("synopsis"))}'
-        for k in ['solution','description', 'plugin_type']:
+        return self.plugin.additional_info()
 
-            output += f'\n\n# {k}\n\n{str(self.__getattribute__(k))}'
+# convenience is convenient
+RI = ReportItem
 
-        if self.exploit_frameworks:
+# ========
+# BUILDERS
+# ========
+# Build objects from lxml elements without validating them, for use
+# where elements are known to originate from lxml. See FromXML.
+
+# Host property tags of a ReportHost element -> ReportHost argument
+HOST_PROPERTIES = {attr:attr.replace('-','_').replace('host_','')
+    for attr in ReportHost.HOST_PROPERTY_ATTRIBUTES}
+
+host_properties_xpath = etree.XPath(
+    'HostProperties//tag[' + \
+    ' or '.join(f'@name="{attr}"' for attr in HOST_PROPERTIES) + ']'
+)
+
+# ReportItem attributes and child tags -> ReportItem argument
+ITEM_ATTRIBUTES = [(attr,RI.na(attr)) for attr in ReportItem.ATTRIBUTES]
+ITEM_CHILDREN = {tag:RI.na(tag) for tag in ReportItem.CHILD_TAGS}
+
+def build_report_host(ereport_host):
+    '''Generate and return a ReportHost object from a ReportHost
+    element. Host properties are selected by a single precompiled
+    query.
+    '''
 
-            frameworks = '\n'.join(self.exploit_frameworks)
-            output += f'\n\n# exploit_frameworks:\n\n{frameworks}'
+    kwargs = {'name':ereport_host.get('name')}
+    for ele in host_properties_xpath(ereport_host):
+        kwargs[HOST_PROPERTIES[ele.get('name')]] = ele.text
 
-        if self.metasploit_modules:
+    return ReportHost(**kwargs)
 
-            modules = '\n'.join(self.metasploit_modules)
-            output += f'\n\n# msf_modules:\n\n{modules}'
+def build_report_item(ereport_item,registry=None):
+    '''Initialize and return a ReportItem object from a ReportItem
+    element, visiting each child element once. Values of missing
+    children are None. The text of every metasploit_name child is
+    recorded in metasploit_modules.
+    '''
 
-        return output+'\n'
+    if registry == None: registry = PLUGINS
 
-# convenience is convenient
-RI = ReportItem
+    raw = {name:ereport_item.get(attr) for attr,name in ITEM_ATTRIBUTES}
+    raw.update(dict.fromkeys(ITEM_CHILDREN.values()))
+    modules = []
+
+    for child in ereport_item:
+
+        name = ITEM_CHILDREN.get(child.tag)
+        if name == None: continue
+
+        if name == 'metasploit_name':
+            modules.append(child.text)
+        else:
+            raw[name] = child.text
+
+    if modules: raw['metasploit_name'] = modules[0]
+    raw['metasploit_modules'] = modules
+
+    return ReportItem(registry=registry,**raw)
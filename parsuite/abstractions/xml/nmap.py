@@ -1,4 +1,5 @@
 from parsuite.abstractions.xml.generic.network_host import *
 
 class NmapHost(Host):
-    pass
+
+    __slots__ = ()
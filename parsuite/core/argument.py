@@ -50,6 +50,12 @@ class DefaultArguments:
         default=[],
         help='Input files to parse.',
         nargs='+')
+
+    no_cache = Argument('--no-cache',
+        action='store_true',
+        help='Parse input files without reading or writing the ' \
+            'parsed scan cache, stored under the parsuite cache ' \
+            'directory in scans/')
     
 class ArgumentGroup(Argument,list):
     '''A list of arguments that will be added to an argument group.
@@ -0,0 +1,173 @@
+from parsuite.core.argument import (Argument,ArgumentGroup,
+    MutuallyExclusiveArgumentGroup)
+from pathlib import Path
+from sys import stdout,stderr
+import json
+import os
+
+# Bump when the structure of the manifest changes
+VERSION = 1
+
+ARGUMENT_CLASSES = {c.__name__:c for c in
+    [Argument,ArgumentGroup,MutuallyExclusiveArgumentGroup]}
+
+# Non-JSON values that may appear in Argument kwargs
+TYPES = {t.__name__:t for t in [int,str,float]}
+STREAMS = {'stdout':stdout,'stderr':stderr}
+
+def encode_value(value):
+    '''Encode a value from Argument kwargs such that it can be
+    stored as JSON. Raises a TypeError when the value can't be
+    encoded.
+    '''
+
+    if value == None or value.__class__ in [str,int,float,bool]:
+        return value
+    elif value.__class__ in [list,tuple]:
+        return [encode_value(v) for v in value]
+    elif value in TYPES.values():
+        return {'type':value.__name__}
+    elif value in STREAMS.values():
+        return {'stream':[k for k,v in STREAMS.items() if v == value][0]}
+
+    raise TypeError(f'Unable to encode argument value: {value}')
+
+def decode_value(value):
+
+    if value.__class__ == list:
+        return [decode_value(v) for v in value]
+    elif value.__class__ == dict and 'type' in value:
+        return TYPES[value['type']]
+    elif value.__class__ == dict and 'stream' in value:
+        return STREAMS[value['stream']]
+
+    return value
+
+def encode_args(args):
+    '''Encode a list of Argument objects as a list of dictionaries.
+    '''
+
+    encoded = []
+    for arg in args:
+
+        dct = {'class':arg.__class__.__name__,
+            'pargs':encode_value(arg.pargs),
+            'kwargs':{k:encode_value(v) for k,v in arg.kwargs.items()}}
+
+        if arg.__class__ != Argument:
+            dct['arguments'] = encode_args(arg)
+
+        encoded.append(dct)
+
+    return encoded
+
+def decode_args(encoded):
+    '''Decode a list of dictionaries produced by encode_args back
+    into Argument objects.
+    '''
+
+    args = []
+    for dct in encoded:
+
+        cls = ARGUMENT_CLASSES[dct['class']]
+        kwargs = {k:decode_value(v) for k,v in dct['kwargs'].items()}
+
+        if cls == Argument:
+            arg = cls(*dct['pargs'], **kwargs)
+        else:
+            arg = cls([], *dct['pargs'], **kwargs)
+            for a in decode_args(dct['arguments']): arg.append(a)
+
+        args.append(arg)
+
+    return args
+
+class Manifest(dict):
+    '''A JSON file mapping module names to their help string and
+    encoded arguments. Entries are keyed on the mtime and size of
+    the module file and are considered stale once either changes.
+    '''
+
+    def __init__(self,path=None):
+        '''Load the manifest from path. No file is read or written
+        when path is None.
+        '''
+
+        self.path = Path(path) if path else None
+        self.dirty = False
+        self.stamp = Manifest.file_stamp(Path(__file__).parent / 'argument.py')
+
+        if not self.path: return
+
+        try:
+
+            with open(self.path) as infile:
+                content = json.load(infile)
+
+            if content.get('version') == VERSION and \
+                    content.get('stamp') == self.stamp:
+                self.update(content['modules'])
+
+        except (OSError,ValueError,KeyError,AttributeError):
+            pass
+
+    @staticmethod
+    def file_stamp(path):
+
+        st = os.stat(path)
+        return [st.st_mtime_ns,st.st_size]
+
+    def entry(self,name,path):
+        '''Return the manifest entry for a module, or None when it's
+        missing or stale.
+        '''
+
+        entry = self.get(name)
+
+        try:
+            if entry and entry['stamp'] == Manifest.file_stamp(path):
+                return entry
+        except OSError:
+            pass
+
+        return None
+
+    def record(self,name,path,help=None,args=None):
+        '''Record the help string and/or arguments for a module. Any
+        value not supplied is preserved when the existing entry is
+        still fresh.
+        '''
+
+        entry = self.entry(name,path) or {'help':None,'args':None}
+        entry['stamp'] = Manifest.file_stamp(path)
+
+        if help != None:
+            entry['help'] = help
+
+        if args != None:
+            try:
+                entry['args'] = encode_args(args)
+            except TypeError:
+                entry['args'] = None
+
+        self[name] = entry
+        self.dirty = True
+
+    def save(self):
+        '''Write the manifest to disk when it has been modified.
+        Failures are ignored since the manifest is only a cache.
+        '''
+
+        if not self.dirty or not self.path: return
+
+        try:
+
+            tmp = self.path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp,'w') as outfile:
+                json.dump({'version':VERSION,'stamp':self.stamp,
+                    'modules':self},outfile)
+            os.replace(tmp,self.path)
+            self.dirty = False
+
+        except OSError:
+            pass
@@ -0,0 +1,462 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from hashlib import blake2b
+from heapq import merge
+from pathlib import Path
+from tempfile import TemporaryDirectory
+import os
+import pickle
+import sqlite3
+import sys
+
+class SeenSet:
+    '''Track values that have already been written. Digests of values
+    are held in memory until `limit` is reached, after which they're
+    moved to a SQLite database in a temporary directory, bounding
+    memory consumption regardless of the number of distinct values.
+
+    Values are compared by a 128-bit blake2b digest of their UTF-8
+    encoding rather than by hash, which collides often enough across
+    millions of values to silently drop output.
+    '''
+
+    def __init__(self,limit=2000000,directory=None):
+
+        self.limit = limit
+        self.directory = directory
+        self.digests = set()
+        self.tempdir = None
+        self.db = None
+
+    def add(self,value):
+        '''Add a value to the set. Returns True when the value had not
+        been seen.
+        '''
+
+        return bool(self.filter([value]))
+
+    def filter(self,values):
+        '''Add values to the set, returning a list of those that had
+        not been seen.
+        '''
+
+        digests = self.digests
+        new = []
+
+        for value in values:
+
+            digest = blake2b(value.encode(),digest_size=16).digest()
+            if digest in digests: continue
+
+            if self.db and self.db.execute(
+                    'INSERT OR IGNORE INTO seen VALUES (?)',
+                    (digest,)).rowcount == 0:
+                continue
+
+            digests.add(digest)
+            new.append(value)
+
+        if len(digests) >= self.limit: self.spill()
+
+        return new
+
+    def spill(self):
+        '''Move the digests held in memory to the database.
+        '''
+
+        if not self.db:
+            self.tempdir = TemporaryDirectory(dir=self.directory)
+            self.db = sqlite3.connect(os.path.join(self.tempdir.name,
+                'seen.db'))
+            self.db.execute('PRAGMA journal_mode = OFF')
+            self.db.execute('PRAGMA synchronous = OFF')
+            self.db.execute('CREATE TABLE seen (digest BLOB PRIMARY KEY) '
+                'WITHOUT ROWID')
+
+        # Sorted keys are appended to the index rather than inserted
+        # at random positions
+        self.db.executemany('INSERT OR IGNORE INTO seen VALUES (?)',
+            ((d,) for d in sorted(self.digests)))
+        self.digests.clear()
+
+    def close(self):
+
+        if self.db:
+            self.db.close()
+            self.tempdir.cleanup()
+            self.db = self.tempdir = None
+
+class ExternalSorter:
+    '''Sort values that may not fit in memory. Values are buffered
+    until `chunk_size` is reached, at which point the buffer is
+    sorted and written to a temporary file as a run. Iterating the
+    sorter merges the runs. Values are ordered by `key` when supplied.
+    '''
+
+    def __init__(self,chunk_size=500000,directory=None,key=None):
+
+        self.chunk_size = chunk_size
+        self.directory = directory
+        self.key = key
+        self.buffer = []
+        self.runs = []
+        self.tempdir = None
+
+    def add(self,value):
+
+        self.buffer.append(value)
+        if len(self.buffer) >= self.chunk_size: self.write_run()
+
+    def write_run(self):
+
+        if not self.tempdir:
+            self.tempdir = TemporaryDirectory(dir=self.directory)
+
+        path = os.path.join(self.tempdir.name,f'{len(self.runs)}.run')
+        with open(path,'wb') as outfile:
+            for value in sorted(self.buffer,key=self.key):
+                pickle.dump(value,outfile)
+
+        self.runs.append(path)
+        self.buffer.clear()
+
+    @staticmethod
+    def read_run(path):
+
+        with open(path,'rb') as infile:
+            while True:
+                try:
+                    yield pickle.load(infile)
+                except EOFError:
+                    break
+
+    def __iter__(self):
+
+        self.buffer.sort(key=self.key)
+        if not self.runs: return iter(self.buffer)
+
+        return merge(self.buffer,*[ExternalSorter.read_run(p)
+            for p in self.runs],key=self.key)
+
+    def close(self):
+
+        if self.tempdir:
+            self.tempdir.cleanup()
+            self.tempdir = None
+
+        self.buffer.clear()
+        self.runs.clear()
+
+class OutputWriter:
+    '''Write values to a stream as they're produced rather than
+    accumulating them for a single write.
+
+    Output matches `print(delimiter.join(values))`. When the delimiter
+    is a newline each value is written with its own newline so that
+    lines are complete as soon as they're written.
+
+    stream - file object written to, stdout by default
+    delimiter - string written between values
+    unique - boolean - skip values that have already been written
+    sort - boolean - sort values, spilling to temporary files when
+    needed. Nothing is written until close is called.
+    key - function - sort key, e.g. helpers.socket_key. Values with
+    equal keys must be equal.
+    flush - boolean - flush the stream after each call to writes
+    header - string - value written before all others, irrespective
+    of sorting
+    '''
+
+    def __init__(self,stream=None,delimiter='\n',unique=True,
+            sort=False,flush=False,header=None,directory=None,
+            key=None):
+
+        self.stream = stream or sys.stdout
+        self.delimiter = delimiter
+        self.unique = unique
+        self.sort = sort
+        self.flush = flush
+        self.count = 0
+
+        # Sorted values are deduplicated as they're merged, so digests
+        # are only needed for unsorted output
+        self.seen = SeenSet(directory=directory) \
+            if unique and not sort else None
+        self.sorter = ExternalSorter(directory=directory,key=key) \
+            if sort else None
+
+        if header != None: self.emit([header])
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self,exc_type,*args):
+
+        # Output is left unterminated when processing failed
+        if exc_type == None: self.close()
+        else: self.cleanup()
+
+    def emit(self,values):
+        '''Write a list of values to the stream.
+        '''
+
+        if not values: return
+
+        if self.delimiter == '\n':
+            self.stream.write('\n'.join(values)+'\n')
+        elif self.count:
+            self.stream.write(self.delimiter+self.delimiter.join(values))
+        else:
+            self.stream.write(self.delimiter.join(values))
+
+        self.count += len(values)
+
+    def write(self,value):
+
+        self.writes([value])
+
+    def writes(self,values):
+
+        if self.sorter:
+            for value in values: self.sorter.add(value)
+            return
+
+        if self.seen: values = self.seen.filter(values)
+        elif values.__class__ != list: values = list(values)
+
+        self.emit(values)
+        if self.flush: self.stream.flush()
+
+    def close(self):
+        '''Write sorted values, when sorting, and terminate the output.
+        '''
+
+        if self.sorter:
+
+            last,batch = None,[]
+            for value in self.sorter:
+                if self.unique and value == last: continue
+                batch.append(value)
+                last = value
+
+                if len(batch) >= 10000:
+                    self.emit(batch)
+                    batch = []
+
+            self.emit(batch)
+
+        if self.delimiter != '\n' or not self.count:
+            self.stream.write('\n')
+
+        self.cleanup()
+
+    def cleanup(self):
+        '''Remove temporary files and flush the stream.
+        '''
+
+        if self.sorter: self.sorter.close()
+        if self.seen: self.seen.close()
+        self.stream.flush()
+
+class TreeFile:
+    '''A file-like object returned by OutputTree.open. Values written
+    are held in memory and passed to the tree when the file is closed.
+    Text is encoded as UTF-8.
+    '''
+
+    def __init__(self,tree,path,truncate=True):
+
+        self.tree = tree
+        self.path = path
+        self.truncate = truncate
+        self.chunks = []
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self,*args):
+
+        self.close()
+
+    def write(self,value):
+
+        if value.__class__ == str: value = value.encode()
+        self.chunks.append(value)
+
+        return len(value)
+
+    def close(self):
+
+        if self.chunks == None: return
+
+        self.tree.buffer(self.path,b''.join(self.chunks),self.truncate)
+        self.chunks = None
+
+class OutputTree:
+    '''Write files beneath a root directory by relative path, without
+    changing the working directory of the process.
+
+    Writes are held in memory until `buffer_size` bytes are pending,
+    at which point they're handed to background threads. Each file is
+    always written by the same thread, so writes to a file are applied
+    in order. Directories are created once, when a file is first
+    written within them.
+
+    Files are only guaranteed to be written once flush or close
+    returns, which also raise any error encountered by the threads.
+    Threads only run while writes are in progress and are stopped by
+    flush, after which the process can safely fork. Forked processes
+    should create their own trees.
+
+    root - directory beneath which files are written
+    threads - number of writer threads
+    buffer_size - bytes held in memory before writing begins
+    '''
+
+    def __init__(self,root,threads=4,buffer_size=4*1024**2):
+
+        self.root = Path(root).absolute()
+        self.buffer_size = buffer_size
+        self.threads = threads
+        self.executors = None
+
+          # {path:[truncate,[chunk]]}
+        self.pending = {}
+        self.buffered = 0
+
+        self.directories = set()
+        self.futures = deque()
+
+    def __enter__(self):
+
+        return self
+
+    def __exit__(self,*args):
+
+        self.close()
+
+    def path(self,path):
+        '''Return the absolute path for a path relative to root.
+        '''
+
+        path = Path(path)
+        if path.is_absolute() or '..' in path.parts:
+            raise ValueError(f'Path must be within the output tree: {path}')
+
+        return self.root / path
+
+    def mkdir(self,path):
+        '''Create a directory and any missing parents. Returns True
+        when the directory did not already exist.
+        '''
+
+        path = self.path(path)
+        if path in self.directories: return False
+
+        try:
+            path.mkdir(parents=True)
+            created = True
+        except FileExistsError:
+            created = False
+
+        self.directories.add(path)
+
+        return created
+
+    # =======
+    # WRITING
+    # =======
+
+    def open(self,path,mode='w'):
+        '''Return a TreeFile for a path relative to root. Files opened
+        for writing (w, wb) replace any content written previously
+        while files opened for appending (a, ab) extend it.
+        '''
+
+        if not mode.rstrip('b') in ['w','a']:
+            raise ValueError(f'Unsupported mode: {mode}')
+
+        return TreeFile(self,self.path(path),mode[0] == 'w')
+
+    def write(self,path,value):
+        '''Replace the content of the file at a path relative to root.
+        '''
+
+        with self.open(path) as outfile: outfile.write(value)
+
+    def append(self,path,value):
+        '''Append to the file at a path relative to root.
+        '''
+
+        with self.open(path,'a') as outfile: outfile.write(value)
+
+    def buffer(self,path,data,truncate):
+
+        parent = path.parent
+        if not parent in self.directories:
+            parent.mkdir(parents=True,exist_ok=True)
+            self.directories.add(parent)
+
+        entry = self.pending.get(path)
+        if truncate or entry == None:
+            self.buffered -= sum(len(c) for c in entry[1]) if entry else 0
+            entry = self.pending[path] = [truncate,[]]
+
+        entry[1].append(data)
+        self.buffered += len(data)
+
+        if self.buffered >= self.buffer_size: self.submit()
+
+    def submit(self):
+        '''Hand all pending writes to the writer threads.
+        '''
+
+        if not self.pending: return
+
+        if self.executors == None:
+            self.executors = [ThreadPoolExecutor(1)
+                for i in range(self.threads)]
+
+        batches = [[] for e in self.executors]
+        for path,(truncate,chunks) in self.pending.items():
+            batches[hash(path) % len(batches)].append(
+                (path,truncate,chunks))
+
+        for executor,batch in zip(self.executors,batches):
+            if batch:
+                self.futures.append(
+                    executor.submit(OutputTree.write_batch,batch))
+
+        self.pending = {}
+        self.buffered = 0
+
+        # Bound the memory held by writes in progress
+        while len(self.futures) > len(self.executors)*4:
+            self.futures.popleft().result()
+
+    @staticmethod
+    def write_batch(batch):
+
+        for path,truncate,chunks in batch:
+            with open(path,'wb' if truncate else 'ab') as outfile:
+                outfile.write(b''.join(chunks))
+
+    def flush(self):
+        '''Write all pending values, wait for the threads to finish and
+        stop them.
+        '''
+
+        try:
+            self.submit()
+            while self.futures: self.futures.popleft().result()
+        finally:
+            if self.executors != None:
+                for executor in self.executors: executor.shutdown()
+                self.executors = None
+                self.futures.clear()
+
+    def close(self):
+
+        self.flush()
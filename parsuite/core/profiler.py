@@ -0,0 +1,130 @@
+from parsuite.core.suffix_printer import *
+from sys import stderr
+from io import StringIO
+from threading import Thread, Event
+
+SORT_KEYS = ['cumulative','tottime','ncalls']
+
+class PeakTracker(Thread):
+    '''Poll tracemalloc in the background and keep a snapshot taken
+    near the peak of traced memory. A new snapshot is taken only when
+    traced memory grows beyond `growth` times the size at the last
+    snapshot, keeping the number of (expensive) snapshots low.
+    '''
+
+    def __init__(self, interval=0.05, growth=1.1):
+
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.growth = growth
+        self.snapshot = None
+        self.snapshot_size = 0
+        self.stopped = Event()
+
+    def run(self):
+
+        import tracemalloc
+
+        while not self.stopped.wait(self.interval):
+            self.check(tracemalloc)
+
+    def check(self,tracemalloc):
+
+        current,peak = tracemalloc.get_traced_memory()
+        if current > self.snapshot_size * self.growth:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+
+    def stop(self):
+
+        self.stopped.set()
+        self.join()
+
+def profile(func, kwargs, cpu=False, memory=False, output_file=None,
+        limit=25, sort='cumulative'):
+    '''Call func with kwargs while profiling CPU time
+    with cProfile and/or allocations with tracemalloc. A report of
+    hotspots and peak allocation sites is written to output_file,
+    or stderr when output_file is not supplied. Returns the value
+    returned by func.
+    '''
+
+    if not cpu and not memory:
+        return func(**kwargs)
+
+    if memory:
+        import tracemalloc
+        tracemalloc.start()
+        tracker = PeakTracker()
+        tracker.start()
+
+    if cpu:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    try:
+
+        return func(**kwargs)
+
+    finally:
+
+        if cpu:
+            profiler.disable()
+
+        report = StringIO()
+
+        if memory:
+            tracker.stop()
+            tracker.check(tracemalloc)
+            current,peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            memory_report(tracker.snapshot,tracker.snapshot_size,peak,
+                limit,report)
+
+        if cpu:
+            cpu_report(profiler,limit,sort,report)
+
+        if output_file:
+            with open(output_file,'w') as outfile:
+                outfile.write(report.getvalue())
+            esprint(f'Profile report written to: {output_file}')
+        else:
+            stderr.write(report.getvalue())
+
+def cpu_report(profiler,limit,sort,outfile):
+    '''Write the hotspots recorded by a cProfile.Profile object to
+    outfile, sorted by sort.
+    '''
+
+    import pstats
+
+    outfile.write(f'\n# CPU hotspots (top {limit} by {sort})\n\n')
+    stats = pstats.Stats(profiler,stream=outfile)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+
+def memory_report(snapshot,snapshot_size,peak,limit,outfile):
+    '''Write the allocation sites from the snapshot taken closest to
+    the peak of traced memory to outfile.
+    '''
+
+    outfile.write(f'\n# Memory (top {limit} allocation sites near peak)\n\n')
+    outfile.write(f'Peak traced memory:        {peak/1024/1024:.2f} MiB\n')
+    outfile.write(f'Traced memory at snapshot: ' \
+        f'{snapshot_size/1024/1024:.2f} MiB\n\n')
+
+    if not snapshot: return
+
+    # Exclude allocations made by the import system and the profilers
+    snapshot = snapshot.filter_traces([tracemalloc_filter(f) for f in
+        ['<frozen importlib.*>', '*/cProfile.py', '*/profile.py',
+            '*/tracemalloc.py', __file__]
+    ])
+
+    for stat in snapshot.statistics('lineno')[:limit]:
+        outfile.write(f'{stat}\n')
+
+def tracemalloc_filter(filename):
+
+    import tracemalloc
+    return tracemalloc.Filter(False,filename)
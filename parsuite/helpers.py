@@ -1,12 +1,14 @@
 from pathlib import Path
 from parsuite.core.suffix_printer import *
 from shutil import rmtree
+from socket import inet_pton,AF_INET,AF_INET6
 from xml.etree.ElementTree import Element
-from parsuite.abstractions.xml import validators
 import types
 from base64 import b64encode
 from string import ascii_letters as ASCII
 from random import randint
+import os
+import re
 
 def gen_rand(length,used_values=None):
 
@@ -23,6 +25,22 @@ def gen_rand(length,used_values=None):
             return output
 
 
+def cache_directory(*parts):
+    '''Return the path to the parsuite cache directory, creating it
+    when necessary. PARSUITE_CACHE_DIR takes precedence over
+    XDG_CACHE_HOME, which defaults to ~/.cache.
+    '''
+
+    base = os.environ.get('PARSUITE_CACHE_DIR')
+    if not base:
+        base = Path(os.environ.get('XDG_CACHE_HOME',
+            Path.home() / '.cache')) / 'parsuite'
+
+    path = Path(base, *parts)
+    path.mkdir(parents=True, exist_ok=True)
+
+    return path
+
 def fingerprint_xml(tree):
     '''Query an etree object to determine the file format. Will return
     the name of the program that generated the file. Currently
@@ -33,6 +51,8 @@ def fingerprint_xml(tree):
     - masscan
     '''
 
+    from parsuite.abstractions.xml import validators
+
     fingerprint = None
 
     # Things are goofy here because I was too lazy to start
@@ -57,6 +77,119 @@ def fingerprint_xml(tree):
 
     return fingerprint
 
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Patterns matched against the head of a file to identify its format
+HEADER_SIGNATURES = [
+    (re.compile(rb'<nmaprun\b[^>]*\bscanner\s*=\s*["\']nmap["\']'),'nmap'),
+    (re.compile(rb'<nmaprun\b[^>]*\bscanner\s*=\s*["\']masscan["\']'),'masscan'),
+    (re.compile(rb'<NessusClientData_v2\b'),'nessus'),
+]
+
+def open_input(path):
+    '''Open a file for reading in binary mode, transparently
+    decompressing it when it is gzip compressed.
+    '''
+
+    infile = open(path,'rb')
+    if infile.peek(2)[:2] != GZIP_MAGIC:
+        return infile
+
+    import gzip
+    infile.close()
+    return gzip.open(path,'rb')
+
+def fingerprint_file(path,size=8192):
+    '''Determine the format of an XML file by inspecting only the
+    first `size` bytes (after decompression). Returns the same values
+    as fingerprint_xml, or None when the format is not recognized.
+    '''
+
+    with open_input(path) as infile:
+        head = infile.read(size)
+
+    for pattern,fingerprint in HEADER_SIGNATURES:
+        if pattern.search(head): return fingerprint
+
+    return None
+
+def file_digest(path,size=1024**2):
+    '''Return a hex blake2b digest of the raw content of the file at
+    path, read `size` bytes at a time.
+    '''
+
+    from hashlib import blake2b
+
+    digest = blake2b(digest_size=20)
+    with open(path,'rb') as infile:
+        for chunk in iter(lambda: infile.read(size),b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+# ================
+# ADDRESS ORDERING
+# ================
+
+def address_key(address):
+    '''Return a bytes key ordering IP addresses numerically. IPv4
+    addresses are ordered before IPv6 addresses, which are ordered
+    before hostnames and any other value. Addresses are compared by
+    their packed form and everything else lexically.
+
+    Distinct strings always produce distinct keys, so equal keys
+    indicate duplicate values.
+    '''
+
+    try:
+        return b'\x00'+inet_pton(AF_INET,address)
+    except OSError:
+        pass
+
+    # IPv6 addresses have many textual forms of the same value, so the
+    # string itself is appended to keep keys distinct
+    try:
+        return b'\x01'+inet_pton(AF_INET6,address.strip('[]')) + \
+            address.encode()+b'\x00'
+    except OSError:
+        return b'\x02'+address.encode()+b'\x00'
+
+def socket_key(socket):
+    '''Return a bytes key ordering sockets by address, as address_key
+    does, and then numerically by port. Sockets are formatted as
+    address:port and may be prefixed by a scheme (scheme://) or
+    followed by comma separated details, which are compared last.
+    Values that aren't sockets are ordered after all sockets.
+    '''
+
+    scheme,sep,rest = socket.partition('://')
+    if not sep: scheme,rest = '',socket
+
+    rest,sep,details = rest.partition(',')
+    address,sep,port = rest.rpartition(':')
+
+    if not sep or not port.isdecimal() or int(port) > 65535:
+        return b'\x03'+socket.encode()
+
+    return address_key(address)+int(port).to_bytes(2,'big') + \
+        scheme.encode()+b'\x00'+details.encode()
+
+def sort_addresses(addresses,unique=True):
+    '''Return a list of addresses ordered by address_key. Duplicate
+    values are removed unless unique is False.
+    '''
+
+    if unique: addresses = set(addresses)
+    return sorted(addresses,key=address_key)
+
+def sort_sockets(sockets,unique=True):
+    '''Return a list of sockets ordered by socket_key. Duplicate
+    values are removed unless unique is False.
+    '''
+
+    if unique: sockets = set(sockets)
+    return sorted(sockets,key=socket_key)
+
 def base64(s):
     """Return a base64 encoded version of the supplied string."""
 
@@ -1,7 +1,11 @@
 from sys import modules,exit
+from argparse import ArgumentParser
 from pathlib import Path
 from importlib.util import spec_from_file_location,module_from_spec
+from parsuite import helpers
+from parsuite.core.manifest import Manifest,decode_args
 import inspect
+import ast
 from re import match
 
 # =====================================
@@ -12,10 +16,164 @@ m = match(r'/.+/',inspect.getfile(
     )
 )
 
+class Handle:
+    '''A lazy reference to a parsuite module. The `help` string is
+    read from the module's source as a lightweight declaration so
+    that the module itself is only executed when an attribute other
+    than `name`, `path`, `help` or `args` is accessed, e.g. `parse`.
+
+    `help` and `args` are served from the manifest when the entry
+    for the module is fresh.
+    '''
+
+    def __init__(self,name,path,manifest=None):
+
+        self.name = name
+        self.path = path
+        self.manifest = manifest if manifest != None else Manifest()
+        self._module = None
+        self._help = None
+        self._args = None
+
+    @property
+    def module(self):
+        '''Execute the module file and return the resulting module
+        object. The module is executed only once.
+        '''
+
+        if not self._module:
+
+            # https://stackoverflow.com/questions/67631/how-to-import-a-module-given-the-full-path
+            # This is pretty much magic to me
+            spec = spec_from_file_location(self.name, self.path)
+            mod = module_from_spec(spec)
+            spec.loader.exec_module(mod)
+            self._module = mod
+
+        return self._module
+
+    @property
+    def loaded(self):
+
+        return self._module != None
+
+    @property
+    def help(self):
+        '''Return the help string for the module. Fall back to
+        executing the module when the help string can't be evaluated
+        as a literal.
+        '''
+
+        if self._help == None:
+
+            entry = self.manifest.entry(self.name,self.path)
+            if entry and entry['help'] != None:
+                self._help = entry['help']
+
+            else:
+
+                self._help = read_declaration(self.path,'help')
+                if self._help == None:
+                    self._help = self.module.help
+
+                self.manifest.record(self.name,self.path,help=self._help)
+
+        return self._help
+
+    @property
+    def args(self):
+        '''Return the list of Argument objects for the module. The
+        module is executed only when the manifest can't supply them.
+        '''
+
+        if self._args == None:
+
+            entry = self.manifest.entry(self.name,self.path)
+            if entry and entry['args'] != None:
+                self._args = decode_args(entry['args'])
+
+            else:
+
+                self._args = self.module.args
+                self.manifest.record(self.name,self.path,args=self._args)
+
+        return self._args
+
+    def __getattr__(self,attr):
+
+        if attr.startswith('_'):
+            raise AttributeError(attr)
+
+        return getattr(self.module,attr)
+
+    def __repr__(self):
+
+        return f'< [Handle] Name: {self.name} Loaded: {self.loaded} >'
+
+def read_declaration(path,name):
+    '''Read a module file and return the literal value assigned to
+    `name` at the top level of the module without executing it.
+    None is returned when the assignment is missing or not a literal.
+    '''
+
+    with open(path) as infile:
+        tree = ast.parse(infile.read(),str(path))
+
+    for node in tree.body:
+
+        if not node.__class__ == ast.Assign: continue
+
+        for target in node.targets:
+
+            if target.__class__ == ast.Name and target.id == name:
+
+                try:
+                    return ast.literal_eval(node.value)
+                except ValueError:
+                    return None
+
+    return None
+
+class SelectionError(Exception):
+    pass
+
+def select(argv,parser=None):
+    '''Return the name of the module selected by argv: the first
+    positional value following the global options accepted by parser.
+    Used to determine which module needs to be loaded before the
+    arguments are parsed.
+
+    None is returned when no module is selected or the global options
+    are invalid, leaving the full parser to report the error.
+    '''
+
+    pre = ArgumentParser(add_help=False,
+        parents=[parser] if parser else [])
+
+    def error(message): raise SelectionError(message)
+    pre.error = error
+
+    try:
+        known,remaining = pre.parse_known_args(argv)
+    except SelectionError:
+        return None
+
+    for arg in remaining:
+        if not arg.startswith('-'):
+            return arg if arg in handles else None
+
+    return None
+
 # ========================
 # DYNAMICALLY LOAD MODULES
 # ========================
 
+# Help strings and arguments cached from previous runs
+try:
+    manifest = Manifest(helpers.cache_directory() / 'manifest.json')
+except OSError:
+    manifest = Manifest()
+
 # Catch each module in a dictionary to be read by the main program
 handles = {}
 
@@ -32,11 +190,4 @@ files = sorted(
 for f in files:
 
     mname = f.name[:len(f.name)-3]
-
-    # https://stackoverflow.com/questions/67631/how-to-import-a-module-given-the-full-path
-    # This is pretty much magic to me
-    spec = spec_from_file_location(mname, f.absolute())
-    mod = module_from_spec(spec)
-    spec.loader.exec_module(mod)
-    handles[mname] = mod
-
+    handles[mname] = Handle(mname, f.absolute(), manifest)
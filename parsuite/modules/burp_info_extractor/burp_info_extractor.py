@@ -1,6 +1,7 @@
 from parsuite.core.argument import Argument,DefaultArguments
 from parsuite import helpers
 from parsuite.core.suffix_printer import *
+from parsuite.core.output import OutputTree
 from parsuite.abstractions.xml.burp import *
 from lxml import etree as ET
 import argparse
@@ -65,7 +66,9 @@ def parse(input_file=None, no_url=False, output_directory=None,
     bo = base_output_path = helpers.handle_output_directory(
         output_directory
     )
-    os.chdir(bo)
+
+    # Files are written relative to the output directory
+    output_tree = OutputTree(bo)
 
     counter = 0
 
@@ -85,7 +88,7 @@ def parse(input_file=None, no_url=False, output_directory=None,
         # ==================
 
 
-        with open(str(counter)+'.req','wb') as outfile:
+        with output_tree.open(str(counter)+'.req','wb') as outfile:
 
             if write_url:
                 outfile.write(
@@ -118,7 +121,8 @@ def parse(input_file=None, no_url=False, output_directory=None,
         # HANDLE THE RESPONSE
         # ===================
 
-        with open(str(counter)+'.resp.'+mimetype,'wb') as outfile:
+        with output_tree.open(str(counter)+'.resp.'+mimetype,'wb') \
+                as outfile:
             
             # Write the first line
             if write_url:
@@ -154,4 +158,6 @@ def parse(input_file=None, no_url=False, output_directory=None,
         
         counter += 1
 
+    output_tree.close()
+
     return 0
@@ -1,6 +1,7 @@
 from parsuite.core.argument import Argument,DefaultArguments,ArgumentGroup,MutuallyExclusiveArgumentGroup
 from parsuite import helpers
 from parsuite.core.suffix_printer import *
+from parsuite.core.output import OutputTree
 from sys import stderr,exit
 from pathlib import Path
 import xml.etree.ElementTree as ET
@@ -123,7 +124,9 @@ class GroupMember(Normalized):
 
 def parse(input_files, output_directory, *args, **kwargs):
 
-    helpers.handle_output_directory(output_directory)
+    bo = base_output_path = helpers.handle_output_directory(
+        output_directory
+    )
 
     groups = GroupList()
 
@@ -182,15 +185,15 @@ def parse(input_files, output_directory, *args, **kwargs):
 
     sprint('Dumping output to disk')
 
-    os.chdir(output_directory)
+    # Files are written relative to the output directory
+    output_tree = OutputTree(bo)
 
     # ====================
     # WRITE DOMAIN TO DISK
     # ====================
 
     if domain: 
-        with open('domain.txt','w') as outfile:
-            outfile.write(domain+'\n')
+        output_tree.write('domain.txt',domain+'\n')
 
     # =============================
     # DUMP EACH DETECTED GROUP TYPE
@@ -210,9 +213,6 @@ def parse(input_files, output_directory, *args, **kwargs):
 
         if cgroups:
 
-            os.mkdir(k)
-            os.chdir(k)
-
             # ==================================
             # DUMP MANIFESTS OF GROUPS AND USERS
             # ==================================
@@ -220,8 +220,8 @@ def parse(input_files, output_directory, *args, **kwargs):
             written_groups = []
             written_members = []
 
-            groups_file = open(f'groups.txt','w')
-            members_file = open(f'members.txt','w')
+            groups_file = output_tree.open(f'{k}/groups.txt')
+            members_file = output_tree.open(f'{k}/members.txt')
 
             sprint(f'Dumping {k} groups...')
             for group in cgroups:
@@ -242,29 +242,27 @@ def parse(input_files, output_directory, *args, **kwargs):
             # DUMP USERS BY GROUP
             # ===================
 
-            os.mkdir(f'members_by_group')
-            os.chdir(f'members_by_group')
+            output_tree.mkdir(f'{k}/members_by_group')
 
             for group in cgroups:
 
-                with open(group.normalized+'.users','w') as outfile:
+                with output_tree.open(f'{k}/members_by_group/' \
+                        f'{group.normalized}.users') as outfile:
 
                     for member in group.members:
 
                         outfile.write(member.value+'\n')
 
-            os.chdir('..')
-
             # ===================
             # DUMP GROUPS BY USER
             # ===================
 
-            os.mkdir(f'groups_by_member')
-            os.chdir(f'groups_by_member')
+            output_tree.mkdir(f'{k}/groups_by_member')
 
             for member in written_members:
 
-                with open(Normalized.normalize(member)+'.groups','w') as outfile:
+                with output_tree.open(f'{k}/groups_by_member/' \
+                        f'{Normalized.normalize(member)}.groups') as outfile:
 
                     for group in cgroups:
                         
@@ -272,6 +270,6 @@ def parse(input_files, output_directory, *args, **kwargs):
 
                             outfile.write(group.value+'\n')
 
-            os.chdir('../..')
+    output_tree.close()
 
     return 0
@@ -0,0 +1,42 @@
+from parsuite.core.argument import Argument,DefaultArguments
+from parsuite.abstractions.database import ScanDatabase
+from parsuite import helpers
+from parsuite.core.suffix_printer import *
+from time import perf_counter
+
+help='''Ingest masscan, nmap, or nessus files into a SQLite scan
+database that can be searched with the `query` module. Files already
+ingested, as determined by their content, are skipped.
+'''
+
+args = [
+    DefaultArguments.input_files,
+    Argument('--database','-db',
+        required=True,
+        help='SQLite database to ingest files into. Created when it ' \
+            'does not exist.'),
+]
+
+def parse(input_files=[], database=None, **kwargs):
+
+    with ScanDatabase(database) as db:
+
+        for input_file in input_files:
+
+            start = perf_counter()
+
+            try:
+                count = db.ingest(input_file)
+            except Exception as e:
+                esprint(f'Failed to ingest {input_file}: {e}')
+                continue
+
+            if count.__class__ == bool:
+                esprint(f'Unknown document provided: {input_file}')
+            elif count == None:
+                esprint(f'Already ingested: {input_file}')
+            else:
+                esprint(f'Ingested {count} hosts from {input_file} in ' \
+                    f'{perf_counter()-start:.2f}s')
+
+    return 0
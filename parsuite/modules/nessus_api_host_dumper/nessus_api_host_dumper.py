@@ -1,13 +1,13 @@
 from parsuite.core.argument import Argument,DefaultArguments
 from parsuite import helpers
 from parsuite.core.suffix_printer import *
+from parsuite.core.output import OutputTree
 from sys import exit,stderr,stdout
 import re
 from sys import exit
 import ipaddress
 from nessrest import ness6rest
 from pprint import pprint
-from os import chdir
 from pathlib import Path
 from getpass import getpass
 from termcolor import colored
@@ -155,8 +155,8 @@ class Scanner(ness6rest.Scanner):
 SEVS = SEVERITIES = [Severity(k,v) for k,v in 
         {0:'info',1:'low',2:'medium',3:'high',4:'critical'}.items()]
             
-def write_lines(filename,lines):
-    with open(filename,'a+') as outfile:
+def write_lines(output_tree,filename,lines):
+    with output_tree.open(filename,'a') as outfile:
         for line in lines:
             outfile.write(line+'\n')
 
@@ -208,8 +208,9 @@ def parse(url=None,username=None,password=None,severities=None,
         raise Exception('Output directory already exists')
 
     root.mkdir()
-    root = str(Path.cwd())+'/'+str(root)
-    chdir(root)
+
+    # Files are written relative to the output directory
+    output_tree = OutputTree(root)
 
     severities = [s for s in SEVS if s in severities]
 
@@ -278,19 +279,9 @@ def parse(url=None,username=None,password=None,severities=None,
         for id in plugin_ids:
             output = scanner.plugin_output_to_hosts(id)
 
-            cp = Path(output['severity'])
-
-
-            if not cp.exists(): cp.mkdir()
-            chdir(cp)
-
-            cp = Path(output['plugin_name'])
-            if not cp.exists():
-                cp.mkdir()
-                new = True
-            else:
-                new = False
-            chdir(cp)
+            # Plugins found in earlier scans are appended to
+            cp = Path(output['severity'],output['plugin_name'])
+            new = output_tree.mkdir(cp)
             
             col = colored(output['severity'].upper(),
                 COLORS[output['severity']])
@@ -298,25 +289,28 @@ def parse(url=None,username=None,password=None,severities=None,
             esprint(f'\t\t[{col}] {output["plugin_name"][:50]}')
 
             if output['additional_information'] and new:
-                write_lines('additional_information',
+                write_lines(output_tree,cp / 'additional_information',
                         [output['additional_information']])
 
             if output['hostnames']:
-                write_lines('hostnames',output['hostnames'])
+                write_lines(output_tree,cp / 'hostnames',
+                    output['hostnames'])
 
             if output['sockets']:
-                write_lines('sockets',output['sockets'])
+                write_lines(output_tree,cp / 'sockets',output['sockets'])
 
             if output['network_sockets']:
-                write_lines('network_sockets',output['network_sockets'])
+                write_lines(output_tree,cp / 'network_sockets',
+                    output['network_sockets'])
 
             if output['app_sockets']:
-                write_lines('app_sockets',output['app_sockets'])
-
-            chdir(root)
+                write_lines(output_tree,cp / 'app_sockets',
+                    output['app_sockets'])
 
         if targets:
-            write_lines('targets.txt',targets)
+            write_lines(output_tree,'targets.txt',targets)
+
+    output_tree.close()
 
     return 0
 
@@ -1,14 +1,16 @@
 from parsuite.core.argument import Argument,DefaultArguments
 from parsuite.abstractions.xml.nessus import *
 from parsuite import helpers
+from parsuite.parsers.nessus import index_plugins
+from parsuite.abstractions.nessus_plugins import PluginWriter,compressor
 from parsuite.core.suffix_printer import *
+from parsuite.core.output import OutputTree
 from pathlib import Path
 from lxml import etree as ET
 import argparse
 import os
 import re
 from sys import exit
-import ipaddress
 
 
 help='Parse a Nessus file and dump the contents to disk by: '\
@@ -23,17 +25,39 @@ args = [
         help='''Dump plugin output to disk. This has potential to
         consume vast amounts of disk space. Tread lightly.
         '''),
+    Argument('--plugin-output-store', '-pos',
+        choices=['plain','gzip','zstd'],
+        help='''Store plugin outputs by content, writing each distinct
+        output once to the plugin_outputs directory with the selected
+        compression. Each plugin directory receives a manifest mapping
+        affected sockets to the digests naming their outputs. Less disk
+        space is consumed than by --plugin-outputs when outputs repeat
+        across hosts. zstd requires the zstandard package.
+        '''),
     Argument('--disable-color-output', '-dc',
         action='store_true',
         help='''Disable color output.
-        ''')
+        '''),
+    Argument('--jobs', '-j',
+        type=int,
+        default=1,
+        help='''Number of processes used to write plugin directories.
+        Plugins are listed in the same order regardless. Default:
+        %(default)s
+        '''),
 ]
 
-# plugin_name_re = pname_re = re.compile('(\-|\s|\\|\<|\>|\=|\(|\)|/|\'|\"|\.)+')
-plugin_name_re = pname_re = re.compile('(\s|\W)+')
-
 def parse(input_file=None, output_directory=None, plugin_outputs=False,
-        disable_color_output=None, *args,**kwargs):
+        disable_color_output=None, jobs=1, plugin_output_store=None,
+        *args,**kwargs):
+
+    # Unavailable compression is reported before any output is written
+    if plugin_output_store:
+        try:
+            compressor(plugin_output_store)
+        except ImportError as e:
+            esprint(f'Plugin output store unavailable: {e}')
+            return 1
 
     if disable_color_output:
         color = False
@@ -49,14 +73,13 @@ def parse(input_file=None, output_directory=None, plugin_outputs=False,
     # Load the Nessus file
     sprint('Loading Nessus file')
     tree = ET.parse(input_file)
-    os.chdir(bo)
 
-    os.mkdir('additional_info')
-    os.chdir('additional_info')
+    # Files are written relative to the output directory
+    output_tree = OutputTree(bo)
 
     # Dump target ip addresses
     sprint('Dumping target information (all scanned addresses)')
-    with open('target_ips.txt','w') as of:
+    with output_tree.open('additional_info/target_ips.txt') as of:
 
         # dump all target s to disk
         for pref in tree.findall('.//preference'):
@@ -71,7 +94,7 @@ def parse(input_file=None, output_directory=None, plugin_outputs=False,
 
     # Dump responsive ips
     sprint('Dumping responsive ip addresses')
-    with open('responsive_ips.txt','w') as of:
+    with output_tree.open('additional_info/responsive_ips.txt') as of:
 
         cache = []
 
@@ -93,7 +116,8 @@ def parse(input_file=None, output_directory=None, plugin_outputs=False,
         values = {}
         if tree.xpath(f'//tag[@name="{a}"]'):
 
-            with open(fname.replace('-','_'),'w') as outfile:
+            with output_tree.open('additional_info/' +
+                    fname.replace('-','_')) as outfile:
 
                 values = []
                 for ele in tree.xpath(f'//tag[@name="{a}"]'):
@@ -103,7 +127,7 @@ def parse(input_file=None, output_directory=None, plugin_outputs=False,
 
     # Dump open ports
     sprint('Dumping open ports')
-    with open('open_ports.txt','w') as of:
+    with output_tree.open('additional_info/open_ports.txt') as of:
 
         ports = [
             str(p) for p in sorted(set([int(e) for e in tree.xpath('//@port')])) if p
@@ -111,7 +135,8 @@ def parse(input_file=None, output_directory=None, plugin_outputs=False,
 
         of.write('\n'.join(ports))
 
-    os.chdir('..')
+    # Writer threads are stopped before plugin writers are forked
+    output_tree.flush()
 
     # =====================================
     # BEGIN DUMPING THE REPORT BY PLUGIN ID
@@ -135,12 +160,18 @@ def parse(input_file=None, output_directory=None, plugin_outputs=False,
             'critical':'magenta'
     }
 
+    # ===========================================
+    # GROUP REPORT ITEMS BY PLUGIN IN A SINGLE PASS
+    # ===========================================
+
+    plugins = index_plugins(tree)
+
     # ============================================
     # GET LONGEST PID LENGTH FOR OUTPUT FORMATTING
     # ============================================
 
     pid_len = 0
-    for pid in list(set(tree.xpath('//@pluginID'))):
+    for pid in plugins:
         plen = pid.__len__()
         if plen > pid_len: pid_len = plen
     pid_len += 2
@@ -157,282 +188,56 @@ def parse(input_file=None, output_directory=None, plugin_outputs=False,
     print(header)
     print('-'*header.__len__())
 
-    for plugin_id in list(set(tree.xpath('//@pluginID'))):
-
-        rhosts = {}
-        protocols = []
-        alert = True
-        pid = plugin_id
-
-        # ==========================================================
-        # EXTRACT PLUGIN IDS, PROTOCOLS, AND INITIALIZE REPORT HOSTS
-        # ==========================================================
-
-        for eri in tree.xpath(f'//ReportItem[@pluginID="{plugin_id}"]'):
-            ri = FromXML.report_item(eri)
-
-            if not ri.protocol in protocols:
-                protocols.append(ri.protocol)
-
-            if alert:
-                alert = False
-
-                if color:
-                    rf = colored(ri.risk_factor.upper(),
-                            color_lookup[ri.risk_factor])
-
-                    if ri.risk_factor.__len__() < 11:
-                        rf += ' ' * (11-ri.risk_factor.__len__())
-
-                    if ri.exploitable:
-                        rf += colored('True ','red')
-                    else:
-                        rf += 'False'
-
-                    rf += '      '
-
-                else:
-
-                    rf = ri.risk_factor.upper()
-
-                    if ri.risk_factor.__len__() < 11:
-                        rf += ' ' * (11-ri.risk_factor.__len__())
+    writer = PluginWriter(bo,plugins,plugin_outputs,plugin_output_store)
 
-                    if ri.exploitable:
-                        rf += 'True '
-                    else:
-                        rf += 'False'
+    for summary in writer.write_all(jobs):
 
-                    rf += '      '
+        pid = summary.plugin_id
+        risk_factor = summary.risk_factor
 
-                if pid.__len__() < pid_len:
-                    pid += ' ' * (pid_len-pid.__len__())
-                    pid += '    '
+        if color:
+            rf = colored(risk_factor.upper(),
+                    color_lookup[risk_factor])
 
-                rf += '    ' + pid
-                rf += ri.plugin_name
-
-                print(rf)
-
-            parent = eri.getparent()
-            name = parent.get('name')
-
-            if name in rhosts:
-
-                rh = rhosts[name]
-                ports = rh.ports.get('number',ri.port.number) \
-                    .get('protocol',ri.protocol)
-                if not ports:
-                    rh.append_port(ri.port)
-                else:
-                    port = ports[0]
+            if risk_factor.__len__() < 11:
+                rf += ' ' * (11-risk_factor.__len__())
 
+            if summary.exploitable:
+                rf += colored('True ','red')
             else:
+                rf += 'False'
 
-                rh = FromXML.report_host(parent)
-                rh.append_port(ri.port)
-                rhosts[name] = rh
-
-            if ri.plugin_output:
-                ri.port.plugin_outputs.append_output(
-                    plugin_id, ri.plugin_output
-                )
-
-        # Handle finding index item
-        sev = ri.risk_factor.upper()
-        prefix = f'[{sev}] [{plugin_id}] '
-        suffix = ' '
-        if ri.exploit_available:
-            suffix += '[EXPLOITABLE]'
-        if ri.exploit_frameworks:
-            fws = ','.join([fw.upper() for fw in ri.exploit_frameworks])
-            suffix += f'[EXPLOIT FRAMEWORKS: {fws}]'
-        finding_index[sev].append(prefix+ri.plugin_name+suffix)
-
-        # ================================
-        # BUILD REPORT ITEM DIRECTORY NAME
-        # ================================
-
-        ri_dir = re.sub(
-            pname_re, '_', ri.plugin_name
-        ).lower().strip('_')
-
-        # =========================
-        # BUILD DIRECTORY STRUCTURE
-        # =========================
-
-        if not Path(ri.risk_factor).exists():
-            os.mkdir(ri.risk_factor)
-        os.chdir(ri.risk_factor)
-
-        if not Path(ri_dir).exists():
-            os.mkdir(ri_dir)
-        os.chdir(ri_dir)
-
-        # =====================
-        # WRITE CONTENT TO DISK
-        # =====================
-
-        # Additional information
-        with open('additional_info.txt','w') as of:
-            of.write(ri.additional_info())
-
-        for protocol in protocols:
-
-            # Address Lists
-            ips = []
-            sockets = []
-            fqdns = []
-            fsockets = []
-
-            # Unique ports affected
-            ports = []
-
-            try:
+            rf += '      '
 
-                if plugin_outputs:
+        else:
 
-                    plugin_outputs_file = open(f'{protocol}_plugin_outputs.txt','w')
+            rf = risk_factor.upper()
 
-                for rhost in rhosts.values():
+            if risk_factor.__len__() < 11:
+                rf += ' ' * (11-risk_factor.__len__())
 
-                    plist = rhost.__getattribute__(protocol+'_ports')
-                    if plist:
-
-                        for addr in rhost.to_addresses(fqdns=True):
-
-                            if re.match(ipv4_re,addr):
-                                ips.append(addr)
-                            elif re.match(ipv6_re,addr):
-                                ips.append(addr)
-                            elif re.match(fqdn_re,addr):
-                                fqdns.append(addr)
-                            else:
-                                continue
-
-                        for number,port in plist.items():
-
-                            socket = None
-                            fsocket = None
-
-                            if number > 0:
-                                ports.append(number)
-
-                            for ip in ips:
-                                if number > 0:
-                                    socket = f'{ip}:{port.number}'
-                                    sockets.append(socket)
-
-                            for fqdn in fqdns:
-                                if number > 0:
-                                    fsocket = f'{fqdn}:{port.number}'
-                                    fsockets.append(fsocket)
-
-                            if not socket: continue
-
-                            header = socket
-                            if fsocket: header = header+','+fsocket+':'
-                            ban = '='*header.__len__()
-                            header = f'{ban}{header}{ban}'
-
-                            if plugin_outputs and plugin_id in port.plugin_outputs:
-
-                                plugin_output = f'{header}\n\n'+'\n'.join(
-                                    port.plugin_outputs[plugin_id]
-                                )
-
-                                plugin_outputs_file.write('\n\n'+plugin_output)
-
-            finally:
-
-                if plugin_outputs:
-                    plugin_outputs_file.close()
-
-            # =====================
-            # HANDLE IPv4 ADDRESSES
-            # =====================
-
-            '''
-
-            IPs are now properly sorted before written to disk.
-
-            1. convert each ipv4 string to an ipaddress.ip_address object
-            2. sort the ip_address objects
-            3. convert each ip_address object back to a string
-            '''
-
-            ips = [ip.__str__() for ip in sorted(set([ipaddress.ip_address(ip) for ip in ips]))]
-
-            # ===================
-            # HANDLE IPv4 SOCKETS
-            # ===================
-
-            '''
-
-            Sockets are now properly sorted before written to disk.
-
-            1. unique string sockets
-            2. map each string ip to a list of ports
-            3. convert each string ip to an ipaddress.ip_address object
-            4. sort the ip_address objects
-            5. create a new list of sockets
-            '''
-
-            sockets = set(sockets)
-            smap = {}
-
-            for s in sockets:
-                ip,port = s.split(':')
-                if ip not in smap:
-                    smap[ip] = [port]
-                elif port not in smap[ip]:
-                    smap[ip].append(port)
-
-            sips = [ip.__str__() for ip in sorted([ipaddress.ip_address(ip) for ip in set(smap.keys())])]
-            sockets = []
-            for sip in sips:
-                for p in sorted(smap[sip]):
-                    s = f'{sip}:{p}'
-                    if s not in sockets: sockets.append(s)
-
-            # ============
-            # HANDLE PORTS
-            # ============
-
-            ports = sorted(set(ports))
-            if ports:
-
-                # write a list of unique ports to disk
-                with open(f'{protocol}_ports.txt','w') as outfile:
-                    outfile.write('\n'.join([str(p) for p in ports])+'\n')
-
-            # ============
-            # HANDLE FQDNS
-            # ============
-
-            fqdns = sorted(set(fqdns))
-            fsockets = sorted(set(fsockets))
-
-            # write address lists to disk
-            for fmt,lst in {'ips':ips,
-                'sockets':sockets,'fqdns':fqdns,
-                'fqdn_sockets':fsockets}.items():
-
-                if not lst: continue
+            if summary.exploitable:
+                rf += 'True '
+            else:
+                rf += 'False'
 
-                fname = f'{protocol}_{fmt}.list'
+            rf += '      '
 
-                with open(fname,'w') as outfile:
+        if pid.__len__() < pid_len:
+            pid += ' ' * (pid_len-pid.__len__())
+            pid += '    '
 
-                    outfile.write('\n'.join(lst)+'\n')
+        rf += '    ' + pid
+        rf += summary.plugin_name
 
-        os.chdir('../../')
+        print(rf)
 
-    os.chdir('additional_info')
+        # Handle finding index item
+        finding_index[risk_factor.upper()].append(summary.index_entry)
 
     print()
     sprint('Writing report item index')
-    with open('report_item_index.txt','w') as outfile:
+    with output_tree.open('additional_info/report_item_index.txt') as outfile:
 
         outfile.write('[Risk Factor] [Plugin ID] Plugin Name [Exploitable]' \
                 ' [Exploit Frameworks]\n')
@@ -442,5 +247,7 @@ def parse(input_file=None, output_directory=None, plugin_outputs=False,
             if finding_index[k]:
                 outfile.write('\n'.join(finding_index[k])+'\n')
 
+    output_tree.close()
+
     print()
     return 0
@@ -1,9 +1,7 @@
 from parsuite.core.argument import Argument,DefaultArguments
-from parsuite.abstractions.xml.generic import network_host as NH
 from parsuite import helpers
+from parsuite import parsers
 from parsuite.core.suffix_printer import *
-#import xml.etree.ElementTree as ET
-from lxml import etree as ET
 import argparse
 import os
 import re
@@ -13,28 +11,36 @@ help='Accept a XML file generated '\
 
 args = [
     DefaultArguments.input_file,
+    DefaultArguments.no_cache,
 ]
 
-def parse(input_file=None, renegade_parse=None, **kwargs):
+def parse(input_file=None, renegade_parse=None, no_cache=False,
+        **kwargs):
 
+    # Hosts are read from the parsed scan cache when the file has been
+    # parsed before
+    cache = None if no_cache else parsers.ScanCache()
 
-    # parse the input file
-    tree = ET.parse(input_file)
+    found = False
+    for host in parsers.iter_hosts(input_file,cache=cache):
 
-    scripts = tree.xpath('//host/ports/port/script[@id="ssl-cert"]')
+        # First address of the host, as listed by Nmap
+        address = host.key
 
-    if not scripts:
-        esprint('No ssl-cert script results found in XML file!')
+        for port in host.ports:
+            for script in port.scripts:
+
+                if script.id != 'ssl-cert': continue
+                found = True
 
-    for script in scripts:
+                for line in script.output.split('\n'):
 
-        address = script.xpath('../../../address')[0].get('addr')
+                    if re.match(r'^Subject',line,re.I):
 
-        for line in script.get('output').split('\n'):
+                        line = re.sub(r"(Subject|Subject Alternative Name): ","",line) 
+                        print(f'{address}:{line}')
 
-            if re.match(r'^Subject',line,re.I):
-                
-                line = re.sub(r"(Subject|Subject Alternative Name): ","",line) 
-                print(f'{address}:{line}')
+    if not found:
+        esprint('No ssl-cert script results found in XML file!')
 
     return 0
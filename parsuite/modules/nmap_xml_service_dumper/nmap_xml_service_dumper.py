@@ -1,9 +1,8 @@
 from parsuite.core.argument import Argument,DefaultArguments
-from parsuite.abstractions.xml.generic import network_host as NH
 from parsuite import helpers
+from parsuite import parsers
 from parsuite.core.suffix_printer import *
-#import xml.etree.ElementTree as ET
-from lxml import etree as ET
+from parsuite.core.output import OutputTree
 import argparse
 import os
 
@@ -16,37 +15,64 @@ args = [
     Argument('--tcpwrapped', '-tw', action='store_true',
         help='Enable dumping of tcpwrapped services.'),
     Argument('--output-directory', '-od', required=True,
-        help='Output directory.')
+        help='Output directory.'),
+    DefaultArguments.no_cache,
 ]
 
 def parse(input_file=None, output_directory=None,
-        tcpwrapped=None, **kwargs):
+        tcpwrapped=None, no_cache=False, **kwargs):
 
     bo = base_output_path = helpers.handle_output_directory(
         output_directory
     )
 
-    # parse the input file
-    tree = ET.parse(input_file)
+    # Hosts are read from the parsed scan cache when the file has been
+    # parsed before
+    cache = None if no_cache else parsers.ScanCache()
+    hosts = list(parsers.iter_hosts(input_file,cache=cache))
 
-    os.chdir(output_directory)
-    services = set(tree.xpath('//service/@name'))
+    # Only ports with a service element are considered. The parser
+    # names ports without one "unknown" but leaves the method unset.
+      # {service name:{(protocol,port)}}
+    services = {}
+      # {service name:{position of each up host}}
+    service_hosts = {}
+      # {(protocol,port):[position of each up host with the port]}
+    port_hosts = {}
+
+    for position,host in enumerate(hosts):
+
+        up = host.status == 'up'
+
+        for port in host.ports:
+
+            if up:
+                positions = port_hosts.setdefault(
+                    (port.protocol,port.number),[])
+                if not positions or positions[-1] != position:
+                    positions.append(position)
+
+            if port.service == None or port.service.method == None:
+                continue
+
+            sname = port.service.name
+            services.setdefault(sname,set()) \
+                .add((port.protocol,port.number))
+
+            if up: service_hosts.setdefault(sname,set()).add(position)
+
+    # Files are written relative to the output directory
+    output_tree = OutputTree(bo)
     sprint(f'Parsing {len(services)} services...\n')
 
-    hcache = []
-    for sname in services:
+    for sname,pairs in services.items():
 
         # skip tcpwrapped services unless specified
         if sname == 'tcpwrapped' and not tcpwrapped:
             continue
 
-        hosts = tree.findall(
-            f'.//service[@name="{sname}"]/../../../status[@state="up"]/..'
-        )
-        
-        if hosts:
-            os.mkdir(sname)
-            os.chdir(sname)
+        if sname in service_hosts:
+            output_tree.mkdir(sname)
         else:
             continue
 
@@ -64,15 +90,10 @@ def parse(input_file=None, output_directory=None,
         '''
         to_dump = {}
 
-        # Iterate over a set of unique protocol/port combinations
-        # associated with a given service. Each item of the set will
-        # be a tuple in the following form: (protocol,port)
-        for tup in set([
-                (p.get('protocol'),p.get('portid'),) for p in
-                tree.xpath(f'//service[@name="{sname}"]/..')
-            ]):
-
-            protocol, port = tup
+        # Iterate over the unique protocol/port combinations associated
+        # with a given service. Each item of the set will be a tuple in
+        # the following form: (protocol,port)
+        for protocol,port in pairs:
 
             if protocol not in to_dump:
 
@@ -85,17 +106,11 @@ def parse(input_file=None, output_directory=None,
 
             dct = to_dump[protocol]
 
-            # 
-            for ehost in tree.xpath(
-                    f'.//service[@name="{sname}"]/../../../status[@state=' \
-                    f'"up"]/../ports/port[@protocol="{protocol}" and ' \
-                    f'@portid="{port}"]/../..'
-                ):
+            # Up hosts offering the service that have the port
+            for position in port_hosts.get((protocol,port),[]):
 
-                try:
-                    host = hcache[hcache.index(ehost.get('addr'))]
-                except:
-                    host = NH.FromXML.host(ehost)
+                if not position in service_hosts[sname]: continue
+                host = hosts[position]
 
                 if host.ipv4_address:
                     dct['addresses'].append(host.ipv4_address)
@@ -124,13 +139,13 @@ def parse(input_file=None, output_directory=None,
 
                 if not lst: continue
 
-                with open(f'{protocol}_{tpe}.txt','w') as outfile:
+                if tpe in ['addresses','fqdns']:
+                    lst = helpers.sort_addresses(lst)
+                else:
+                    lst = helpers.sort_sockets(lst)
 
-                    outfile.write(
-                        '\n'.join(sorted(list(set(lst))))
-                    )
+                output_tree.write(f'{sname}/{proto}_{tpe}.txt','\n'.join(lst))
 
-        # Change back to main output directory
-        os.chdir('..')
+    output_tree.close()
 
     return 0
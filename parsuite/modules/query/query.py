@@ -0,0 +1,142 @@
+from parsuite.core.argument import Argument,DefaultArguments
+from parsuite.abstractions.database import ScanDatabase
+from parsuite.abstractions.xml.generic.network_host import PortSearch
+from parsuite.core.output import OutputWriter
+from parsuite.core.suffix_printer import *
+from parsuite import helpers
+import csv
+import io
+import os
+
+help='''Query a SQLite scan database populated by the `ingest`
+module and dump hosts and open ports in the formats produced by
+`xml_dumper`. Hosts recorded by multiple files are merged by address.
+'''
+
+args = [
+    Argument('--database','-db',
+        required=True,
+        help='SQLite database populated by the ingest module.'),
+    Argument('--delimiter','-d',
+        default='\n',
+        type=str,
+        help='''String delimiter used for each line of output.
+        Default: newline (\\n)
+        '''),
+    Argument(
+        '--format','-f',
+        default='address',
+        choices=['socket','address','uri','port','service'],
+        help='''Output format. Default: %(default)s'''),
+    Argument(
+        '--transport-layer','-tl',
+        action='store_true',
+        help='''When printing URIs, use the transport layer for
+        the scheme component, e.g. tcp instead of http'''
+    ),
+    Argument(
+        '--fqdns',
+        action='store_true',
+        help='''Return FQDNs along with ip addresses. Default:
+        %(default)s'''),
+    Argument(
+        '--port-required',
+        action='store_true',
+        help='''Return hosts only when they have at least one port open.
+        Default: %(default)s
+        '''),
+    Argument(
+        '--port-search',
+        nargs='+',
+        default=[],
+        type=int,
+        help='''Return hosts only when they have matching open ports.
+        Default: %(default)s
+        '''),
+    Argument(
+        '--sreg','-pr',
+        action='store_true',
+        help='''Treat service searches as individual regexes.'''
+    ),
+    Argument(
+        '--extrainfo','-e',
+        action='store_true',
+        help='''Display extra info, such as service versions.
+        Supported output formats: URI, Sockets.
+        '''
+    ),
+    Argument(
+        '--service-search',
+        nargs='+',
+        default=[],
+        help='''Search services for a string. Default: %(default)s
+        '''),
+    Argument(
+        '--protocols',
+        nargs='+',
+        default=['tcp'],
+        choices=['tcp','udp','sctp','ip'],
+        help='''Transport layer protocols to dump: tcp, udp, sctp, ip.
+        Default: %(default)s'''),
+    Argument(
+        '--sort','-s',
+        action='store_true',
+        help='''Sort output. Default: %(default)s'''),
+]
+
+SERVICES_HEADER = ['socket','protocol','service_name','service_product',
+    'service_version','service_extrainfo']
+
+PLURAL_MAP = {'address':'addresses','socket':'sockets','uri':'uris',
+        'port':'ports','service':'services'}
+
+# Keys ordering sorted output. Addresses and sockets are ordered
+# numerically rather than as strings.
+SORT_KEYS = {'addresses':helpers.address_key,'sockets':helpers.socket_key,
+        'uris':helpers.socket_key,'ports':int,
+        'services':helpers.socket_key}
+
+def format_row(row):
+    '''Format a list of values as a CSV line.
+    '''
+
+    output = io.StringIO()
+    csv.writer(output).writerow(row)
+    return output.getvalue()
+
+def parse(database=None, format='address', delimiter='\n', fqdns=False,
+        port_required=False, port_search=[], service_search=[],
+        sreg=False, extrainfo=False, protocols=['tcp'],
+        transport_layer=False, sort=False, **kwargs):
+
+    format = PLURAL_MAP[format]
+
+    if not os.path.exists(database):
+        esprint(f'Database does not exist: {database}')
+        return 1
+
+    # Values are written as each host is read unless sorting. Duplicate
+    # values are only written once.
+    if format == 'services':
+        format_value = format_row
+        writer = OutputWriter(delimiter='',sort=sort,
+            key=SORT_KEYS[format],header=format_row(SERVICES_HEADER))
+    else:
+        format_value = str if format == 'ports' else None
+        writer = OutputWriter(delimiter=delimiter,flush=True,sort=sort,
+            key=SORT_KEYS.get(format))
+
+    with ScanDatabase(database) as db, writer:
+
+        for output in db.__getattribute__('to_'+format)(
+                fqdns=fqdns,
+                protocols=protocols,
+                transport_layer=transport_layer,
+                port_required=port_required,
+                extrainfo=extrainfo,
+                search=PortSearch(port_search,service_search,sreg)):
+
+            if format_value: output = map(format_value,output)
+            writer.writes(output)
+
+    return 0
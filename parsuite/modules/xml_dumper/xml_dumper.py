@@ -1,21 +1,41 @@
 from parsuite.core.argument import Argument,DefaultArguments,ArgumentGroup,MutuallyExclusiveArgumentGroup
 from parsuite import helpers
 from parsuite.core.suffix_printer import *
-from parsuite.parsers.nmap import parse_nmap, parse_http_links as parse_nmap_links
-from parsuite.parsers.nessus import parse_nessus, parse_http_links as parse_nessus_links
+from parsuite import parsers
+from parsuite.parsers.nmap import parse_nmap
+from parsuite.parsers.nessus import parse_nessus
 from parsuite.parsers.masscan import parse_masscan
+from parsuite.parsers.merge import MergedReport
+from parsuite.abstractions.xml.generic.network_host import PortSearch
+from parsuite.abstractions import columnar
+from parsuite.abstractions.columnar import ScanStore
+from parsuite.core.output import OutputWriter
 from sys import stderr,exit
 import xml.etree.ElementTree as ET
 import argparse
 import os
 import pdb
 import csv
+from functools import partial
+from multiprocessing import Pool
 
 class CSVList(list):
 
+    def __init__(self,*args,**kwargs):
+
+        super().__init__(*args,**kwargs)
+        self.writer = csv.writer(self)
+
     def write(self,value):
         self.append(value)
 
+    def format_row(self,row):
+        '''Format a list of values as a CSV line.
+        '''
+
+        self.writer.writerow(row)
+        return self.pop()
+
 
 help='''Dump hosts and open ports from multiple masscan, nmap,
 or nessus files. A generalized abstraction layer is used to
@@ -97,17 +117,136 @@ args = [
         choices=['tcp','udp','sctp','ip'],
         help='''Transport layer protocols to dump: tcp, udp, sctp, ip. Note 
         that not all file formats support all protocols.
-        Default: %(default)s''')
+        Default: %(default)s'''),
+    Argument(
+        '--jobs','-j',
+        type=int,
+        default=1,
+        help='''Number of processes used to parse input files. Hosts
+        are merged in the order the files were supplied. Default:
+        %(default)s'''),
+    Argument(
+        '--backend','-b',
+        default='object',
+        choices=['object','columnar'],
+        help='''Representation used to query hosts. columnar loads all
+        ports into typed arrays and applies filters as batched mask
+        operations. The arrays are kept in the scan cache, so later
+        queries against the same files skip parsing and building them.
+        It supports the address, socket and port formats with exact
+        service searches; other queries fall back to object. Default:
+        %(default)s'''),
+    Argument(
+        '--sort','-s',
+        action='store_true',
+        help='''Sort output. Results are written once all input has been
+        processed instead of as each host is processed. Large outputs
+        are sorted on disk. SAN DNS names are always sorted. Default:
+        %(default)s'''),
+    Argument(
+        '--merge-state','-ms',
+        help='''File in which hosts merged from the input files are
+        saved. Files merged in previous runs, as determined by their
+        content, are not parsed again. Hosts from new files are merged
+        into those already saved and output is produced for all of
+        them.'''),
+    DefaultArguments.no_cache,
 ]
 
+SERVICES_HEADER = ['socket','protocol','service_name','service_product',
+    'service_version','service_extrainfo']
+
+# Formats supported by the columnar backend
+COLUMNAR_FORMATS = ['addresses','sockets','ports']
+
 PLURAL_MAP = {'address':'addresses','socket':'sockets','uri':'uris',
         'port':'ports','san_dns_name':'san_dns_names',
         'service':'services'}
 
+# Keys ordering sorted output. Addresses and sockets are ordered
+# numerically rather than as strings.
+SORT_KEYS = {'addresses':helpers.address_key,'sockets':helpers.socket_key,
+        'uris':helpers.socket_key,'ports':int,
+        'services':helpers.socket_key}
+
+def read_hosts(input_files, port_required, cache, jobs=1,
+        merge_state=None):
+    '''Return an iterable of hosts parsed from the input files, or
+    None when the merge state can't be loaded.
+    '''
+
+    # Hosts from a single Nmap or Nessus file don't need to be merged
+    # with any others and can be streamed from disk one at a time.
+    if len(input_files) == 1 and not merge_state and \
+            parsers.streaming_parser(input_files[0]):
+
+        hosts = (host for host in parsers.iter_hosts(input_files[0],
+                port_required,cache)
+            if host.key)
+
+    else:
+
+        # Hosts are merged by address and ports by protocol and number
+        if merge_state:
+
+            try:
+                merged = MergedReport.load(merge_state,port_required)
+            except ValueError as e:
+                esprint(e.__str__())
+                return None
+
+            # {input_file:digest} for files not yet merged
+            digests = {}
+            for input_file in input_files:
+
+                digest = helpers.file_digest(input_file)
+                if merged.merged(input_file,digest):
+                    esprint(f'Already merged: {input_file}')
+                else:
+                    digests[input_file] = digest
+
+            input_files = list(digests)
+
+        else:
+
+            merged = MergedReport(port_required)
+
+        # Files are parsed in worker processes when requested. imap
+        # yields reports in input order, keeping the merge deterministic.
+        parse_file = partial(parsers.parse_file,
+            require_open_ports=port_required,cache=cache)
+
+        if jobs > 1 and len(input_files) > 1:
+            pool = Pool(min(jobs,len(input_files)))
+            reports = pool.imap(parse_file,input_files)
+        else:
+            pool = None
+            reports = map(parse_file,input_files)
+
+        for input_file,report in zip(input_files,reports):
+
+            if report == None:
+                esprint(f'Unknown document provided: {input_file}')
+                continue
+
+            merged.merge_report(report)
+            if merge_state: merged.record(input_file,digests[input_file])
+
+        if pool:
+            pool.close()
+            pool.join()
+
+        if merge_state: merged.save(merge_state)
+
+        hosts = merged.hosts.values()
+
+    return hosts
+
 def parse(input_files, format, all_addresses, fqdns, 
         port_required, port_search, service_search, protocols,
         transport_layer, delimiter, http_links, sreg, extrainfo,
-        *args, **kwargs):
+        jobs=1, backend='object', sort=False, no_cache=False,
+        merge_state=None, *args, **kwargs):
 
     format = PLURAL_MAP[format]
 
@@ -117,34 +256,31 @@ def parse(input_files, format, all_addresses, fqdns,
 
     if http_links:
         esprint('Parsing HTTP links')
-        # TODO: Update this when lxml has been normalized across all parser
-        import lxml.etree as ET
-        links = []
+        writer = OutputWriter(sort=sort,flush=True,key=helpers.socket_key)
         for input_file in input_files:
 
             try:
-                tree = ET.parse(input_file)
-                f = fingerprint = helpers.fingerprint_xml(tree)
+                f = helpers.fingerprint_file(input_file)
                 if not f:
                     esprint(f'Unknown document provided: {input_file}')
-                if not f in ['nessus','nmap']:
+                if not f in parsers.LINK_PARSERS:
                     esprint(f'Unsupported document provided: {input_file}')
                 else:
                     esprint(f'Dumping {f} file: {input_file}')
-                    links += globals()[f'parse_{f}_links'](
-                        tree, *args, **kwargs
-                    )
+
+                    # Links are written as each host is parsed
+                    with helpers.open_input(input_file) as infile:
+                        for links in parsers.LINK_PARSERS[f](infile,
+                                *args, **kwargs):
+                            writer.writes(links)
     
             except Exception as e:
                 esprint(f'Unhandled exception occurred while parsing: {input_file}')
                 print('\n'+e.__str__()+'\n')
     
-        print('\n'.join(list(set(sorted(links)))))
+        writer.close()
     
         return 0
-    else:
-        import xml.etree.ElementTree as ET
-            
 
     # ==========================
     # NEGOTIATE THE SCHEME LAYER
@@ -156,58 +292,99 @@ def parse(input_files, format, all_addresses, fqdns,
     else:
         scheme_layer = False
 
+    if backend == 'columnar' and (not format in COLUMNAR_FORMATS or
+            (sreg and service_search) or extrainfo or merge_state):
+        esprint('Query unsupported by the columnar backend, using object')
+        backend = 'object'
+
     # ==============================================
     # PARSE EACH INPUT FILE INTO A REPORT DICTIONARY
     # ==============================================
 
-    # host objects organized by address
-      # {address:Host}
-    final_report = {}
-    for input_file in input_files:
-        
-        tree = ET.parse(input_file)
-        fingerprint = helpers.fingerprint_xml(tree)
-
-        # Reference to globas is a means of getting a handle on the appropriate
-        # class to perform parsing.
-        for address,host in globals()['parse_'+fingerprint](tree,port_required) \
-            .items():
-            if not address in final_report:
-                final_report[address] = host
-            else:
-                for port in host.ports:
-                    final_report[address].append_port(port)
+    # Parsed hosts are cached on disk so that repeated queries against
+    # the same files skip XML parsing
+    cache = None if no_cache else parsers.ScanCache()
+
+    if backend == 'columnar':
+
+        # Stores are cached alongside parsed hosts, so that later queries
+        # against the same files skip parsing and building the store
+        store,key = None,None
+        if cache and cache.directory != None:
+            try:
+                key = cache.files_key(input_files,'ScanStore',
+                    version=columnar.VERSION,port_required=port_required)
+                store = cache.load_object(key)
+            except OSError as e:
+                esprint(f'Scan cache disabled: {e}')
+
+        if store == None:
+
+            hosts = read_hosts(input_files,port_required,cache,jobs)
+            if hosts == None: return 1
+
+            try:
+                store = ScanStore.from_hosts(hosts)
+            except ValueError as e:
+                esprint(f'Failed to build columnar store: {e}')
+                return 1
+
+            if key: cache.store_object(key,store,sources=input_files)
+
+    else:
+
+        hosts = read_hosts(input_files,port_required,cache,jobs,
+            merge_state)
+        if hosts == None: return 1
 
     # ==========================
     # DUMP THE RESULTS TO STDOUT
     # ==========================
 
+    # Values are written as each host is processed unless sorting.
+    # Duplicate values are only written once.
+    if format == 'services':
+        csv_output = CSVList()
+        format_value = csv_output.format_row
+        writer = OutputWriter(delimiter='',sort=sort,
+            key=SORT_KEYS[format],header=format_value(SERVICES_HEADER))
+    else:
+        format_value = str if format == 'ports' else None
+        writer = OutputWriter(delimiter=delimiter,flush=True,
+            sort=sort or format == 'san_dns_names',
+            key=SORT_KEYS.get(format))
+
     # Build the appropriate output
-    output = []
-    for address,host in final_report.items():
-        output += host.__getattribute__('to_'+format)(
+    if backend == 'columnar':
+
+        outputs = [store.__getattribute__('to_'+format)(
             fqdns=fqdns,
-            open_only=True,
             protocols=protocols,
-            scheme_layer=scheme_layer,
             port_search=port_search,
             service_search=service_search,
-            sreg=sreg,
-            extrainfo=extrainfo,
-        )
-    
-    # Format and dump the output
-    if format == 'ports':
-        print(delimiter.join(list(set([str(p) for p in output]))))
-    if format == 'services':
-        csv_output = CSVList()
-        writer = csv.writer(csv_output)
-        writer.writerow(['socket','protocol','service_name','service_product','service_version','service_extrainfo'])
-        for row in output: writer.writerow(row)
-        print(''.join(csv_output))
-    if format == 'san_dns_names':
-        print(delimiter.join(sorted(list(set(output)))))
+        )]
+
     else:
-        print(delimiter.join(output))
+
+        # Search terms are compiled once rather than for each host
+        search = PortSearch(port_search,service_search,sreg)
+
+        outputs = (host.__getattribute__('to_'+format)(
+                fqdns=fqdns,
+                open_only=True,
+                protocols=protocols,
+                scheme_layer=scheme_layer,
+                port_search=port_search,
+                service_search=service_search,
+                sreg=sreg,
+                extrainfo=extrainfo,
+                search=search,
+            ) for host in hosts)
+
+    # Dump the output
+    with writer:
+        for output in outputs:
+            if format_value: output = map(format_value,output)
+            writer.writes(output)
 
     return 0
@@ -1,3 +1,91 @@
 from . import nessus
 from . import masscan
 from . import nmap
+from .cache import ScanCache
+from parsuite import helpers
+
+# Parsers producing a {address:Host} dictionary from an ElementTree
+PARSERS = {
+    'nmap':nmap.parse_nmap,
+    'nessus':nessus.parse_nessus,
+    'masscan':masscan.parse_masscan,
+}
+
+# Parsers yielding hosts one at a time, keyed by file fingerprint
+STREAMING_PARSERS = {
+    'nmap':nmap.iter_nmap,
+    'nessus':nessus.iter_nessus,
+}
+
+# Parsers yielding lists of links to HTTP services for each host,
+# keyed by file fingerprint
+LINK_PARSERS = {
+    'nmap':nmap.iter_http_links,
+    'nessus':nessus.iter_http_links,
+}
+
+def streaming_parser(path):
+    '''Return the streaming parser suited to the file at path, as
+    determined by its header, or None when the format has no
+    streaming parser.
+    '''
+
+    return STREAMING_PARSERS.get(helpers.fingerprint_file(path))
+
+def iter_hosts(path, require_open_ports=False, cache=None):
+    '''Yield hosts from the file at path with its streaming parser,
+    reading them from the ScanCache when one is supplied and the file
+    has been parsed before.
+
+    Files without a streaming parser, such as Masscan's, are fully
+    parsed instead, and unrecognized files yield no hosts.
+    '''
+
+    parser = STREAMING_PARSERS.get(helpers.fingerprint_file(path))
+
+    if parser == None:
+        report = parse_file(path, require_open_ports, cache)
+        return iter(report.values() if report else [])
+
+    # The file is closed once the hosts are exhausted or the consumer
+    # closes the generator
+    def produce():
+        with helpers.open_input(path) as infile:
+            yield from parser(infile, require_open_ports)
+
+    if cache == None: return produce()
+
+    return cache.hosts(path, parser.__name__, produce,
+        require_open_ports=require_open_ports)
+
+def parse_file(path, require_open_ports=False, cache=None):
+    '''Fully parse the file at path with the parser matching its
+    fingerprint and return the resulting report dictionary of
+    {address:Host}. None is returned for unrecognized files.
+
+    When a ScanCache is supplied, hosts are read from it rather than
+    parsed when the file has been parsed before.
+
+    Defined at module level so that it can be dispatched to worker
+    processes.
+    '''
+
+    from xml.etree.ElementTree import parse
+
+    fingerprint = helpers.fingerprint_file(path)
+    if not fingerprint: return None
+
+    def produce():
+
+        with helpers.open_input(path) as infile:
+            tree = parse(infile)
+
+        return PARSERS[fingerprint](tree, require_open_ports)
+
+    if cache == None: return produce()
+
+    # Hosts are keyed by Host.key in each report
+    return {host.key:host for host in cache.hosts(path,
+        PARSERS[fingerprint].__name__,
+        lambda: produce().values(),
+        require_open_ports=require_open_ports)}
@@ -0,0 +1,368 @@
+from contextlib import contextmanager
+from hashlib import blake2b
+from parsuite import helpers
+from parsuite.core.suffix_printer import *
+from pathlib import Path
+import gc
+import json
+import os
+import pickle
+
+# Incremented whenever parser output or the host model changes, which
+# invalidates every cached scan
+VERSION = 2
+
+# Default upper bound on the total size of cached scans, in bytes.
+# Overridden by PARSUITE_SCAN_CACHE_SIZE.
+MAX_SIZE = 4*1024**3
+
+# Suffix of cache entries
+SUFFIX = '.hosts'
+
+# Suffix of entries holding a single object derived from input files
+OBJECT_SUFFIX = '.object'
+
+# Hosts pickled as a single list, allowing services and strings
+# repeated across those hosts to be stored once
+CHUNK_SIZE = 10000
+
+@contextmanager
+def paused_gc():
+    '''Disable the cyclic garbage collector within the block. Pickle
+    memos keep every object of a chunk alive, so collections triggered
+    while pickling or unpickling repeatedly traverse the whole chunk.
+    Hosts contain no reference cycles, leaving nothing to collect.
+    '''
+
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled: gc.enable()
+
+class ScanCache:
+    '''Parsed hosts stored on disk so that later runs against the same
+    input skip XML parsing entirely.
+
+    Entries are keyed by a digest of the input file's content along
+    with the parser, its options and VERSION. Each entry is a header
+    followed by pickled lists of up to CHUNK_SIZE hosts and a
+    terminating None, allowing hosts to be yielded as they're read.
+    Entries are written to a temporary file and renamed once complete,
+    so partially written entries are never loaded.
+
+    Objects derived from one or more input files, such as a ScanStore,
+    are held in entries of their own, keyed by the digests of those
+    files, through load_object and store_object.
+
+    Loading an entry updates its modification time. When the total
+    size of all entries exceeds max_size, the least recently used
+    entries are removed.
+
+    Digests of input files are recorded in digests.json, keyed by path
+    and validated against the file's size, inode and modification
+    time, so unchanged inputs are only hashed once.
+
+    Errors accessing the cache are not fatal: hosts are parsed as
+    though no cache were configured.
+    '''
+
+    def __init__(self,directory=None,max_size=None):
+
+        if max_size == None:
+            max_size = int(os.environ.get('PARSUITE_SCAN_CACHE_SIZE',
+                MAX_SIZE))
+
+        self.max_size = max_size
+
+        try:
+            self.directory = str(directory or
+                helpers.cache_directory('scans'))
+        except OSError as e:
+            esprint(f'Scan cache disabled: {e}')
+            self.directory = None
+
+    def entry_path(self,key):
+
+        return Path(self.directory,key+SUFFIX)
+
+    # =====
+    # KEYS
+    # =====
+
+    def digest(self,path):
+        '''Return a hex digest of the content of the file at path,
+        reusing the recorded digest when the file is unchanged.
+        '''
+
+        path = os.path.realpath(path)
+        stat = os.stat(path)
+        signature = [stat.st_mtime_ns,stat.st_size,stat.st_ino]
+
+        index_path = os.path.join(self.directory,'digests.json')
+        try:
+            with open(index_path) as infile:
+                index = json.load(infile)
+        except (OSError,ValueError):
+            index = {}
+
+        recorded = index.get(path)
+        if recorded and recorded[:3] == signature:
+            return recorded[3]
+
+        digest = helpers.file_digest(path)
+
+        # Drop records of files that no longer exist
+        index = {p:v for p,v in index.items() if os.path.exists(p)}
+        index[path] = signature+[digest]
+
+        tmp = f'{index_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp,'w') as outfile:
+                json.dump(index,outfile)
+            os.replace(tmp,index_path)
+        except OSError:
+            pass
+
+        return digest
+
+    def key(self,path,parser,**options):
+        '''Return the cache key for the file at path when parsed by the
+        named parser with the supplied options.
+        '''
+
+        digest = blake2b(digest_size=20)
+        digest.update(json.dumps([VERSION,self.digest(path),parser,
+            sorted(options.items())]).encode())
+
+        return digest.hexdigest()
+
+    def files_key(self,paths,name,**options):
+        '''Return the cache key for an object named name derived from
+        the files at paths, in order, with the supplied options.
+        '''
+
+        digest = blake2b(digest_size=20)
+        digest.update(json.dumps([VERSION,
+            [self.digest(path) for path in paths],name,
+            sorted(options.items())]).encode())
+
+        return digest.hexdigest()
+
+    # ===========
+    # READ/WRITE
+    # ===========
+
+    def load(self,key):
+        '''Return a generator of hosts for a cached entry, or None when
+        the entry does not exist.
+        '''
+
+        path = self.entry_path(key)
+        try:
+            infile = open(path,'rb')
+        except OSError:
+            return None
+
+        try:
+            header = pickle.load(infile)
+        except Exception:
+            header = None
+
+        if header.__class__ != dict or header.get('version') != VERSION:
+            infile.close()
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return ScanCache.read_hosts(infile)
+
+    @staticmethod
+    def read_hosts(infile):
+
+        with infile:
+            while True:
+                with paused_gc(): chunk = pickle.load(infile)
+                if chunk is None: break
+                yield from chunk
+
+    def write_chunk(self,outfile,chunk):
+
+        with paused_gc():
+            pickle.dump(chunk,outfile,pickle.HIGHEST_PROTOCOL)
+
+    def store(self,key,hosts,**header):
+        '''Yield each host while writing it to the cache. The entry is
+        only committed after the final host has been yielded.
+
+        Hosts are pickled a chunk at a time after the caller has moved
+        past them, so they must not be modified until the generator is
+        exhausted.
+        '''
+
+        path = self.entry_path(key)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+
+        try:
+            outfile = open(tmp,'wb')
+        except OSError as e:
+            esprint(f'Scan cache disabled: {e}')
+            yield from hosts
+            return
+
+        try:
+
+            header['version'] = VERSION
+            pickle.dump(header,outfile,pickle.HIGHEST_PROTOCOL)
+
+            chunk = []
+            for host in hosts:
+
+                if len(chunk) == CHUNK_SIZE:
+                    self.write_chunk(outfile,chunk)
+                    chunk = []
+
+                chunk.append(host)
+                yield host
+
+            if chunk: self.write_chunk(outfile,chunk)
+
+            # Terminates the entry
+            pickle.dump(None,outfile,pickle.HIGHEST_PROTOCOL)
+            outfile.close()
+            os.replace(tmp,path)
+
+        except OSError as e:
+            esprint(f'Failed to write scan cache: {e}')
+
+        finally:
+            outfile.close()
+            if tmp.exists(): tmp.unlink()
+
+        self.evict(keep=path)
+
+    def hosts(self,path,parser,produce,**options):
+        '''Yield hosts for the file at path from the cache, or from the
+        iterable returned by produce when no entry exists. Hosts are
+        cached as they're produced.
+
+        path - input file
+        parser - name of the parser, used in the key
+        produce - callable returning an iterable of hosts
+        options - parser options, used in the key
+        '''
+
+        if self.directory == None:
+            yield from produce()
+            return
+
+        try:
+            key = self.key(path,parser,**options)
+            hosts = self.load(key)
+        except OSError as e:
+            esprint(f'Scan cache disabled: {e}')
+            yield from produce()
+            return
+
+        if hosts != None:
+            yield from hosts
+        else:
+            yield from self.store(key,produce(),source=str(path),
+                parser=parser)
+
+    # =======
+    # OBJECTS
+    # =======
+
+    def load_object(self,key):
+        '''Return the object cached under key, or None when there is no
+        such entry or it can't be read.
+        '''
+
+        if self.directory == None: return None
+
+        path = Path(self.directory,key+OBJECT_SUFFIX)
+        try:
+            with open(path,'rb') as infile, paused_gc():
+                header = pickle.load(infile)
+                if header.__class__ != dict or \
+                        header.get('version') != VERSION:
+                    return None
+                value = pickle.load(infile)
+        except Exception:
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        return value
+
+    def store_object(self,key,value,**header):
+        '''Cache an object under key. As with hosts, the entry is written
+        to a temporary file and renamed once complete.
+        '''
+
+        if self.directory == None: return
+
+        path = Path(self.directory,key+OBJECT_SUFFIX)
+        tmp = path.with_suffix(f'.{os.getpid()}.tmp')
+
+        try:
+
+            header['version'] = VERSION
+            with open(tmp,'wb') as outfile, paused_gc():
+                pickle.dump(header,outfile,pickle.HIGHEST_PROTOCOL)
+                pickle.dump(value,outfile,pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp,path)
+
+        except OSError as e:
+            esprint(f'Failed to write scan cache: {e}')
+
+        finally:
+            if tmp.exists(): tmp.unlink()
+
+        self.evict(keep=path)
+
+    # ========
+    # EVICTION
+    # ========
+
+    def entries(self):
+        '''Return a list of (mtime, size, path) for each entry.
+        '''
+
+        entries = []
+        for path in Path(self.directory).iterdir():
+            if not path.suffix in [SUFFIX,OBJECT_SUFFIX]: continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime,stat.st_size,path))
+
+        return entries
+
+    def evict(self,keep=None):
+        '''Remove least recently used entries until the total size of
+        the cache is within max_size. The entry at keep is retained.
+        '''
+
+        entries = sorted(self.entries())
+        total = sum(e[1] for e in entries)
+
+        for mtime,size,path in entries:
+            if total <= self.max_size: break
+            if path == keep: continue
+
+            try:
+                path.unlink()
+            except OSError:
+                continue
+
+            total -= size
@@ -40,7 +40,7 @@ def parse_masscan(tree,no_services):
             state = estate.get('state')
             reason = estate.get('reason')
 
-            service = Service(name='masscan-unknown')
+            service = Service.shared(name='masscan-unknown')
 
             host.append_port(
                 Port(number=port_id,protocol=protocol,state=state,
@@ -0,0 +1,103 @@
+from parsuite import helpers
+from parsuite.core.suffix_printer import *
+from .cache import paused_gc
+import os
+import pickle
+
+# Incremented whenever the format of saved reports changes
+VERSION = 1
+
+class MergedReport:
+    '''Hosts from any number of files merged by address. Ports are
+    keyed on protocol and number, so each is recorded once per host
+    regardless of how many files report it. See Host.merge.
+
+    A report can be saved and loaded again so that files are merged
+    incrementally across runs. Files are recorded by the digest of
+    their content and only merged once.
+
+    require_open_ports - the parser option used for every file
+    '''
+
+    def __init__(self,require_open_ports=False):
+
+        self.require_open_ports = require_open_ports
+
+          # {address:Host}
+        self.hosts = {}
+
+          # {digest:path}
+        self.files = {}
+
+    def merge_report(self,report):
+        '''Merge a report dictionary of {address:Host}. Hosts are not
+        copied, so the report's hosts must not be used afterwards.
+        '''
+
+        for address,host in report.items():
+            if not address in self.hosts:
+                self.hosts[address] = host
+            else:
+                self.hosts[address].merge(host)
+
+    def merged(self,path,digest=None):
+        '''Determine if the file at path has already been merged.
+        '''
+
+        return (digest or helpers.file_digest(path)) in self.files
+
+    def record(self,path,digest=None):
+        '''Record the file at path as merged.
+        '''
+
+        self.files[digest or helpers.file_digest(path)] = str(path)
+
+    # ===========
+    # PERSISTENCE
+    # ===========
+
+    @staticmethod
+    def load(path,require_open_ports=False):
+        '''Load a report saved to path, or return an empty report when
+        path does not exist. ValueError is raised when the report was
+        saved by an incompatible version or with a different parser
+        option.
+        '''
+
+        if not os.path.exists(path):
+            return MergedReport(require_open_ports)
+
+        with open(path,'rb') as infile, paused_gc():
+            state = pickle.load(infile)
+
+        if state.__class__ != dict or state.get('version') != VERSION:
+            raise ValueError(f'Unsupported merge state: {path}')
+
+        if state['require_open_ports'] != require_open_ports:
+            raise ValueError(
+                'Merge state was built with require_open_ports=' \
+                f'{state["require_open_ports"]}: {path}'
+            )
+
+        report = MergedReport(require_open_ports)
+        report.files = state['files']
+        report.hosts = state['hosts']
+
+        return report
+
+    def save(self,path):
+        '''Write the report to path. The file is replaced only once
+        written in full.
+        '''
+
+        tmp = f'{path}.{os.getpid()}.tmp'
+
+        try:
+            with open(tmp,'wb') as outfile, paused_gc():
+                pickle.dump({'version':VERSION,
+                        'require_open_ports':self.require_open_ports,
+                        'files':self.files,'hosts':self.hosts},
+                    outfile,pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp,path)
+        finally:
+            if os.path.exists(tmp): os.unlink(tmp)
@@ -2,50 +2,139 @@
 
 from parsuite.abstractions.xml.nessus import *
 from xml.etree.ElementTree import ElementTree
+from lxml import etree
 from re import match,search
+from parsuite import helpers
 import pdb
 
-def parse_http_links(tree,*args,**kwargs):
-    
-    links = []
+# pluginID of "SSL / TLS Versions Supported", reported for each port
+# of a host supporting SSL/TLS
+TLS_PLUGIN_ID = '56984'
 
-    svc_names = set([
-            ri.attrib['svc_name'] for ri in tree.findall('.//ReportItem')
-            if search(r'http|www',ri.attrib['svc_name']) and ri.attrib['protocol'] == 'tcp'
-            ]   
-        )
+def report_host_http_links(erhost):
+    '''Return links for the HTTP services of a ReportHost element,
+    ordered by address and port. A TCP port is an HTTP service when
+    the svc_name of any of its ReportItems mentions http or www, and
+    uses HTTPS when the host has a TLS_PLUGIN_ID finding for the port.
+    ReportItems are read in a single pass.
+    '''
+
+    tls_ports,http_ports = set(),{}
+
+    for eri in erhost.iterfind('ReportItem'):
+
+        port = int(eri.get('port'))
+
+        if eri.get('pluginID') == TLS_PLUGIN_ID:
+            tls_ports.add(port)
+
+        if eri.get('protocol') == 'tcp' and \
+                search(r'http|www',eri.get('svc_name','')):
+            http_ports[port] = None
+
+    if not http_ports: return []
 
-    # Iterate over each plugin id
-    for svc_name in svc_names:
+    rhost = build_report_host(erhost)
 
-        # Get all report items associated with that plugin id and ../ReportHost
-        for erhost in tree.findall(f'.//ReportItem[@svc_name="{svc_name}"]/..'):
+    links = []
+    for port in http_ports:
 
-            rhost = FromXML.report_host(erhost)
+        scheme = 'https://' if port in tls_ports else 'http://'
 
-            # All ports for this host that support SSL/TLS
-            # pluginID 56984 = SSL/TLS Versions Supported
-            tunnel_ports = [
-                int(v) for v in erhost.xpath('//ReportItem[@pluginID="56984"]/@port')
-            ]
+        links += [f'{scheme}{addr}:{port}'
+            for addr in [rhost.ip]+rhost.hostnames if addr]
 
-            for eri in erhost.findall(f'.//ReportItem[@svc_name="{svc_name}"]'):
+    return helpers.sort_sockets(links)
 
-                ri = FromXML.report_item(eri)
-                
-                if ri.port.number in tunnel_ports:
-                    scheme = 'https://'
-                else:
-                    scheme = 'http://'
+def parse_http_links(tree,*args,**kwargs):
+    '''Return a list of unique links to HTTP services for all
+    ReportHosts in the tree, ordered as the hosts appear. See
+    report_host_http_links.
+    '''
 
-                for addr in [rhost.ip]+rhost.hostnames:
+    links,seen = [],set()
 
-                    link = scheme+addr+':'+str(ri.port.number)
-                    if link in links: continue
-                    links.append(link)
+    for erhost in tree.iter('ReportHost'):
+        for link in report_host_http_links(erhost):
+            if link in seen: continue
+            seen.add(link)
+            links.append(link)
 
     return links
 
+def iter_http_links(source,huge_tree=True,*args,**kwargs):
+    '''Incrementally parse a Nessus file and yield a list of links to
+    HTTP services for each ReportHost element. Links repeated across
+    hosts are yielded each time. See report_host_http_links.
+    '''
+
+    for erhost in iter_report_host_elements(source, huge_tree):
+        yield report_host_http_links(erhost)
+
+def parse_nessus_host(rhost):
+    '''Build a generic Host object from a ReportHost element. None
+    is returned when the element has neither a name nor a host-ip.
+    '''
+
+    status = 'up'
+    status_reason = 'nessus-up'
+
+    name = rhost.get('name')
+    if name == None: name = None
+    
+    host_ip = rhost.find('.//tag[@name="host-ip"]')
+    if host_ip != None: host_ip = host_ip.text
+    else: host_ip = name
+
+    # bush league
+    if not name and not host_ip: return None
+
+    if match(r'([0-9]{1,3}\.){3}',host_ip):
+        ipv4_address = host_ip
+        ipv6_address = None
+    else:
+        ipv4_address = None
+        ipv6_address = host_ip
+    
+    mac = rhost.find('.//tag[@name="mac-address"]')
+    if mac != None: mac = mac.text
+    
+    hostnames = []
+    for k in ['host-fqdn','host-rdns']:
+
+        val = rhost.find(f'.//tag[@name="{k}"]')
+        if val != None and val.text not in hostnames:
+            hostnames.append(val.text)
+
+    host = Host(ipv4_address=ipv4_address,
+        ipv6_address=ipv6_address,
+        status=status,
+        status_reason=status_reason,
+        mac_address=mac,
+        hostnames=hostnames)
+
+    for ri in rhost.findall('.//ReportItem'):
+        service = ri.get('svc_name')
+        protocol = ri.get('protocol')
+        plugin_name = ri.get('pluginName')
+        plugin_family = ri.get('pluginFamily')
+        port = int(ri.get('port'))
+        state = 'open'
+        reason = 'nessus-open'
+
+        if port == 0: continue
+        
+        service = NH.Service.shared(name=service)
+
+        host.append_port(
+            Port(
+                number=port,protocol=protocol,
+                state=state,reason=reason,service=service
+            )
+        )
+
+    return host
+
 def parse_nessus(tree,no_services):
 
     if tree.__class__ != ElementTree:
@@ -55,9 +144,6 @@ def parse_nessus(tree,no_services):
 
     report = {}
 
-    status = 'up'
-    status_reason = 'nessus-up'
-
     # Get a list of hosts with at least one open port
     # appears as though the "Service detction" plugin family
     # can be used to find this.
@@ -73,69 +159,137 @@ def parse_nessus(tree,no_services):
         # Assure that the current host has at least one open port
         if alive_hosts and rhost not in alive_hosts: continue
 
-        name = rhost.get('name')
-        if name == None: name = None
-        
-        host_ip = rhost.find('.//tag[@name="host-ip"]')
-        if host_ip != None: host_ip = host_ip.text
-        else: host_ip = name
-
-        # bush league
-        if not name and not host_ip: continue
-
-        if match(r'([0-9]{1,3}\.){3}',host_ip):
-            ipv4_address = host_ip
-            ipv6_address = None
-        else:
-            ipv4_address = None
-            ipv6_address = host_ip
-        
-        mac = rhost.find('.//tag[@name="mac-address"]')
-        if mac != None: mac = mac.text
-        
-        hostnames = []
-        for k in ['host-fqdn','host-rdns']:
-
-            val = rhost.find(f'.//tag[@name="{k}"]')
-            if val != None and val.text not in hostnames:
-                hostnames.append(val.text)
-
-        host = Host(ipv4_address=ipv4_address,
-            ipv6_address=ipv6_address,
-            status=status,
-            status_reason=status_reason,
-            mac_address=mac,
-            hostnames=hostnames)
-
-        for ri in rhost.findall('.//ReportItem'):
-            service = ri.get('svc_name')
-            protocol = ri.get('protocol')
-            plugin_name = ri.get('pluginName')
-            plugin_family = ri.get('pluginFamily')
-            port = int(ri.get('port'))
-            state = 'open'
-            reason = 'nessus-open'
-
-            if port == 0: continue
-            
-            service = NH.Service(name=service)
-
-            host.append_port(
-                Port(
-                    number=port,protocol=protocol,
-                    state=state,reason=reason,service=service
-                )
-            )
+        host = parse_nessus_host(rhost)
+        if not host: continue
 
-        if host.ipv4_address:
-            report[host.ipv4_address] = host
-        elif host.ipv6_address:
-            report[host.ipv6_address] = host
-        elif host.mac_address:
-            report[host.mac_address] = host
+        if host.key: report[host.key] = host
 
     return report
 
+def iter_report_host_elements(source, huge_tree=True):
+    '''Incrementally parse a Nessus file with lxml and yield each
+    ReportHost element. Elements are cleared and detached from the
+    document once the consumer has moved on, so memory consumption
+    is bounded by the size of the largest ReportHost.
+
+    huge_tree disables lxml's limits on text node size, which large
+    plugin outputs routinely exceed.
+    '''
+
+    for event, ele in etree.iterparse(source, events=('end',),
+            tag='ReportHost', huge_tree=huge_tree):
+
+        yield ele
+
+        # Free the element along with any preceding siblings
+        ele.clear(keep_tail=True)
+        parent = ele.getparent()
+        while ele.getprevious() is not None:
+            del parent[0]
+
+class PluginGroup:
+    '''The ReportItem elements sharing a pluginID, along with the
+    ReportHost element of each.
+
+    items - list of (ReportHost element, ReportItem element) tuples,
+    in document order
+    protocols - list of unique protocols of the items
+    hosts - {name:ReportHost element} of hosts with at least one item
+    '''
+
+    def __init__(self,plugin_id):
+
+        self.plugin_id = plugin_id
+        self.items = []
+        self.protocols = []
+        self.hosts = {}
+
+    def add(self,erhost,eri):
+
+        self.items.append((erhost,eri))
+
+        protocol = eri.get('protocol')
+        if not protocol in self.protocols:
+            self.protocols.append(protocol)
+
+        name = erhost.get('name')
+        if not name in self.hosts:
+            self.hosts[name] = erhost
+
+def index_plugins(tree):
+    '''Group the ReportItem elements of a Nessus tree by pluginID in
+    a single traversal. Returns {plugin_id:PluginGroup}, ordered by
+    the first appearance of each plugin.
+    '''
+
+    index = {}
+
+    for erhost in tree.iter('ReportHost'):
+        for eri in erhost.iterfind('ReportItem'):
+
+            plugin_id = eri.get('pluginID')
+
+            group = index.get(plugin_id)
+            if group == None:
+                group = index[plugin_id] = PluginGroup(plugin_id)
+
+            group.add(erhost,eri)
+
+    return index
+
+def iter_report_hosts(source, huge_tree=True):
+    '''Incrementally parse a Nessus file and yield a ReportHost object
+    for each ReportHost element. The ReportItem objects for the host
+    are available in the `report_items` attribute.
+    '''
+
+    for erhost in iter_report_host_elements(source, huge_tree):
+
+        rhost = build_report_host(erhost)
+        rhost.report_items += [
+            build_report_item(eri) for eri in erhost.iterfind('ReportItem')
+        ]
+
+        yield rhost
+
+def iter_nessus(source, no_services=False, huge_tree=True):
+    '''Incrementally parse a Nessus file and yield a generic Host
+    object for each ReportHost element with at least one ReportItem,
+    mirroring parse_nessus.
+
+    When no_services is set, only hosts with a ReportItem from the
+    "Service detection" plugin family are yielded. As with parse_nessus,
+    a file without any service detection results yields all of its
+    hosts, so other hosts are held back until the first such result is
+    seen.
+    '''
+
+    # Hosts without service detection results, held until the file is
+    # known to contain none. None once such a result has been seen.
+    pending = []
+
+    for erhost in iter_report_host_elements(source, huge_tree):
+
+        if erhost.find('ReportItem') is None: continue
+
+        if no_services and erhost.find(
+                'ReportItem[@pluginFamily="Service detection"]') is None:
+
+            if pending != None:
+                host = parse_nessus_host(erhost)
+                if host and host.key: pending.append(host)
+
+            continue
+
+        # Hosts lacking service detection results are dropped from here
+        pending = None
+
+        host = parse_nessus_host(erhost)
+        if host and host.key: yield host
+
+    if pending:
+        for host in pending: yield host
+
 def parse_report_item(ele_report_item):
     '''ele_report_item is a ReportItem element
     '''
@@ -1,49 +1,141 @@
 #!/usr/bin/env python3
 from parsuite.abstractions.xml.nmap import *
-from xml.etree.ElementTree import ElementTree
+from xml.etree.ElementTree import ElementTree, iterparse
 from parsuite.abstractions.xml.generic import network_host as nh
+from parsuite import helpers
 from sys import exit
 
-def parse_http_links(tree,*args,**kwargs):
+def host_http_links(ehost):
+    '''Return links for the open TCP ports of a host element with an
+    HTTP service, ordered by address and port. Links are formatted for
+    each IP address and hostname when the host is up.
+    '''
+
+    estatus = ehost.find('status')
+    if estatus == None or estatus.get('state') != 'up': return []
+
+    addresses = {e.get('addrtype'):e.get('addr')
+        for e in ehost.findall('.//address')}
+
+    names = [addresses[t] for t in ['ipv4','ipv6'] if addresses.get(t)]
+    names += [e.get('name') for e in ehost.findall('.//hostname')]
 
     links = []
+    for eport in ehost.findall('.//port'):
 
-    for ehost in tree.findall('.//host'):
+        # ASSURE THIS IS AN HTTP SERVICE
+        eservice = eport.find('service')
+        name = eservice.get('name') if eservice != None else None
+        estate = eport.find('state')
 
-        host = nh.FromXML.host(ehost)
-        if host.status != 'up': continue
+        if not name or not 'http' in name or \
+                eport.get('protocol') != 'tcp' or \
+                estate == None or estate.get('state') != 'open':
+            continue
 
-        hostnames = []
-        if host.ipv4_address: hostnames.append(host.ipv4_address)
-        if host.ipv6_address: hostnames.append(host.ipv6_address)
-        hostnames += host.hostnames
+        if 'https' in name or eservice.get('tunnel') == 'ssl':
+            scheme = 'https'
+        else:
+            scheme = 'http'
 
-        # BEGIN ENUMERATING PORTS
-        for eport in ehost.findall('.//port'):
+        links += [f'{scheme}://{address}:{eport.get("portid")}'
+            for address in names]
 
-            port = nh.FromXML.port(eport)
+    return helpers.sort_sockets(links)
 
-            # ASSURE THIS IS AN HTTP SERVICE
-            if not search('http',port.service.name) or port.state != 'open' or (
-                    port.protocol != 'tcp'):
-                continue
+def parse_http_links(tree,*args,**kwargs):
+    '''Return a list of unique links to HTTP services for all hosts
+    in the tree, ordered as the hosts appear. See host_http_links.
+    '''
 
-            for hostname in hostnames:
+    links,seen = [],set()
 
-                if not search('https',port.service.name):
+    for ehost in tree.findall('.//host'):
+        for link in host_http_links(ehost):
+            if link in seen: continue
+            seen.add(link)
+            links.append(link)
 
-                    if port.service.tunnel == 'ssl':
-                        link = f'https://{hostname}:{port.number}'
-                    else:
-                        link = f'http://{hostname}:{port.number}'
+    return links
 
-                else:
+def iter_http_links(source,*args,**kwargs):
+    '''Incrementally parse an Nmap XML file and yield a list of links
+    to HTTP services for each host element. Links repeated across
+    hosts are yielded each time. See host_http_links.
+    '''
 
-                    link = f'https://{hostname}:{port.number}'
+    for ehost in iter_host_elements(source):
+        yield host_http_links(ehost)
 
-                if not link in links: links.append(link)
+def parse_nmap_host(ehost):
+    '''Build an NmapHost object from a host element.
+    '''
 
-    return links
+    # Getting status
+    status = ehost.find('status').get('state')
+    status_reason = ehost.find('status').get('reason')
+    
+    # Getting addresses
+    addresses = {}
+    for eaddress in ehost.findall('.//address'):
+        addr_type = eaddress.get('addrtype')
+        addresses[addr_type+'_address'] = eaddress.get('addr')
+    
+    # Getting ehostnames
+    hostnames = [
+        hn.get('name') for hn in ehost.findall('.//hostname')
+    ]
+    
+    # Create a ehost object
+    host = NmapHost(**addresses,
+        hostnames=hostnames,
+        status=status,
+        status_reason=status_reason)
+    
+    # Getting ports
+    for eport in ehost.findall('.//port'):
+        # Initialize service attributes with a name of unknown
+        # so that even open ports without a service are returned
+        # with a uri-type prefix
+        service_attributes = {'name':'unknown'}
+        port_number = eport.get('portid')
+        protocol = eport.get('protocol')
+    
+        # Get port state and reason
+        eport_state = eport.find('state')
+        state = eport_state.get('state')
+        reason = eport_state.get('reason')
+    
+        # Get port service
+        eser = eport.find('service')
+        if eser != None:
+            for attr in Service.ATTRIBUTES:
+                val = eser.get(attr)
+                if val != None: service_attributes[attr]=val
+
+        if service_attributes:
+            service = Service.shared(**service_attributes)
+        else:
+            service = None
+        
+        # Get scripts
+        scripts = []
+        for escript in eport.findall('.//script'):
+            scripts.append(
+                Script(
+                    id=escript.get('id'),
+                    output=escript.get('output')
+                )
+            )
+    
+        # Append the port object
+        host.append_port(
+            Port(number=port_number, protocol=protocol,
+                state=state, reason=reason, service=service,
+                scripts=scripts)
+        )
+
+    return host
 
 def parse_nmap(tree,require_open_ports):
 
@@ -55,76 +147,43 @@ def parse_nmap(tree,require_open_ports):
     report = {}
 
     for ehost in tree.findall('.//host'):
-    
-        # Getting status
-        status = ehost.find('status').get('state')
-        status_reason = ehost.find('status').get('reason')
-        
-        # Getting addresses
-        addresses = {}
-        for eaddress in ehost.findall('.//address'):
-            addr_type = eaddress.get('addrtype')
-            addresses[addr_type+'_address'] = eaddress.get('addr')
-        
-        # Getting ehostnames
-        hostnames = [
-            hn.get('name') for hn in ehost.findall('.//hostname')
-        ]
-        
-        # Create a ehost object
-        host = NmapHost(**addresses,
-            hostnames=hostnames,
-            status=status,
-            status_reason=status_reason)
-        
-        # Getting ports
-        for eport in ehost.findall('.//port'):
-            # Initialize service attributes with a name of unknown
-            # so that even open ports without a service are returned
-            # with a uri-type prefix
-            service_attributes = {'name':'unknown'}
-            port_number = eport.get('portid')
-            protocol = eport.get('protocol')
-        
-            # Get port state and reason
-            eport_state = eport.find('state')
-            state = eport_state.get('state')
-            reason = eport_state.get('reason')
-        
-            # Get port service
-            eser = eport.find('service')
-            if eser != None:
-                for attr in Service.ATTRIBUTES:
-                    val = eser.get(attr)
-                    if val != None: service_attributes[attr]=val
-
-            if service_attributes:
-                service = Service(**service_attributes)
-            else:
-                service = None
-            
-            # Get scripts
-            scripts = []
-            for escript in eport.findall('.//script'):
-                scripts.append(
-                    Script(
-                        id=escript.get('id'),
-                        output=escript.get('output')
-                    )
-                )
-        
-            # Append the port object
-            host.append_port(
-                Port(number=port_number, protocol=protocol,
-                    state=state, reason=reason, service=service,
-                    scripts=scripts)
-            )
-        
-        if host.ipv4_address:
-            report[host.ipv4_address] = host
-        elif host.ipv6_address:
-            report[host.ipv6_address] = host
-        elif host.mac_address:
-            report[host.mac_address] = host
+
+        host = parse_nmap_host(ehost)
+
+        if host.key: report[host.key] = host
     
     return report
+
+def iter_host_elements(source):
+    '''Incrementally parse an Nmap XML file and yield each host
+    element. Each host element is cleared and detached from the
+    document once the consumer has moved on, keeping memory
+    consumption bounded by the size of a single host.
+    '''
+
+    root = None
+    for event, ele in iterparse(source, events=('start','end')):
+
+        if event == 'start':
+            if root == None: root = ele
+            continue
+
+        if ele.tag != 'host': continue
+
+        yield ele
+
+        # Free the host element along with any preceding siblings,
+        # e.g. scaninfo and taskbegin elements
+        ele.clear()
+        root.clear()
+
+def iter_nmap(source,require_open_ports=False):
+    '''Incrementally parse an Nmap XML file and yield an NmapHost
+    object for each host element. See iter_host_elements.
+
+    Unlike parse_nmap, hosts appearing more than once in the file
+    are yielded each time they are encountered.
+    '''
+
+    for ehost in iter_host_elements(source):
+        yield parse_nmap_host(ehost)
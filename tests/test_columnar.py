@@ -0,0 +1,69 @@
+from parsuite import modules
+from parsuite.modules.xml_dumper import xml_dumper
+import pytest
+
+XML_DUMPER_DEFAULTS = dict(all_addresses=False, fqdns=False,
+    port_required=False, port_search=[], service_search=[],
+    protocols=['tcp'], transport_layer=False, delimiter='\n',
+    http_links=False, sreg=False, extrainfo=False)
+
+NMAP = '''<?xml version="1.0"?>
+<nmaprun scanner="nmap" args="nmap -sV" start="1577836800">
+<host><status state="up" reason="syn-ack"/>
+<address addr="10.0.0.10" addrtype="ipv4"/><hostnames>
+<hostname name="web.example.com" type="PTR"/></hostnames><ports>
+<port protocol="tcp" portid="80"><state state="open" reason="syn-ack"/>
+<service name="http" method="probed"/></port>
+<port protocol="tcp" portid="22"><state state="open" reason="syn-ack"/>
+<service name="ssh" method="probed"/></port>
+<port protocol="udp" portid="53"><state state="open" reason="udp-response"/>
+<service name="domain" method="probed"/></port>
+</ports></host>
+<host><status state="up" reason="syn-ack"/>
+<address addr="10.0.0.9" addrtype="ipv4"/><hostnames/><ports>
+<port protocol="tcp" portid="443"><state state="closed" reason="reset"/>
+<service name="https" method="table"/></port>
+</ports></host>
+</nmaprun>'''
+
+@pytest.fixture
+def scan(tmp_path,monkeypatch):
+
+    monkeypatch.setenv('PARSUITE_CACHE_DIR',str(tmp_path / 'cache'))
+
+    path = tmp_path / 'scan.xml'
+    path.write_text(NMAP)
+
+    return str(path)
+
+@pytest.mark.parametrize('format,options',[
+    ('address',{}),
+    ('address',{'fqdns':True}),
+    ('address',{'port_required':True}),
+    ('address',{'port_search':[80,22]}),
+    ('address',{'service_search':['ssh']}),
+    ('socket',{}),
+    ('socket',{'protocols':['tcp','udp']}),
+    ('socket',{'port_search':[443]}),
+    ('socket',{'service_search':['http']}),
+    ('port',{}),
+    ('port',{'service_search':['domain','ssh'],'protocols':['udp']}),
+])
+def test_columnar_matches_object(scan,capsys,monkeypatch,format,options):
+
+    arguments = dict(XML_DUMPER_DEFAULTS,input_files=[scan],
+        format=format,**options)
+
+    modules.handles['xml_dumper'].parse(backend='object',**arguments)
+    expected = capsys.readouterr().out
+
+    # The store is built on the first query and loaded on the second
+    outputs = []
+    for run in range(2):
+        modules.handles['xml_dumper'].parse(backend='columnar',**arguments)
+        outputs.append(capsys.readouterr().out)
+
+        monkeypatch.setattr(xml_dumper,'read_hosts',None)
+
+    assert outputs == [expected,expected]
+    assert expected.strip()
@@ -0,0 +1,137 @@
+from parsuite import modules
+from parsuite import helpers
+import pytest
+
+XML_DUMPER_DEFAULTS = dict(all_addresses=False, fqdns=False,
+    port_required=False, port_search=[], service_search=[],
+    protocols=['tcp'], transport_layer=False, delimiter='\n',
+    http_links=False, sreg=False, extrainfo=False, no_cache=True)
+
+NMAP = '''<?xml version="1.0"?>
+<nmaprun scanner="nmap" args="nmap -sV" start="1577836800">
+{hosts}
+</nmaprun>'''
+
+HOST = '''<host><status state="up" reason="syn-ack"/>
+<address addr="{address}" addrtype="ipv4"/><hostnames/><ports>{ports}
+</ports></host>'''
+
+NESSUS = '''<?xml version="1.0" ?>
+<NessusClientData_v2><Report name="test"><ReportHost name="10.0.0.20">
+<HostProperties><tag name="host-ip">10.0.0.20</tag></HostProperties>
+<ReportItem port="443" svc_name="www" protocol="tcp" severity="0"
+pluginID="22964" pluginName="Service Detection"
+pluginFamily="Service detection"><plugin_name>Service Detection</plugin_name>
+<risk_factor>None</risk_factor></ReportItem></ReportHost></Report>
+</NessusClientData_v2>'''
+
+PORT = '''<port protocol="tcp" portid="{number}"><state state="{state}"
+reason="syn-ack"/><service name="{name}" {attributes}/></port>'''
+
+def nmap_file(path,hosts):
+    '''Write an nmap file of {address:[(number,state,name,attributes)]}.
+    '''
+
+    path.write_text(NMAP.format(hosts=''.join(
+        HOST.format(address=address,ports=''.join(
+            PORT.format(number=number,state=state,name=name,
+                attributes=attributes)
+            for number,state,name,attributes in ports))
+        for address,ports in hosts.items())))
+
+    return str(path)
+
+@pytest.fixture
+def overlapping_scans(tmp_path):
+    '''Two nmap files reporting the same ports with services of
+    differing richness. The richer service is reported first.
+    '''
+
+    a = nmap_file(tmp_path / 'a.xml',{
+        '10.0.0.10':[
+            (80,'open','http','product="nginx" version="1.18" ' \
+                'extrainfo="Ubuntu" method="probed"'),
+            (22,'open','ssh','product="OpenSSH" method="probed"')],
+        '10.0.0.11':[(443,'open','http','tunnel="ssl" product="Apache"')],
+    })
+
+    b = nmap_file(tmp_path / 'b.xml',{
+        '10.0.0.10':[
+            (80,'open','http-proxy','method="table"'),
+            (8080,'open','http-proxy','product="Squid" method="probed"')],
+        '10.0.0.11':[(443,'closed','https','method="table"')],
+        '10.0.0.12':[(22,'open','ssh','method="table"')],
+    })
+
+    database = str(tmp_path / 'scans.db')
+    for input_file in [a,b]:
+        modules.handles['ingest'].parse(input_files=[input_file],
+            database=database)
+
+    return [a,b],database
+
+@pytest.mark.parametrize('format,options',[
+    ('address',{}),
+    ('socket',{}),
+    ('uri',{}),
+    ('uri',{'transport_layer':True}),
+    ('uri',{'extrainfo':True}),
+    ('socket',{'service_search':['http']}),
+    ('address',{'service_search':['http-proxy']}),
+    ('uri',{'sreg':True,'service_search':['^http$']}),
+    ('port',{}),
+    ('port',{'service_search':['ssh']}),
+    ('address',{'port_search':[443]}),
+])
+def test_query_matches_xml_dumper(overlapping_scans,capsys,format,
+        options):
+
+    input_files,database = overlapping_scans
+
+    modules.handles['xml_dumper'].parse(**dict(XML_DUMPER_DEFAULTS,
+        input_files=input_files,format=format,**options))
+    expected = capsys.readouterr().out
+
+    modules.handles['query'].parse(database=database,format=format,
+        **options)
+    output = capsys.readouterr().out
+
+    assert output == expected
+    assert output
+
+def test_query_keeps_richer_service(overlapping_scans,capsys):
+
+    input_files,database = overlapping_scans
+
+    modules.handles['query'].parse(database=database,format='uri')
+    output = capsys.readouterr().out.split()
+
+    assert 'http://10.0.0.10:80' in output
+    assert not 'http-proxy://10.0.0.10:80' in output
+
+def test_ingest_closes_inputs(tmp_path,capsys,monkeypatch):
+
+    opened = []
+    open_input = helpers.open_input
+
+    def recording_open_input(path):
+        opened.append(open_input(path))
+        return opened[-1]
+
+    monkeypatch.setattr(helpers,'open_input',recording_open_input)
+
+    input_files = []
+    for i in range(3):
+        path = tmp_path / f'{i}.nessus'
+        path.write_text(NESSUS)
+        input_files.append(str(path))
+
+    database = str(tmp_path / 'scans.db')
+    modules.handles['ingest'].parse(input_files=input_files,
+        database=database)
+
+    assert opened
+    assert all(infile.closed for infile in opened)
+
+    modules.handles['query'].parse(database=database,format='socket')
+    assert capsys.readouterr().out.split() == ['10.0.0.20:443']
@@ -0,0 +1,50 @@
+from parsuite import modules
+from pathlib import Path
+import argparse
+import pytest
+import subprocess
+import sys
+
+ROOT = Path(__file__).absolute().parent.parent
+
+@pytest.fixture
+def global_parser():
+
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--profile',action='store_true')
+    parser.add_argument('--profile-output')
+    parser.add_argument('--profile-limit',type=int,default=25)
+
+    return parser
+
+@pytest.mark.parametrize('argv,selected',[
+    (['xml_dumper','-ifs','scan.xml'],'xml_dumper'),
+    (['--profile','xml_dumper','-f','socket'],'xml_dumper'),
+    (['--profile-output','xml_dumper','nmap_ssl_name_dumper','-if','a'],
+        'nmap_ssl_name_dumper'),
+    (['--profile-output=xml_dumper','query','-db','a.db'],'query'),
+    (['xml_dumper','-ifs','nmap_ssl_name_dumper'],'xml_dumper'),
+    (['--profile-limit','10','not_a_module','xml_dumper'],None),
+    (['--profile-limit','ten','xml_dumper'],None),
+    (['--profile'],None),
+    ([],None),
+])
+def test_select(global_parser,argv,selected):
+
+    assert modules.select(argv,global_parser) == selected
+
+def test_option_value_named_like_module(tmp_path):
+
+    scan = tmp_path / 'scan.xml'
+    scan.write_text('<?xml version="1.0"?>\n' \
+        '<nmaprun scanner="nmap" args="nmap -sV"></nmaprun>')
+
+    # The profile report is written to a file named xml_dumper
+    process = subprocess.run([sys.executable,str(ROOT / 'parsuite.py'),
+            '--profile','--profile-output','xml_dumper',
+            'nmap_ssl_name_dumper','-if',str(scan),'--no-cache'],
+        cwd=tmp_path,capture_output=True,text=True)
+
+    assert process.returncode == 0, process.stderr
+    assert 'No ssl-cert script results found' in process.stderr
+    assert (tmp_path / 'xml_dumper').exists()
@@ -0,0 +1,92 @@
+from parsuite import modules
+from parsuite.abstractions.xml.nessus import (build_report_item,
+    PluginRegistry)
+from lxml import etree
+import pytest
+
+XML_DUMPER_DEFAULTS = dict(all_addresses=False, fqdns=False,
+    port_required=True, port_search=[], service_search=[],
+    protocols=['tcp'], transport_layer=False, delimiter='\n',
+    http_links=False, sreg=False, extrainfo=False, no_cache=True,
+    format='address')
+
+REPORT_ITEM = '''<ReportItem port="{port}" svc_name="www" protocol="tcp"
+severity="0" pluginID="{plugin_id}" pluginName="Synthetic"
+pluginFamily="{family}"/>'''
+
+REPORT_HOST = '''<ReportHost name="{ip}"><HostProperties>
+<tag name="host-ip">{ip}</tag></HostProperties>{items}</ReportHost>'''
+
+def nessus_file(path,hosts):
+    '''Write a Nessus file of {ip:[(port,plugin_family)]}.
+    '''
+
+    path.write_text('<?xml version="1.0" ?>\n<NessusClientData_v2>' \
+        '<Report name="test">{}</Report></NessusClientData_v2>'.format(
+            ''.join(REPORT_HOST.format(ip=ip,items=''.join(
+                REPORT_ITEM.format(port=port,plugin_id=10000+port,
+                    family=family)
+                for port,family in items))
+            for ip,items in hosts.items())))
+
+    return str(path)
+
+@pytest.mark.parametrize('hosts,expected',[
+    # Without service detection results every host is kept
+    ({'10.0.0.1':[(80,'Web Servers')],
+      '10.0.0.2':[(443,'General')]},
+     ['10.0.0.1','10.0.0.2']),
+    # Otherwise only hosts with service detection results are kept,
+    # including those preceded by hosts without any
+    ({'10.0.0.1':[(80,'Web Servers')],
+      '10.0.0.2':[(443,'Service detection')],
+      '10.0.0.3':[(22,'General')]},
+     ['10.0.0.2']),
+])
+def test_port_required_independent_of_file_count(tmp_path,capsys,hosts,
+        expected):
+
+    path = nessus_file(tmp_path / 'scan.nessus',hosts)
+
+    # A single file is streamed, several are parsed and merged
+    outputs = []
+    for input_files in [[path],[path,path]]:
+
+        modules.handles['xml_dumper'].parse(**dict(XML_DUMPER_DEFAULTS,
+            input_files=input_files))
+        outputs.append(sorted(capsys.readouterr().out.split()))
+
+    assert outputs[0] == outputs[1] == expected
+
+def report_item(children):
+
+    return build_report_item(etree.fromstring(
+        '<ReportItem port="443" svc_name="www" protocol="tcp" ' \
+        'severity="3" pluginID="10002" pluginName="Synthetic TLS" ' \
+        f'pluginFamily="General">{children}</ReportItem>'),
+        PluginRegistry())
+
+def test_report_item_exploit_frameworks():
+
+    ri = report_item('<plugin_name>Synthetic TLS</plugin_name>' \
+        '<risk_factor>High</risk_factor>' \
+        '<exploit_available>true</exploit_available>' \
+        '<exploit_framework_canvas>false</exploit_framework_canvas>' \
+        '<exploit_framework_metasploit>true' \
+        '</exploit_framework_metasploit>' \
+        '<exploit_framework_core>true</exploit_framework_core>' \
+        '<metasploit_name>Synthetic Module</metasploit_name>')
+
+    assert ri.exploit_frameworks == ['metasploit','core']
+    assert ri.risk_factor == 'high'
+    assert ri.tls
+    assert '# exploit_frameworks:\n\nmetasploit\ncore' in \
+        ri.additional_info()
+
+def test_report_item_without_plugin_details():
+
+    ri = report_item('')
+
+    assert ri.exploit_frameworks == []
+    assert ri.risk_factor == None
+    assert not ri.ssl and not ri.tls
@@ -0,0 +1,68 @@
+from parsuite.abstractions.nessus_plugins import PluginWriter,STORE_DIRECTORY
+from parsuite.parsers.nessus import index_plugins
+from lxml import etree
+import gzip
+
+REPORT_ITEM = '''<ReportItem port="80" svc_name="www" protocol="tcp"
+severity="2" pluginID="10001" pluginName="Synthetic Finding"
+pluginFamily="General"><description>Description</description>
+<plugin_name>Synthetic Finding</plugin_name>
+<plugin_type>remote</plugin_type><risk_factor>Medium</risk_factor>
+<solution>Upgrade</solution><synopsis>Synopsis</synopsis>
+<plugin_output>{output}</plugin_output></ReportItem>'''
+
+REPORT_HOST = '''<ReportHost name="{ip}"><HostProperties>
+<tag name="host-ip">{ip}</tag></HostProperties>{items}</ReportHost>'''
+
+def nessus_tree(outputs):
+    '''Return a Nessus tree with a host for each (ip, output) tuple,
+    each affected by the same plugin.
+    '''
+
+    hosts = ''.join(REPORT_HOST.format(ip=ip,
+            items=REPORT_ITEM.format(output=output))
+        for ip,output in outputs)
+
+    return etree.ElementTree(etree.fromstring(
+        '<NessusClientData_v2><Report name="test">' \
+        f'{hosts}</Report></NessusClientData_v2>'))
+
+def read_manifest(path):
+
+    return dict(line.split('\t') for line in path.read_text().splitlines())
+
+def test_store_outputs_per_socket(tmp_path):
+
+    tree = nessus_tree([('10.0.0.1','Version : 1.0'),
+        ('10.0.0.2','Version : 2.0')])
+
+    writer = PluginWriter(tmp_path,index_plugins(tree),
+        output_store='gzip')
+    list(writer.write_all())
+
+    manifest = read_manifest(tmp_path / 'medium' / 'synthetic_finding' /
+        'tcp_plugin_outputs.manifest')
+
+    assert manifest['10.0.0.1:80'] != manifest['10.0.0.2:80']
+
+    for socket,output in [('10.0.0.1:80','Version : 1.0'),
+            ('10.0.0.2:80','Version : 2.0')]:
+
+        digest = manifest[socket]
+        path = tmp_path / STORE_DIRECTORY / digest[:2] / f'{digest}.gz'
+        assert gzip.decompress(path.read_bytes()).decode() == output
+
+def test_store_identical_outputs_once(tmp_path):
+
+    tree = nessus_tree([('10.0.0.1','Version : 1.0'),
+        ('10.0.0.2','Version : 1.0')])
+
+    writer = PluginWriter(tmp_path,index_plugins(tree),
+        output_store='plain')
+    list(writer.write_all())
+
+    manifest = read_manifest(tmp_path / 'medium' / 'synthetic_finding' /
+        'tcp_plugin_outputs.manifest')
+
+    assert manifest['10.0.0.1:80'] == manifest['10.0.0.2:80']
+    assert len(list((tmp_path / STORE_DIRECTORY).glob('*/*'))) == 1
@@ -0,0 +1,27 @@
+from parsuite.core import output
+from parsuite.core.output import SeenSet
+
+VALUES = [f'10.0.{i//256}.{i%256}:443' for i in range(1000)]
+
+def test_seen_set_keeps_colliding_values(monkeypatch):
+
+    # Every value has the same hash
+    monkeypatch.setattr(output,'hash',lambda value: 0,raising=False)
+
+    seen = SeenSet()
+    assert seen.filter(VALUES) == VALUES
+    seen.close()
+
+def test_seen_set_spills(tmp_path):
+
+    seen = SeenSet(limit=100,directory=tmp_path)
+
+    assert seen.filter(VALUES[:500]) == VALUES[:500]
+    assert seen.db
+
+    # Values seen before and after spilling are both filtered
+    assert seen.filter(VALUES) == VALUES[500:]
+    assert not seen.add(VALUES[0])
+    assert seen.add('10.1.0.0:443')
+
+    seen.close()
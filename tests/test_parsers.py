@@ -0,0 +1,82 @@
+from parsuite import modules
+from parsuite import parsers
+from parsuite import helpers
+import pytest
+import sys
+
+MASSCAN = '''<?xml version="1.0"?>
+<nmaprun scanner="masscan" start="1577836800" version="1.0-BETA">
+<host endtime="1577836900"><address addr="10.0.0.1" addrtype="ipv4"/>
+<ports><port protocol="tcp" portid="443"><state state="open"
+reason="syn-ack" reason_ttl="64"/></port></ports></host>
+</nmaprun>'''
+
+NMAP = '''<?xml version="1.0"?>
+<nmaprun scanner="nmap" args="nmap -sV" start="1577836800">
+<host><status state="up" reason="syn-ack"/>
+<address addr="10.0.0.1" addrtype="ipv4"/><hostnames/><ports/></host>
+<host><status state="up" reason="syn-ack"/>
+<address addr="10.0.0.2" addrtype="ipv4"/><hostnames/><ports/></host>
+</nmaprun>'''
+
+UNKNOWN = '''<?xml version="1.0"?>
+<report><host address="10.0.0.1"/></report>'''
+
+def test_iter_hosts_without_streaming_parser(tmp_path):
+
+    path = tmp_path / 'scan.xml'
+    path.write_text(MASSCAN)
+
+    hosts = list(parsers.iter_hosts(str(path)))
+
+    assert [host.key for host in hosts] == ['10.0.0.1']
+    assert [port.number for port in hosts[0].ports] == [443]
+
+@pytest.mark.parametrize('consumed',[1,2])
+def test_iter_hosts_closes_input(tmp_path,monkeypatch,consumed):
+
+    path = tmp_path / 'scan.xml'
+    path.write_text(NMAP)
+
+    opened = []
+    open_input = helpers.open_input
+
+    def recording_open_input(path):
+        opened.append(open_input(path))
+        return opened[-1]
+
+    monkeypatch.setattr(helpers,'open_input',recording_open_input)
+
+    hosts = parsers.iter_hosts(str(path))
+    assert [next(hosts).key for i in range(consumed)] == \
+        ['10.0.0.1','10.0.0.2'][:consumed]
+
+    # Stopping early closes the file along with the generator
+    hosts.close()
+
+    assert opened
+    assert all(infile.closed for infile in opened)
+
+def test_iter_hosts_unrecognized(tmp_path):
+
+    path = tmp_path / 'scan.xml'
+    path.write_text(UNKNOWN)
+
+    assert list(parsers.iter_hosts(str(path))) == []
+
+@pytest.mark.parametrize('content',[MASSCAN,UNKNOWN])
+def test_ssl_name_dumper_without_nmap_input(tmp_path,capsys,monkeypatch,
+        content):
+
+    # esprint writes to the stderr bound when it was imported
+    monkeypatch.setattr('parsuite.core.suffix_printer.stderr',sys.stderr)
+
+    path = tmp_path / 'scan.xml'
+    path.write_text(content)
+
+    assert modules.handles['nmap_ssl_name_dumper'].parse(
+        input_file=str(path),no_cache=True) == 0
+
+    output = capsys.readouterr()
+    assert not output.out
+    assert 'No ssl-cert script results found' in output.err